@@ -4,12 +4,13 @@ import shutil
 import subprocess
 
 def main():
-    # Check if exactly one argument is given
-    if len(sys.argv) != 2:
-        print("Usage: {} dirname".format(sys.argv[0]))
+    # Check that a dirname is given; anything after it is passed on to fiver.py
+    if len(sys.argv) < 2:
+        print("Usage: {} dirname [fiver.py options, e.g. --concurrency 8]".format(sys.argv[0]))
         sys.exit(1)
     
     dirname = sys.argv[1]
+    fiver_options = sys.argv[2:]
     
     # Define the original directory to return to it later
     original_dir = os.getcwd()
@@ -36,7 +37,7 @@ def main():
         sys.exit(1)
     
     # Run the Python script with dirname as the argument
-    subprocess.run([sys.executable, "gptrunner.py", dirname])
+    subprocess.run([sys.executable, "gptrunner.py", dirname, *fiver_options])
     
     # Change back to the original directory
     os.chdir(original_dir)
@@ -0,0 +1,135 @@
+"""
+Track how long `gpt` takes to import.
+
+Imports each target module in a fresh interpreter with `python -X importtime`,
+several times, and reports the median total import time together with the
+slowest direct imports of gptcli.gpt. Every run is appended to a JSON-lines
+history file (with the date and git commit) and compared with the previous
+entry, so startup regressions show up over time. The history is kept next
+to the gpt config (~/.config/gpt-cli), outside the repository.
+
+Usage: python bench_importtime.py [--runs 5] [--top 8] [--history importtime_history.jsonl]
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# What a scripted `gpt -p` run imports, and what each provider adds on top
+# once a model needs it.
+TARGETS = [
+    "gptcli.gpt",
+    "gptcli.providers.openai",
+    "gptcli.providers.anthropic",
+    "gptcli.providers.google",
+    "gptcli.providers.cohere",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)")
+
+
+def import_times(module):
+    """
+    Return (total microseconds, {module: cumulative microseconds} for the
+    modules `module` imports directly) for one import in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=script_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    # A module's line comes after the lines of everything it imports, which
+    # are indented one level (two spaces) deeper.
+    children = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3)) // 2
+        if depth == 0:
+            if match.group(4) == module:
+                return int(match.group(2)), children
+            children = {}
+        elif depth == 1:
+            children[match.group(4)] = int(match.group(2))
+    raise RuntimeError(f"import {module} not found in the -X importtime output")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=script_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def last_entry(history_path):
+    if not os.path.exists(history_path):
+        return None
+    entry = None
+    with open(history_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure gptcli import time with python -X importtime.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target; the median is reported.")
+    parser.add_argument("--top", type=int, default=8, help="Slowest direct imports of gptcli.gpt to list.")
+    parser.add_argument(
+        "--history",
+        default=os.path.join(os.path.expanduser("~"), ".config", "gpt-cli", "importtime_history.jsonl"),
+        help="JSON-lines file each run is appended to.",
+    )
+    args = parser.parse_args()
+
+    previous = last_entry(args.history)
+    medians = {}
+    for module in TARGETS:
+        try:
+            runs = [import_times(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:>28}: skipped ({e})")
+            continue
+        medians[module] = statistics.median(total for total, _ in runs) / 1000
+        change = ""
+        if previous and module in previous["import_ms"]:
+            change = f" ({medians[module] - previous['import_ms'][module]:+.0f} ms since {previous['commit'] or previous['date']})"
+        print(f"{module:>28}: {medians[module]:7.0f} ms{change}")
+
+        if module == "gptcli.gpt":
+            _, children = max(runs, key=lambda run: run[0])
+            for name, microseconds in sorted(children.items(), key=lambda item: -item[1])[: args.top]:
+                print(f"{'':>30}{name:<32}{microseconds / 1000:7.0f} ms")
+
+    entry = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": {module: round(ms, 1) for module, ms in medians.items()},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
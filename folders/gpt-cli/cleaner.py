@@ -3,40 +3,82 @@ import csv
 import sys
 import os
 
+# Score markers: one, two, or three digits between single or doubled delimiters
+# (e.g., @1@, @@1@@, @999@, or !!12!!). A doubled marker always contains a
+# single one, so only that is matched. Every delimiter family is found in one
+# left-to-right scan, and a match is at most 5 characters long, so a long
+# response without markers cannot make the search backtrack.
+DELIMITERS = "@!#^%*&~+=₩"
+marker = re.compile(r'([@!#^%*&~+=₩])\d{1,3}\1')
+
 def clean_specific_string(text):
     # Remove the specific string "between two @ symbols" case-insensitively
     return re.sub(r"between two @ symbols", "", text, flags=re.IGNORECASE)
 
-def filter_csv(file_path):
-    # Pattern to match strings with one or more occurrences of one, two, or three digits between @ symbols (e.g., @1@, @@1@@, @999@, or @@999@@) and no other @ symbols
-    pattern = re.compile(r'([^@]*@{1,2}\d{1,3}@{1,2}[^@]*)+')
-    
-    at_violations = 0
+def clean_row(row):
+    # Remove the specific string "between two @ symbols" from each cell
+    return [clean_specific_string(cell) for cell in row]
+
+def markers_in(row):
+    # Set of delimiters that enclose a score marker somewhere in the row
+    found = set()
+    for cell in row:
+        found.update(match.group(1) for match in marker.finditer(cell))
+    return found
+
+def first_violation(row, delimiters=DELIMITERS):
+    # First delimiter (in the given order) with no score marker in the row, or None
+    found = markers_in(row)
+    for delimiter in delimiters:
+        if delimiter not in found:
+            return delimiter
+    return None
+
+def is_valid_row(row, delimiters="@"):
+    # A row is kept if, for each delimiter, any (cleaned) cell has a score marker
+    return first_violation(row, delimiters) is None
+
+def response_failure(text, delimiters="@"):
+    # Why a single response fails the checks (e.g. "no @ marker"), or None if it passes
+    violation = first_violation(clean_row([text]), delimiters)
+    return None if violation is None else f"no {violation} marker"
+
+def filter_rows(file_path, delimiters, clean=None):
+    """
+    Stream the CSV once, keeping the rows that pass every delimiter check,
+    and replace the file with them. A removed row is counted against the
+    first delimiter it fails, as if each check ran over the rows left by the
+    previous one. Returns (total lines, removed lines, {delimiter: violations}).
+    """
+    violations = dict.fromkeys(delimiters, 0)
     total_lines = 0
     removed_lines = 0
+    temporary_path = f"{file_path}.tmp"
 
-    # Open the file with utf-8 encoding to handle Unicode characters consistently across platforms
-    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+    # Open the files with utf-8 encoding to handle Unicode characters consistently across platforms
+    with open(file_path, mode='r', encoding='utf-8', newline='') as file, \
+            open(temporary_path, mode='w', encoding='utf-8', newline='') as out:
         reader = csv.reader(file)
-        
-        # Process and filter rows
-        lines = []
+        writer = csv.writer(out)
         for row in reader:
             total_lines += 1
-            # Remove the specific string "between two @ symbols" from each cell
-            cleaned_row = [clean_specific_string(cell) for cell in row]
-            # Filter rows that match the regex pattern
-            if any(pattern.search(cell) for cell in cleaned_row):
-                lines.append(cleaned_row)
+            if clean is not None:
+                row = clean(row)
+            violation = first_violation(row, delimiters)
+            if violation is None:
+                writer.writerow(row)
             else:
-                at_violations += 1
+                violations[violation] += 1
                 removed_lines += 1
-    
-    # Write the filtered rows back to the file with utf-8 encoding
-    with open(file_path, mode='w', encoding='utf-8', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerows(lines)
-    
+
+    # Write the filtered rows back in one go
+    os.replace(temporary_path, file_path)
+    return total_lines, removed_lines, violations
+
+def filter_csv(file_path):
+    total_lines, removed_lines, violations = filter_rows(file_path, "@", clean=clean_row)
+    at_violations = violations["@"]
+
     # Print the complete path of the CSV file and a completion message
     print(f"Cleaning completed for: {os.path.abspath(file_path)}")
     print(f"Total lines processed: {total_lines}")
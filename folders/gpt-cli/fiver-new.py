@@ -7,6 +7,8 @@ import os
 import re
 import shutil
 
+from gptcli.logtail import LogTailer
+
 def get_ordinal_suffix(n):
     """
     Return the ordinal suffix for an integer n: '1st', '2nd', '3rd', etc.
@@ -44,6 +46,7 @@ new_delimiter_instruction = "start your response with <<start>> and end your res
 
 # Path to the GPT log file.
 log_file_path = "gptcli.log"
+log_tailer = LogTailer(log_file_path, "Token usage")
 
 # Get base prompts from prompt*.txt in the current directory.
 prompt_files = sorted(glob.glob("prompt*.txt"))
@@ -64,25 +67,14 @@ text_files = sorted(glob.glob(os.path.join(input_directory, "*.txt")))
 num_text_files = len(text_files)
 print(f"Number of text files found in {input_directory}: {num_text_files}")
 
-def count_token_usage(log_file):
-    """Count occurrences of 'Token usage' in the log file."""
-    if os.path.exists(log_file):
-        with open(log_file, "r", encoding="utf-8") as f:
-            return len(re.findall(r"Token usage", f.read()))
-    return 0
-
 def wait_for_responses(expected_count, timeout=120):
     """
     Wait until the number of 'Token usage' strings in the log file
-    matches the expected count. Retries until the timeout is reached.
+    matches the expected count, or until the timeout is reached.
+    Only the bytes appended since the last check are read, and the wait
+    wakes up as soon as the log changes instead of every 2 seconds.
     """
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        time.sleep(2)  # Check every 2 seconds
-        current_count = count_token_usage(log_file_path)
-        if current_count >= expected_count:
-            return True  # Success, we got all responses
-    return False  # Timeout reached
+    return log_tailer.wait_for(expected_count, timeout)
 
 def extract_responses_and_save(filename, iteration_successful_csvs):
     """
@@ -140,6 +132,7 @@ def process_text_file(input_file, base_prompts, new_delimiter_instruction, itera
             )
             shutil.move(log_file_path, error_logfile)
             print(f"Saved failed attempt log: {error_logfile}")
+        log_tailer.reset()  # Count from the start of the new log.
 
         with open(input_file, "r", encoding="utf-8") as f_in:
             file_text = f_in.read().strip()
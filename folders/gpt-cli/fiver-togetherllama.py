@@ -2,21 +2,31 @@ import os
 import shutil
 import time
 import csv
-import subprocess
 import sys
+import argparse
 from datetime import datetime
 from colorama import init, Fore, Style
 
+from gptcli.runner import PromptPool, load_assistant
+
 # Initialize colorama
 init(autoreset=True)
 
+MODEL = 'oai-compat:meta-llama/Meta-Llama-3.1-405B-Instruct-Turbo'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=f"Send every file in a directory to {MODEL} until each has 5 responses in the CSV.")
+    parser.add_argument("directory_path")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of requests in flight at once.")
+    return parser.parse_args()
+
 def main():
-    # Check if the directory argument is provided
-    if len(sys.argv) != 2:
-        print(Fore.RED + "Usage: python script.py directory_path")
+    args = parse_args()
+    if args.concurrency < 1:
+        print(Fore.RED + "--concurrency must be at least 1.")
         sys.exit(1)
 
-    file_directory = sys.argv[1]
+    file_directory = args.directory_path
     csv_file = f"{file_directory}.csv"
     working_directory = os.path.join(file_directory, "workingdirectory")
 
@@ -28,6 +38,9 @@ def main():
         with open(csv_file, 'w', newline='', encoding='utf-8') as file:
             pass
 
+    # One assistant and worker pool for the whole run instead of a new gpt.py process per file.
+    pool = PromptPool(load_assistant(model=MODEL), args.concurrency)
+
     while True:
         all_files_met_condition = True
         total_missing_references = 0
@@ -56,7 +69,7 @@ def main():
 
         # Run the file processing only if any file needs processing
         if not all_files_met_condition:
-            process_files(working_directory, csv_file)
+            process_files(working_directory, csv_file, pool)
 
         # Check if the condition is met for all files
         if all_files_met_condition:
@@ -66,6 +79,8 @@ def main():
         # Optional: Add a delay to avoid rapid, continuous execution
         time.sleep(5)
 
+    pool.close()
+
 def count_occurrences(filename, csv_file):
     count = 0
     with open(csv_file, mode='r', newline='', encoding='utf-8') as file:
@@ -80,10 +95,8 @@ def get_file_size(file):
     return os.stat(file).st_size
 
 
-def process_files(working_directory, csv_file):
-    # Log the start of processing
-    print(Fore.CYAN + f"Starting to process files in {working_directory}")
-
+def read_files(working_directory):
+    """Yield (filename, content) for every file in the working directory that is worth sending."""
     for i in os.listdir(working_directory):
         i_path = os.path.join(working_directory, i)
         if os.path.isfile(i_path) and get_file_size(i_path) > 25:
@@ -99,22 +112,32 @@ def process_files(working_directory, csv_file):
                 print(Fore.RED + f"Error decoding file: {i_path}")  # Log decoding error
                 continue
 
-            # Running a subprocess to process the file content
-            command = [sys.executable, 'gpt.py', '-p', content, '--model', 'oai-compat:meta-llama/Meta-Llama-3.1-405B-Instruct-Turbo']
-            output = subprocess.run(command, capture_output=True, text=True).stdout
+            yield i, content
+
+
+def process_files(working_directory, csv_file, pool):
+    # Log the start of processing
+    print(Fore.CYAN + f"Starting to process files in {working_directory}")
+
+    with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        # Responses arrive as they finish, up to pool.concurrency at a time.
+        for i, output, error in pool.map(read_files(working_directory)):
+            if error is not None:
+                print(Fore.RED + f"Request failed for {i}: {error}")  # Retried on the next pass
+                continue
             output_escaped = output.replace('"', '""')
-            
-            # Log the completion of the subprocess
-            print(Fore.BLUE + f"Command completed for {i}.")  # Log command completion
+
+            # Log the completion of the request
+            print(Fore.BLUE + f"Request completed for {i}.")  # Log request completion
             timestamp_output = datetime.now().strftime('%m-%d %H:%M:%S')
             print(Fore.CYAN + f"[{timestamp_output}] " + Style.BRIGHT + Fore.GREEN + f"(output size: {len(output)} characters)")  # Log output size
             print(Style.RESET_ALL, end="")  # Reset the color back to normal after the message
 
             # Writing results to CSV
-            with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([os.path.basename(i), output_escaped])
-                print(Fore.BLUE + f"Logged output to CSV for {i}")  # Log successful write to CSV
+            writer.writerow([os.path.basename(i), output_escaped])
+            file.flush()
+            print(Fore.BLUE + f"Logged output to CSV for {i}")  # Log successful write to CSV
 
     # Log the end of processing
     print(Fore.CYAN + f"Finished processing all eligible files in {working_directory} using TOGETHER LLM")
@@ -1,123 +1,184 @@
 import os
-import shutil
-import time
 import csv
-import subprocess
 import sys
+import argparse
+from collections import Counter, namedtuple
 from datetime import datetime
 from colorama import init, Fore, Style
 
+from gptcli.jobtable import JobTable
+from gptcli.resultindex import ResultIndex
+from gptcli.runner import PromptPool, load_assistant
+from cleaner import clean_row, response_failure
+
 # Initialize colorama
 init(autoreset=True)
 
+# An essay to process: `filename` is its key in the CSV, `read()` returns its text.
+Essay = namedtuple("Essay", ["filename", "size", "read"])
+
+MODEL = 'gpt-4o'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=f"Send every essay to {MODEL} until each has --target valid responses in the CSV.")
+    parser.add_argument("directory_path")
+    parser.add_argument("tsv_file", nargs="?", help="Read the essays from this TSV instead of the files in directory_path.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of requests in flight at once.")
+    parser.add_argument("--target", type=int, default=5, help="Valid responses wanted per essay.")
+    parser.add_argument("--max-attempts", type=int, default=20, help="Requests allowed per essay before giving up on it.")
+    parser.add_argument("--delimiters", default="@", help="Score markers every response needs, e.g. @ or '@!#' (see all_cleaner.py).")
+    return parser.parse_args()
+
 def main():
-    # Check if the directory argument is provided
-    if len(sys.argv) != 2:
-        print(Fore.RED + "Usage: python script.py directory_path")
+    args = parse_args()
+    if args.concurrency < 1:
+        print(Fore.RED + "--concurrency must be at least 1.")
         sys.exit(1)
 
-    file_directory = sys.argv[1]
+    file_directory = args.directory_path
+    tsv_file = args.tsv_file
     csv_file = f"{file_directory}.csv"
-    working_directory = os.path.join(file_directory, "workingdirectory")
-
-    # Create working directory if it doesn't exist
-    os.makedirs(working_directory, exist_ok=True)
 
     # Create CSV file if it doesn't exist
     if not os.path.exists(csv_file):
         with open(csv_file, 'w', newline='', encoding='utf-8') as file:
             pass
 
-    while True:
-        all_files_met_condition = True
-        total_missing_references = 0
-
-        # Loop through each file in the directory
-        for file in os.listdir(file_directory):
-            file_path = os.path.join(file_directory, file)
-            if os.path.isfile(file_path) and get_file_size(file_path) > 10:
-                filename = os.path.basename(file_path)
-                count = count_occurrences(filename, csv_file)
-
-                print(Fore.BLUE + f"File: {filename}, Count: {count}")  # Debugging line
-
-                if count < 5:
-                    all_files_met_condition = False
-                    total_missing_references += (5 - count)
-                    # Copy file to working directory if not already there
-                    if not os.path.exists(os.path.join(working_directory, filename)):
-                        shutil.copy(file_path, working_directory)
-                else:
-                    # Delete file from working directory if it's there
-                    if os.path.exists(os.path.join(working_directory, filename)):
-                        os.remove(os.path.join(working_directory, filename))
-
-        print(Fore.GREEN + f"Total number of remaining missing references: {total_missing_references}")
-
-        # Run the file processing only if any file needs processing
-        if not all_files_met_condition:
-            process_files(working_directory, csv_file)
-
-        # Check if the condition is met for all files
-        if all_files_met_condition:
-            print(Fore.BLUE + "All files have appeared 5 times in the CSV.")
-            break
-
-        # Optional: Add a delay to avoid rapid, continuous execution
-        time.sleep(5)
-
-def count_occurrences(filename, csv_file):
-    count = 0
-    with open(csv_file, mode='r', newline='', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if filename in row:
-                count += 1
-    return count
-
+    table = JobTable.from_tsv(
+        tsv_file, skip_header=False, text_column="second", duplicates="append", skip_blank=True
+    ) if tsv_file else None
+    essays = essays_from_table(table) if table is not None else essays_from_directory(file_directory)
+
+    # One assistant and worker pool for the whole run instead of a new gpt.py process per essay.
+    pool = PromptPool(load_assistant(model=MODEL), args.concurrency)
+
+    # Rows per essay already in the CSV (from an earlier, interrupted run).
+    index = ResultIndex(csv_file)
+    index.refresh()
+
+    # Responses still missing per essay.
+    missing = []
+    total_missing_references = 0
+    for essay in essays:
+        if essay.size > 10:
+            count = index.count(essay.filename)
+
+            print(Fore.BLUE + f"File: {essay.filename}, Count: {count}")  # Debugging line
+
+            if count < args.target:
+                total_missing_references += (args.target - count)
+                missing.append((essay, args.target - count))
+
+    print(Fore.GREEN + f"Total number of remaining missing references: {total_missing_references}")
+
+    exhausted = process_files(missing, csv_file, pool, args.delimiters, args.max_attempts)
+
+    for reason, count in pool.failures.most_common():
+        print(Fore.YELLOW + f"Failed attempts ({reason}): {count}")
+    if exhausted:
+        for filename, count in sorted(exhausted.items()):
+            print(Fore.RED + f"Gave up on {filename} after {args.max_attempts} attempts, {count} responses still missing")
+    else:
+        print(Fore.BLUE + f"All files have appeared {args.target} times in the CSV.")
+
+    pool.close()
+    if table is not None:
+        table.close()
+
+def essays_from_directory(file_directory):
+    """One essay per file in the directory, read in place."""
+    essays = []
+    for file in os.listdir(file_directory):
+        file_path = os.path.join(file_directory, file)
+        if os.path.isfile(file_path):
+            essays.append(Essay(file, get_file_size(file_path), lambda path=file_path: read_file(path)))
+    return essays
+
+def essays_from_table(table):
+    """
+    One essay per name in the TSV (rows sharing a name are joined), minus
+    the "Student Number" header row and essays under 250 bytes.
+    """
+    table.remove("Student Number")
+    return [
+        Essay(f"{job.name}.txt", job.size, lambda job=job: table.raw_text(job).replace('\x00', ''))
+        for job in table
+        if job.size >= 250
+    ]
+
+def read_file(path):
+    with open(path, 'r', encoding="utf-8", errors="ignore") as file:
+        return file.read().replace('\x00', '')  # Remove null bytes
 
 def get_file_size(file):
     return os.stat(file).st_size
 
 
-def process_files(working_directory, csv_file):
+def read_essay(essay):
+    """Return the essay's content, or None if it is too short to send or cannot be read."""
+    i = essay.filename
+    if essay.size <= 25:
+        return None
+    print(Fore.CYAN + f"Processing file: {i}")  # Log the file being processed
+
+    try:
+        content = essay.read()
+        print(Fore.BLUE + f"Read content from {i}")  # Log file read success
+        timestamp_input = datetime.now().strftime('%m-%d %H:%M:%S')
+        print(Fore.BLUE + f"[{timestamp_input}] (input size: {len(content)} characters)")  # Log input size
+    except UnicodeDecodeError:
+        print(Fore.RED + f"Error decoding file: {i}")  # Log decoding error
+        return None
+    return content
+
+
+def read_prompts(missing):
+    """Yield (filename, content) once per missing response, reading each essay once."""
+    for essay, count in missing:
+        content = read_essay(essay)
+        if content is not None:
+            for _ in range(count):
+                yield essay.filename, content
+
+
+def process_files(missing, csv_file, pool, delimiters, max_attempts):
+    """
+    Request the missing responses, up to pool.concurrency at a time. The pool
+    checks each response with cleaner.py's rule as soon as it arrives and
+    sends a rejected or failed request again straight away, up to
+    `max_attempts` requests per essay; only valid rows reach the CSV.
+    Returns the number of responses still missing for each essay that ran
+    out of attempts.
+    """
     # Log the start of processing
-    print(Fore.CYAN + f"Starting to process files in {working_directory}")
-
-    for i in os.listdir(working_directory):
-        i_path = os.path.join(working_directory, i)
-        if os.path.isfile(i_path) and get_file_size(i_path) > 25:
-            print(Fore.CYAN + f"Processing file: {i}")  # Log the file being processed
-
-            try:
-                with open(i_path, 'r', encoding="utf-8", errors="ignore") as file:
-                    content = file.read().replace('\x00', '')  # Remove null bytes
-                print(Fore.BLUE + f"Read content from {i}")  # Log file read success
-                timestamp_input = datetime.now().strftime('%m-%d %H:%M:%S')
-                print(Fore.BLUE + f"[{timestamp_input}] (input size: {len(content)} characters)")  # Log input size
-            except UnicodeDecodeError:
-                print(Fore.RED + f"Error decoding file: {i_path}")  # Log decoding error
-                continue
+    print(Fore.CYAN + f"Starting to process {sum(count for _, count in missing)} requests")
+
+    exhausted = Counter()
+    validate = lambda output: response_failure(output, delimiters)
 
-            # Running a subprocess to process the file content
-            command = [sys.executable, 'gpt.py', '-p', content, '--model', 'gpt-4o']
-            output = subprocess.run(command, capture_output=True, text=True).stdout
+    with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for i, output, error in pool.map(read_prompts(missing), validate, max_attempts):
+            if error is not None:
+                print(Fore.RED + f"No valid response for {i}: {error}")
+                exhausted[i] += 1
+                continue
             output_escaped = output.replace('"', '""')
-            
-            # Log the completion of the subprocess
-            print(Fore.BLUE + f"Command completed for {i}.")  # Log command completion
+
+            # Log the completion of the request
+            print(Fore.BLUE + f"Request completed for {i}.")  # Log request completion
             timestamp_output = datetime.now().strftime('%m-%d %H:%M:%S')
             print(Fore.CYAN + f"[{timestamp_output}] " + Style.BRIGHT + Fore.GREEN + f"(output size: {len(output)} characters)")  # Log output size
             print(Style.RESET_ALL, end="")  # Reset the color back to normal after the message
 
-            # Writing results to CSV
-            with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([os.path.basename(i), output_escaped])
-                print(Fore.BLUE + f"Logged output to CSV for {i}")  # Log successful write to CSV
+            # Writing results to CSV, cleaned the same way cleaner.py cleans it
+            writer.writerow(clean_row([os.path.basename(i), output_escaped]))
+            file.flush()
+            print(Fore.BLUE + f"Logged output to CSV for {i}")  # Log successful write to CSV
 
     # Log the end of processing
-    print(Fore.CYAN + f"Finished processing all eligible files in {working_directory} using OPENAI LLM")
+    print(Fore.CYAN + "Finished processing all eligible files using OPENAI LLM")
+    return exhausted
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,19 +2,17 @@ import os
 import sys
 from attr import dataclass
 import platform
-from typing import Any, Dict, Iterator, Optional, TypedDict, List
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, TypedDict, List
 
 from gptcli.completion import (
     CompletionEvent,
     CompletionProvider,
     ModelOverrides,
     Message,
+    iterate_in_thread,
 )
-from gptcli.providers.google import GoogleCompletionProvider
-from gptcli.providers.llama import LLaMACompletionProvider
-from gptcli.providers.openai import OpenAICompletionProvider
-from gptcli.providers.anthropic import AnthropicCompletionProvider
-from gptcli.providers.cohere import CohereCompletionProvider
+from gptcli.hedging import HedgingPolicy
+from gptcli.providers import load_provider
 
 
 class AssistantConfig(TypedDict, total=False):
@@ -66,28 +64,33 @@ User's `uname`: {platform.uname()}. User's `$SHELL`: {os.environ.get('SHELL')}."
 }
 
 
+# Model name prefixes and the provider module and class that serve them. A
+# provider module is only imported when one of its models is used.
+PROVIDERS = [
+    (
+        ("gpt", "ft:gpt", "oai-compat:"),
+        "gptcli.providers.openai",
+        "OpenAICompletionProvider",
+    ),
+    (("claude",), "gptcli.providers.anthropic", "AnthropicCompletionProvider"),
+    (("llama",), "gptcli.providers.llama", "LLaMACompletionProvider"),
+    (("command", "c4ai"), "gptcli.providers.cohere", "CohereCompletionProvider"),
+    (("gemini",), "gptcli.providers.google", "GoogleCompletionProvider"),
+]
+
+
 def get_completion_provider(model: str) -> CompletionProvider:
-    if (
-        model.startswith("gpt")
-        or model.startswith("ft:gpt")
-        or model.startswith("oai-compat:")
-    ):
-        return OpenAICompletionProvider()
-    elif model.startswith("claude"):
-        return AnthropicCompletionProvider()
-    elif model.startswith("llama"):
-        return LLaMACompletionProvider()
-    elif model.startswith("command") or model.startswith("c4ai"):
-        return CohereCompletionProvider()
-    elif model.startswith("gemini"):
-        return GoogleCompletionProvider()
-    else:
-        raise ValueError(f"Unknown model: {model}")
+    for prefixes, module_name, class_name in PROVIDERS:
+        if model.startswith(prefixes):
+            return getattr(load_provider(module_name), class_name)()
+    raise ValueError(f"Unknown model: {model}")
 
 
 class Assistant:
     def __init__(self, config: AssistantConfig):
         self.config = config
+        # Opt-in: duplicate requests that are slower than usual.
+        self.hedging: Optional[HedgingPolicy] = None
 
     @classmethod
     def from_config(cls, name: str, config: AssistantConfig):
@@ -116,20 +119,62 @@ class Assistant:
             param, self.config.get(param, CONFIG_DEFAULTS[param])
         )
 
+    def completion_args(
+        self,
+        override_params: ModelOverrides = {},
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """The `args` a provider's complete() gets: model, temperature, top_p, ..."""
+        args: Dict[str, Any] = {
+            "model": self._param("model", override_params),
+            "temperature": float(self._param("temperature", override_params)),
+            "top_p": float(self._param("top_p", override_params)),
+        }
+        if response_format is not None:
+            # OpenAI-style `response_format`; providers without structured
+            # output support ignore it.
+            args["response_format"] = response_format
+        return args
+
     def complete_chat(
-        self, messages, override_params: ModelOverrides = {}, stream: bool = True
+        self,
+        messages,
+        override_params: ModelOverrides = {},
+        stream: bool = True,
+        response_format: Optional[Dict[str, Any]] = None,
     ) -> Iterator[CompletionEvent]:
-        model = self._param("model", override_params)
-        completion_provider = get_completion_provider(model)
-        return completion_provider.complete(
-            messages,
-            {
-                "model": model,
-                "temperature": float(self._param("temperature", override_params)),
-                "top_p": float(self._param("top_p", override_params)),
-            },
-            stream,
-        )
+        args = self.completion_args(override_params, response_format)
+        model = args["model"]
+
+        # A non-streamed duplicate cannot be stopped once sent, so only
+        # streamed requests are hedged.
+        if self.hedging is not None and stream:
+            return self.hedging.complete(
+                model,
+                lambda: get_completion_provider(model).complete(messages, args, stream),
+            )
+        return get_completion_provider(model).complete(messages, args, stream)
+
+    def acomplete_chat(
+        self,
+        messages,
+        override_params: ModelOverrides = {},
+        stream: bool = True,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[CompletionEvent]:
+        """
+        Async counterpart of `complete_chat`, for running many requests on
+        one event loop. Stopping the iteration early closes the request.
+        """
+        if self.hedging is not None and stream:
+            # Hedged attempts run on threads.
+            return iterate_in_thread(
+                lambda: self.complete_chat(
+                    messages, override_params, stream, response_format
+                )
+            )
+        args = self.completion_args(override_params, response_format)
+        return get_completion_provider(args["model"]).acomplete(messages, args, stream)
 
 
 @dataclass
@@ -0,0 +1,262 @@
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from gptcli.completion import Message
+from gptcli.providers import clients, load_provider
+
+
+class BatchRequest(NamedTuple):
+    custom_id: str
+    messages: List[Message]
+    # As passed to a provider's complete(): model, temperature, top_p.
+    args: Dict[str, Any]
+
+
+class BatchResult(NamedTuple):
+    custom_id: str
+    # The reply, or None if the request failed (see `error`).
+    content: Optional[str]
+    error: Optional[str] = None
+
+
+class BatchStatus(NamedTuple):
+    status: str
+    ended: bool
+    # Requests per state, e.g. {"completed": 10, "failed": 1}.
+    counts: Dict[str, int]
+
+
+class BatchError(Exception):
+    pass
+
+
+class BatchBackend(ABC):
+    """
+    A provider's batch API: submit a set of requests at once, poll until
+    the provider has run them (which may take hours), then read the
+    results, in any order.
+    """
+
+    @abstractmethod
+    def submit(self, requests: Iterable[BatchRequest]) -> str:
+        pass
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> BatchStatus:
+        pass
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        pass
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    The OpenAI Batch API: the requests are uploaded as a JSONL file of
+    /v1/chat/completions calls, and the replies come back as JSONL output
+    (and error) files.
+    """
+
+    ENDED = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client=None, work_dir: Optional[str] = None):
+        openai_provider = load_provider("gptcli.providers.openai")
+        self.client = client or openai_provider.OpenAICompletionProvider().client
+        self._make_request = openai_provider.make_request
+        # Where the request JSONL is written before it is uploaded.
+        self.work_dir = work_dir
+
+    def request_line(self, request: BatchRequest) -> dict:
+        return {
+            "custom_id": request.custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self._make_request(request.messages, request.args),
+        }
+
+    def write_requests(self, requests: Iterable[BatchRequest], f: IO[bytes]):
+        for request in requests:
+            f.write(json.dumps(self.request_line(request)).encode("utf-8") + b"\n")
+
+    def submit(self, requests: Iterable[BatchRequest]) -> str:
+        # Written to disk first so the requests are never all in memory as
+        # JSON; once uploaded, OpenAI keeps the file, so the local copy goes.
+        with tempfile.NamedTemporaryFile(
+            "w+b", dir=self.work_dir, prefix="batch-", suffix=".jsonl"
+        ) as f:
+            self.write_requests(requests, f)
+            f.seek(0)
+            input_file = self.client.files.create(
+                file=(os.path.basename(f.name), f), purpose="batch"
+            )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = {}
+        if batch.request_counts is not None:
+            counts = {
+                "completed": batch.request_counts.completed,
+                "failed": batch.request_counts.failed,
+                "total": batch.request_counts.total,
+            }
+        return BatchStatus(batch.status, batch.status in self.ENDED, counts)
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id is None:
+                continue
+            with self.client.files.with_streaming_response.content(file_id) as response:
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield self._result(json.loads(line))
+
+    @staticmethod
+    def _result(line: dict) -> BatchResult:
+        custom_id = line["custom_id"]
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or response.get("body", {}).get("error")
+            return BatchResult(custom_id, None, json.dumps(error))
+        message = response["body"]["choices"][0]["message"]
+        return BatchResult(custom_id, message.get("content") or "")
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """
+    Anthropic message batches. The pinned SDK predates them, so the HTTP
+    API is called directly; the request parameters are the same ones the
+    Anthropic provider sends.
+    """
+
+    API_VERSION = "2023-06-01"
+    BETA = "message-batches-2024-09-24"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        anthropic_provider = load_provider("gptcli.providers.anthropic")
+        self.api_key = api_key or anthropic_provider.api_key
+        if not self.api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        self.base_url = (
+            base_url
+            or os.environ.get("ANTHROPIC_BASE_URL")
+            or "https://api.anthropic.com"
+        ).rstrip("/")
+        self._make_request = anthropic_provider.make_request
+        self.http = clients.get_client("anthropic-batches", self.base_url, _http_client)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": self.API_VERSION,
+            "anthropic-beta": self.BETA,
+        }
+
+    def _request(self, method: str, url: str, **kwargs) -> dict:
+        response = self.http.request(method, url, headers=self.headers, **kwargs)
+        if response.status_code >= 400:
+            raise BatchError(f"{method} {url}: {response.status_code} {response.text}")
+        return response.json()
+
+    def submit(self, requests: Iterable[BatchRequest]) -> str:
+        batch = self._request(
+            "POST",
+            f"{self.base_url}/v1/messages/batches",
+            json={
+                "requests": [
+                    {
+                        "custom_id": request.custom_id,
+                        "params": self._make_request(request.messages, request.args),
+                    }
+                    for request in requests
+                ]
+            },
+        )
+        return batch["id"]
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        batch = self._request("GET", f"{self.base_url}/v1/messages/batches/{batch_id}")
+        status = batch["processing_status"]
+        return BatchStatus(status, status == "ended", batch.get("request_counts", {}))
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        batch = self._request("GET", f"{self.base_url}/v1/messages/batches/{batch_id}")
+        if not batch.get("results_url"):
+            return
+        with self.http.stream(
+            "GET", batch["results_url"], headers=self.headers
+        ) as response:
+            if response.status_code >= 400:
+                raise BatchError(f"GET {batch['results_url']}: {response.status_code}")
+            for line in response.iter_lines():
+                if line.strip():
+                    yield self._result(json.loads(line))
+
+    @staticmethod
+    def _result(line: dict) -> BatchResult:
+        result = line["result"]
+        if result["type"] != "succeeded":
+            return BatchResult(
+                line["custom_id"],
+                None,
+                json.dumps(result.get("error") or result["type"]),
+            )
+        content = "".join(
+            block.get("text", "") for block in result["message"]["content"]
+        )
+        return BatchResult(line["custom_id"], content)
+
+
+def _http_client():
+    import httpx
+
+    return httpx.Client(timeout=httpx.Timeout(600, connect=5))
+
+
+def batch_backend(model: str, work_dir: Optional[str] = None) -> BatchBackend:
+    """The batch API that serves `model`: OpenAI (and compatible) or Anthropic models."""
+    if model.startswith(("gpt", "ft:gpt", "oai-compat:")):
+        return OpenAIBatchBackend(work_dir=work_dir)
+    if model.startswith("claude"):
+        return AnthropicBatchBackend()
+    raise ValueError(
+        f"No batch API for model {model}; batches need an OpenAI or Anthropic model."
+    )
+
+
+def wait_for_batch(
+    backend: BatchBackend,
+    batch_id: str,
+    poll_interval: float = 60,
+    on_poll: Optional[Callable[[BatchStatus], None]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> BatchStatus:
+    """Poll every `poll_interval` seconds until the batch has ended; returns its final status."""
+    while True:
+        status = backend.poll(batch_id)
+        if on_poll is not None:
+            on_poll(status)
+        if status.ended:
+            return status
+        sleep(poll_interval)
@@ -1,7 +1,6 @@
 import re
 from prompt_toolkit import PromptSession
 from prompt_toolkit.history import FileHistory
-from openai import OpenAIError, BadRequestError
 from prompt_toolkit.key_binding import KeyBindings, KeyPressEvent
 from prompt_toolkit.key_binding.bindings import named_commands
 from rich.console import Console
@@ -10,6 +9,7 @@ from rich.markdown import Markdown
 from typing import Any, Dict, Optional, Tuple
 
 from rich.text import Text
+from gptcli.completion import BadRequestError, CompletionError
 from gptcli.session import (
     ALL_COMMANDS,
     COMMAND_CLEAR,
@@ -107,7 +107,7 @@ class CLIChatListener(ChatListener):
             self.console.print(
                 f"[red]Request Error. The last prompt was not saved: {type(e)}: {e}[/red]"
             )
-        elif isinstance(e, OpenAIError):
+        elif isinstance(e, CompletionError):
             self.console.print(
                 f"[red]API Error. Type `r` or Ctrl-R to try again: {type(e)}: {e}[/red]"
             )
@@ -1,5 +1,16 @@
+import asyncio
+import threading
 from abc import abstractmethod
-from typing import Iterator, List, Literal, TypedDict, Union
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Literal,
+    TypedDict,
+    TypeVar,
+    Union,
+)
 
 from attr import dataclass
 
@@ -49,6 +60,8 @@ class UsageEvent:
 
 CompletionEvent = Union[MessageDeltaEvent, UsageEvent]
 
+T = TypeVar("T")
+
 
 class CompletionProvider:
     @abstractmethod
@@ -57,6 +70,62 @@ class CompletionProvider:
     ) -> Iterator[CompletionEvent]:
         pass
 
+    def acomplete(
+        self, messages: List[Message], args: dict, stream: bool = False
+    ) -> AsyncIterator[CompletionEvent]:
+        """
+        Async counterpart of `complete`. Providers whose SDK has an async
+        client override this; the default runs `complete` on a thread.
+        """
+        return iterate_in_thread(lambda: self.complete(messages, args, stream))
+
+
+async def iterate_in_thread(start: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+    """
+    Run a blocking iterator on a worker thread and yield its items on the
+    event loop. If the consumer stops early (or is cancelled), the thread
+    stops at the next item and closes the iterator.
+    """
+    loop = asyncio.get_running_loop()
+    items: "asyncio.Queue[tuple]" = asyncio.Queue()
+    abandoned = threading.Event()
+
+    def put(kind: str, value: object = None):
+        if not abandoned.is_set():
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (kind, value))
+            except RuntimeError:
+                pass  # The event loop is already closed.
+
+    def run():
+        try:
+            iterator = start()
+            try:
+                for item in iterator:
+                    if abandoned.is_set():
+                        break
+                    put("item", item)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            put("done")
+        except Exception as e:
+            put("error", e)
+
+    loop.run_in_executor(None, run)
+    try:
+        while True:
+            kind, value = await items.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        abandoned.set()
+
 
 class CompletionError(Exception):
     pass
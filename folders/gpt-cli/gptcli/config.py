@@ -1,10 +1,13 @@
 import os
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from attr import dataclass
 import yaml
 
 from gptcli.assistant import AssistantConfig
-from gptcli.providers.llama import LLaMAModelConfig
+from gptcli.providers import clients, configure_provider, load_provider
+
+if TYPE_CHECKING:
+    from gptcli.providers.llama import LLaMAModelConfig
 
 
 CONFIG_FILE_PATHS = [
@@ -28,7 +31,14 @@ class GptCliConfig:
     log_level: str = "INFO"
     assistants: Dict[str, AssistantConfig] = {}
     interactive: Optional[bool] = None
-    llama_models: Optional[Dict[str, LLaMAModelConfig]] = None
+    llama_models: Optional[Dict[str, "LLaMAModelConfig"]] = None
+    # Total size of the LLaMA models kept loaded; unset keeps every model.
+    llama_memory_budget_gb: Optional[float] = None
+    # Connection pools of the provider clients; unset keeps each SDK's default.
+    http_max_connections: Optional[int] = None
+    http_max_keepalive_connections: Optional[int] = None
+    http_keepalive_expiry: Optional[float] = None
+    http2: bool = False
 
 
 def choose_config_file(paths: List[str]) -> str:
@@ -44,3 +54,51 @@ def read_yaml_config(file_path: str) -> GptCliConfig:
         return GptCliConfig(
             **config,
         )
+
+
+def init_providers(config: GptCliConfig):
+    """Pass API keys and settings on to each provider once its module is loaded."""
+    openai_api_key = config.api_key or config.openai_api_key
+
+    clients.configure(
+        clients.HttpSettings(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive_connections,
+            keepalive_expiry=config.http_keepalive_expiry,
+            http2=config.http2,
+        )
+    )
+
+    def setup_openai(module):
+        if config.openai_base_url:
+            module.openai.base_url = config.openai_base_url
+        if openai_api_key:
+            module.openai.api_key = openai_api_key
+
+    configure_provider("gptcli.providers.openai", setup_openai)
+
+    if config.anthropic_api_key:
+        configure_provider(
+            "gptcli.providers.anthropic",
+            lambda module: setattr(module, "api_key", config.anthropic_api_key),
+        )
+
+    if config.cohere_api_key:
+        configure_provider(
+            "gptcli.providers.cohere",
+            lambda module: setattr(module, "api_key", config.cohere_api_key),
+        )
+
+    if config.google_api_key:
+        configure_provider(
+            "gptcli.providers.google",
+            lambda module: module.genai.configure(api_key=config.google_api_key),
+        )
+
+    if config.llama_models is not None:
+        # Loaded right away: the model files are checked at startup.
+        budget = config.llama_memory_budget_gb
+        load_provider("gptcli.providers.llama").init_llama_models(
+            config.llama_models,
+            int(budget * 1024**3) if budget is not None else None,
+        )
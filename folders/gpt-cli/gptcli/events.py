@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from typing import Any, List, Optional, TextIO
+
+from gptcli.completion import Message, ModelOverrides, UsageEvent
+from gptcli.session import ChatListener, ResponseStreamer
+
+
+class EventsResponseStreamer(ResponseStreamer):
+    def __init__(self, listener: "EventsChatListener"):
+        self.listener = listener
+        self.first_token = True
+
+    def on_next_token(self, token: str):
+        if self.first_token:
+            self.first_token = False
+            self.listener.emit("first_token")
+
+
+class EventsChatListener(ChatListener):
+    """
+    Writes one JSON object per line to `stream` as a chat progresses, so that
+    scripts driving gpt can wait on turn completion and read the response
+    text without parsing the human-oriented log. Every event carries
+    `event`, `turn` (1-based, counting user messages) and `time` (Unix time).
+
+    Events: chat_start, chat_clear, turn_start (with `content`),
+    first_token, completion (with `content`), usage (with token counts and
+    `cost`), error (with `message`).
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.turn = 0
+
+    def emit(self, event: str, **fields: Any):
+        record = {"event": event, "turn": self.turn, "time": time.time(), **fields}
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+    def on_chat_start(self):
+        self.emit("chat_start")
+
+    def on_chat_clear(self):
+        self.turn = 0
+        self.emit("chat_clear")
+
+    def on_error(self, error: Exception):
+        self.emit("error", message=str(error))
+
+    def response_streamer(self) -> ResponseStreamer:
+        return EventsResponseStreamer(self)
+
+    def on_chat_message(self, message: Message):
+        if message["role"] == "user":
+            self.turn += 1
+            self.emit("turn_start", content=message["content"])
+
+    def on_chat_response(
+        self,
+        messages: List[Message],
+        response: Message,
+        overrides: ModelOverrides,
+        usage: Optional[UsageEvent] = None,
+    ):
+        self.emit("completion", content=response["content"])
+        if usage is not None:
+            self.emit(
+                "usage",
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                total_tokens=usage.total_tokens,
+                cost=usage.cost,
+            )
+
+
+def open_events_stream(
+    events_fd: Optional[int] = None, events_file: Optional[str] = None
+) -> Optional[TextIO]:
+    if events_fd is not None:
+        return os.fdopen(events_fd, "w", encoding="utf-8", buffering=1)
+    if events_file is not None:
+        return open(events_file, "a", encoding="utf-8", buffering=1)
+    return None
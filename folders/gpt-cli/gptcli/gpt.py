@@ -7,15 +7,12 @@ if sys.version_info < MIN_PYTHON:
     sys.exit("Python %s.%s or later is required.\n" % MIN_PYTHON)
 
 import os
-from typing import cast
-import openai
-import google.generativeai as genai
+from typing import List, Optional, TextIO, cast
 import argparse
 import sys
 import logging
 import datetime
-import gptcli.providers.anthropic
-import gptcli.providers.cohere
+import gptcli
 from gptcli.assistant import (
     Assistant,
     DEFAULT_ASSISTANTS,
@@ -27,16 +24,18 @@ from gptcli.cli import (
     CLIUserInputProvider,
 )
 from gptcli.composite import CompositeChatListener
+from gptcli.events import EventsChatListener, open_events_stream
+from gptcli.transcript import TranscriptChatListener, open_transcript
 from gptcli.config import (
     CONFIG_FILE_PATHS,
     GptCliConfig,
     choose_config_file,
+    init_providers,
     read_yaml_config,
 )
-from gptcli.providers.llama import init_llama_models
 from gptcli.logging import LoggingChatListener
 from gptcli.cost import PriceChatListener
-from gptcli.session import ChatSession
+from gptcli.session import ChatListener, ChatSession
 from gptcli.shell import execute, simple_response
 
 
@@ -139,6 +138,29 @@ response in a script. Ignored when the --prompt option is not specified.",
         help="Disable price logging.",
         default=config.show_price,
     )
+    parser.add_argument(
+        "--events_fd",
+        "--events-fd",
+        type=int,
+        default=None,
+        help="If specified, writes one JSON line per chat event (turn start, first token, completion, usage) \
+to this already-open file descriptor.",
+    )
+    parser.add_argument(
+        "--events_file",
+        "--events-file",
+        type=str,
+        default=None,
+        help="Like --events_fd, but appends the JSON lines to the given file.",
+    )
+    parser.add_argument(
+        "--transcript_file",
+        "--transcript-file",
+        type=str,
+        default=None,
+        help="If specified, appends every message of the chat to this file as a JSON line with its step \
+(the number of the prompt it belongs to), role and content.",
+    )
     parser.add_argument(
         "--version",
         "-v",
@@ -176,25 +198,7 @@ def main():
         # Disable overly verbose logging for markdown_it
         logging.getLogger("markdown_it").setLevel(logging.INFO)
 
-    if config.openai_base_url:
-        openai.base_url = config.openai_base_url
-
-    if config.api_key:
-        openai.api_key = config.api_key
-    elif config.openai_api_key:
-        openai.api_key = config.openai_api_key
-
-    if config.anthropic_api_key:
-        gptcli.providers.anthropic.api_key = config.anthropic_api_key
-
-    if config.cohere_api_key:
-        gptcli.providers.cohere.api_key = config.cohere_api_key
-
-    if config.google_api_key:
-        genai.configure(api_key=config.google_api_key)
-
-    if config.llama_models is not None:
-        init_llama_models(config.llama_models)
+    init_providers(config)
 
     assistant = init_assistant(cast(AssistantGlobalArgs, args), config.assistants)
 
@@ -226,11 +230,28 @@ def run_non_interactive(args, assistant):
     if "-" in args.prompt:
         args.prompt[args.prompt.index("-")] = "".join(sys.stdin.readlines())
 
-    simple_response(assistant, "\n".join(args.prompt), stream=not args.no_stream)
+    listeners: List[ChatListener] = []
+    events_stream = open_events_stream(args.events_fd, args.events_file)
+    if events_stream is not None:
+        listeners.append(EventsChatListener(events_stream))
+    transcript_stream = open_transcript(args.transcript_file)
+    if transcript_stream is not None:
+        listeners.append(TranscriptChatListener(transcript_stream))
+    listener = CompositeChatListener(listeners) if listeners else None
+    simple_response(
+        assistant, "\n".join(args.prompt), stream=not args.no_stream, listener=listener
+    )
 
 
 class CLIChatSession(ChatSession):
-    def __init__(self, assistant: Assistant, markdown: bool, show_price: bool):
+    def __init__(
+        self,
+        assistant: Assistant,
+        markdown: bool,
+        show_price: bool,
+        events_stream: Optional[TextIO] = None,
+        transcript_stream: Optional[TextIO] = None,
+    ):
         listeners = [
             CLIChatListener(markdown),
             LoggingChatListener(),
@@ -239,6 +260,12 @@ class CLIChatSession(ChatSession):
         if show_price:
             listeners.append(PriceChatListener(assistant))
 
+        if events_stream is not None:
+            listeners.append(EventsChatListener(events_stream))
+
+        if transcript_stream is not None:
+            listeners.append(TranscriptChatListener(transcript_stream))
+
         listener = CompositeChatListener(listeners)
         super().__init__(assistant, listener)
 
@@ -246,7 +273,11 @@ class CLIChatSession(ChatSession):
 def run_interactive(args, assistant):
     logger.info("Starting a new chat session. Assistant config: %s", assistant.config)
     session = CLIChatSession(
-        assistant=assistant, markdown=args.markdown, show_price=args.show_price
+        assistant=assistant,
+        markdown=args.markdown,
+        show_price=args.show_price,
+        events_stream=open_events_stream(args.events_fd, args.events_file),
+        transcript_stream=open_transcript(args.transcript_file),
     )
     history_filename = os.path.expanduser("~/.config/gpt-cli/history")
     os.makedirs(os.path.dirname(history_filename), exist_ok=True)
@@ -0,0 +1,178 @@
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from gptcli.completion import CompletionEvent
+
+# Items on an attempt queue: (attempt index, kind, value), kind is one of
+# "event", "done" or "error".
+_Item = Tuple[int, str, object]
+
+
+class _Attempt:
+    def __init__(
+        self,
+        index: int,
+        start: Callable[[], Iterator[CompletionEvent]],
+        results: "queue.Queue[_Item]",
+        on_first_event: Callable[[float], None],
+    ):
+        self.index = index
+        self.started = time.monotonic()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, args=(start, results, on_first_event), daemon=True
+        )
+        self.thread.start()
+
+    def _run(self, start, results, on_first_event):
+        try:
+            iterator = start()
+            try:
+                first = True
+                for event in iterator:
+                    if first:
+                        first = False
+                        on_first_event(time.monotonic() - self.started)
+                    if self.cancelled.is_set():
+                        break
+                    results.put((self.index, "event", event))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            results.put((self.index, "done", None))
+        except Exception as e:
+            results.put((self.index, "error", e))
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class HedgingPolicy:
+    """
+    Sends a duplicate of a completion request when the original is slower
+    than usual, and keeps whichever starts responding first.
+
+    Latency is the time until a request's first event (the first token of
+    a streamed response). Once a model has `min_samples` observations, a
+    request that has produced nothing after the `percentile` latency gets
+    one duplicate. At most `max_hedge_rate` of requests are hedged.
+
+    Hedging costs money: the prompt of a hedged request is paid for twice.
+    The losing attempt's thread cannot be interrupted, so its stream is
+    only closed at its next event; it is billed for the tokens generated
+    until then. A non-streamed loser would run to completion and be billed
+    in full, which is why Assistant only hedges streamed requests.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        max_hedge_rate: float = 0.05,
+        window: int = 500,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_rate = max_hedge_rate
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.window = window
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, model: str, seconds: float):
+        with self.lock:
+            self.latencies.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to `model`, or None to never hedge it."""
+        with self.lock:
+            samples = self.latencies.get(model)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        rank = max(1, math.ceil(self.percentile * len(ordered)))
+        return ordered[rank - 1]
+
+    def _take_hedge(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.max_hedge_rate * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def complete(
+        self, model: str, start: Callable[[], Iterator[CompletionEvent]]
+    ) -> Iterator[CompletionEvent]:
+        """
+        Run `start()` (which returns a provider's completion iterator),
+        hedging it if it is slow, and yield the winning attempt's events.
+        """
+        with self.lock:
+            self.requests += 1
+        delay = self.hedge_delay(model)
+        results: "queue.Queue[_Item]" = queue.Queue()
+        attempts: List[_Attempt] = []
+
+        def launch():
+            attempts.append(
+                _Attempt(len(attempts), start, results, lambda s: self.record(model, s))
+            )
+
+        launch()
+        try:
+            errors: Dict[int, Exception] = {}
+            while True:
+                timeout = None
+                if delay is not None:
+                    timeout = max(0.0, attempts[0].started + delay - time.monotonic())
+                try:
+                    index, kind, value = results.get(timeout=timeout)
+                except queue.Empty:
+                    delay = None
+                    if self._take_hedge():
+                        launch()
+                    continue
+
+                if kind == "error":
+                    errors[index] = value  # type: ignore
+                    # Without a duplicate in flight the error is final;
+                    # failures are retried by the caller, not hedged.
+                    if len(errors) == len(attempts):
+                        raise errors[0]
+                    delay = None
+                    continue
+                break
+
+            winner = index
+            if winner != 0:
+                with self.lock:
+                    self.hedge_wins += 1
+            for attempt in attempts:
+                if attempt.index != winner:
+                    attempt.cancel()
+
+            while kind == "event":
+                yield value  # type: ignore
+                index, kind, value = results.get()
+                while index != winner:
+                    index, kind, value = results.get()
+            if kind == "error":
+                raise value  # type: ignore
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
@@ -0,0 +1,125 @@
+import mmap
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# (byte offset, byte length) of a text cell in the TSV
+Span = Tuple[int, int]
+
+
+class Job:
+    __slots__ = ("name", "spans")
+
+    def __init__(self, name: str, spans: List[Span]):
+        self.name = name
+        self.spans = spans
+
+    @property
+    def size(self) -> int:
+        """Size in bytes of the job's raw text."""
+        return sum(length for _, length in self.spans)
+
+
+class JobTable:
+    """
+    The essays of an input TSV (first column: name, second: text), indexed
+    in one streaming pass. Only each essay's name and the byte offsets of
+    its text are kept in memory; the text is read from a memory map of the
+    TSV when a worker asks for it, so nothing is split into per-row files.
+
+    `text_column` selects what counts as the text: "rest" (everything after
+    the first tab) or "second" (up to the next tab). Rows whose name
+    appears again are either replaced by the later row (`duplicates=
+    "replace"`) or have the later text appended (`duplicates="append"`).
+    Rows without a tab or a name are ignored, as are rows whose text is only
+    whitespace when `skip_blank` is set.
+    """
+
+    def __init__(self, path: str, clean: Optional[Callable[[str], str]] = None):
+        self.path = path
+        self.clean = clean
+        self.jobs: Dict[str, Job] = {}
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    @classmethod
+    def from_tsv(
+        cls,
+        path: str,
+        skip_header: bool = True,
+        text_column: str = "rest",
+        duplicates: str = "replace",
+        skip_blank: bool = False,
+        clean: Optional[Callable[[str], str]] = None,
+    ) -> "JobTable":
+        table = cls(path, clean)
+        offset = 0
+        with open(path, "rb") as f:
+            if skip_header:
+                offset += len(f.readline())
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+
+                tab = line.find(b"\t")
+                if tab == -1:
+                    continue
+                name = line[:tab].decode("utf-8", errors="replace").strip()
+                if not name:
+                    continue
+
+                start = tab + 1
+                if text_column == "second":
+                    end = line.find(b"\t", start)
+                    end = len(line) if end == -1 else end
+                else:
+                    end = len(line)
+                if skip_blank and not line[start:end].strip():
+                    continue
+                span = (line_offset + start, end - start)
+
+                job = table.jobs.get(name)
+                if job is not None and duplicates == "append":
+                    job.spans.append(span)
+                else:
+                    table.jobs[name] = Job(name, [span])
+        table._open()
+        return table
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self.jobs.values())
+
+    def remove(self, name: str):
+        self.jobs.pop(name, None)
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        # mmap cannot map an empty file; an empty TSV has no jobs to read anyway.
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def raw_text(self, job: Job) -> str:
+        assert self._map is not None
+        return b"".join(
+            self._map[offset : offset + length] for offset, length in job.spans
+        ).decode("utf-8", errors="replace")
+
+    def text(self, job: Job) -> str:
+        text = self.raw_text(job)
+        return self.clean(text) if self.clean is not None else text
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "JobTable":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,162 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from typing import Optional, Union
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class PollingWatcher:
+    """Wakes up every `interval` seconds. Used where inotify is unavailable."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+
+    def wait(self, timeout: float):
+        time.sleep(max(0.0, min(self.interval, timeout)))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Wakes up as soon as anything in `directory` changes. The directory is
+    watched rather than the file because the file may not exist yet, or may
+    be moved away and recreated between waits.
+    """
+
+    def __init__(self, directory: str, max_wait: float = 1.0):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        # Bound every wait so a missed event (e.g. on a network share) costs
+        # at most `max_wait` seconds.
+        self.max_wait = max_wait
+
+    def wait(self, timeout: float):
+        ready, _, _ = select.select(
+            [self.fd], [], [], max(0.0, min(self.max_wait, timeout))
+        )
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(directory: str) -> Union[InotifyWatcher, PollingWatcher]:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
+
+
+class LogTailer:
+    """
+    Counts occurrences of `pattern` in a growing log file without re-reading
+    it. Only bytes appended since the last poll are scanned, so each poll
+    costs O(new bytes) regardless of the log's size. If the file is replaced
+    or truncated, counting starts again from the beginning of the new file.
+    """
+
+    def __init__(self, path: str, pattern: str, watcher=None):
+        self.path = path
+        self.pattern = pattern.encode("utf-8")
+        # Created on the first wait, so constructing a tailer is free.
+        self.watcher = watcher
+        self.count = 0
+        self.offset = 0
+        self.file_id: Optional[tuple] = None
+        # Tail of the previous read that may hold the start of a match.
+        self.carry = b""
+
+    def reset(self):
+        self.file_id = None
+        self.count = 0
+        self.offset = 0
+        self.carry = b""
+
+    def poll(self) -> int:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self.file_id is not None:
+                self.reset()
+            return self.count
+
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self.file_id or stat.st_size < self.offset:
+            self.reset()
+            self.file_id = file_id
+
+        if stat.st_size == self.offset:
+            return self.count
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                self._scan(self.carry + chunk)
+        return self.count
+
+    def _scan(self, data: bytes):
+        end = 0
+        index = data.find(self.pattern)
+        while index != -1:
+            self.count += 1
+            end = index + len(self.pattern)
+            index = data.find(self.pattern, end)
+        self.carry = data[max(end, len(data) - len(self.pattern) + 1) :]
+
+    def wait_for(self, expected_count: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.poll() >= expected_count:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.watcher is None:
+                self.watcher = make_watcher(os.path.dirname(os.path.abspath(self.path)))
+            self.watcher.wait(remaining)
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def __enter__(self) -> "LogTailer":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
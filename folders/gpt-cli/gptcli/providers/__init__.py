@@ -0,0 +1,26 @@
+import importlib
+import sys
+from types import ModuleType
+from typing import Callable, Dict, List
+
+# Provider modules import their SDKs (openai, anthropic, cohere,
+# google.generativeai), which is most of gpt's startup time, so they are only
+# imported once a model needs them. Settings for a provider that is not
+# imported yet wait here until it is.
+_pending_setup: Dict[str, List[Callable[[ModuleType], None]]] = {}
+
+
+def configure_provider(module_name: str, setup: Callable[[ModuleType], None]):
+    """Call `setup` with the provider module now if it is loaded, otherwise when load_provider loads it."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        setup(module)
+    else:
+        _pending_setup.setdefault(module_name, []).append(setup)
+
+
+def load_provider(module_name: str) -> ModuleType:
+    module = importlib.import_module(module_name)
+    for setup in _pending_setup.pop(module_name, []):
+        setup(module)
+    return module
@@ -1,5 +1,5 @@
 import os
-from typing import Iterator, List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 import anthropic
 
 from gptcli.completion import (
@@ -12,6 +12,7 @@ from gptcli.completion import (
     Pricing,
     UsageEvent,
 )
+from gptcli.providers import clients
 
 api_key = os.environ.get("ANTHROPIC_API_KEY")
 
@@ -20,63 +21,128 @@ def get_client():
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY environment variable not set")
 
-    return anthropic.Anthropic(api_key=api_key)
+    return clients.get_client(
+        "anthropic",
+        api_key,
+        lambda: anthropic.Anthropic(
+            api_key=api_key,
+            http_client=clients.http_client(
+                anthropic.DEFAULT_CONNECTION_LIMITS, anthropic.DEFAULT_TIMEOUT
+            ),
+        ),
+    )
+
+
+def get_async_client():
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+
+    return clients.get_async_client(
+        "anthropic",
+        api_key,
+        lambda: anthropic.AsyncAnthropic(
+            api_key=api_key,
+            http_client=clients.async_http_client(
+                anthropic.DEFAULT_CONNECTION_LIMITS, anthropic.DEFAULT_TIMEOUT
+            ),
+        ),
+    )
+
+
+def make_request(messages: List[Message], args: dict) -> dict:
+    kwargs = {
+        "stop_sequences": [anthropic.HUMAN_PROMPT],
+        "max_tokens": 4096,
+        "model": args["model"],
+    }
+
+    if "temperature" in args:
+        kwargs["temperature"] = args["temperature"]
+    if "top_p" in args:
+        kwargs["top_p"] = args["top_p"]
+
+    if len(messages) > 0 and messages[0]["role"] == "system":
+        kwargs["system"] = messages[0]["content"]
+        messages = messages[1:]
+
+    kwargs["messages"] = messages
+    return kwargs
+
+
+class _StreamEvents:
+    """Turns message stream events into completion events, remembering the input tokens."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.input_tokens = None
+
+    def events(self, event) -> Iterator[CompletionEvent]:
+        if event.type == "content_block_delta":
+            yield MessageDeltaEvent(event.delta.text)
+        if event.type == "message_start":
+            self.input_tokens = event.message.usage.input_tokens
+        if (
+            event.type == "message_delta"
+            and (pricing := claude_pricing(self.model))
+            and self.input_tokens
+        ):
+            yield UsageEvent.with_pricing(
+                prompt_tokens=self.input_tokens,
+                completion_tokens=event.usage.output_tokens,
+                total_tokens=self.input_tokens + event.usage.output_tokens,
+                pricing=pricing,
+            )
+
+
+def response_events(response, model: str) -> Iterator[CompletionEvent]:
+    yield MessageDeltaEvent("".join(c.text for c in response.content))
+    if pricing := claude_pricing(model):
+        yield UsageEvent.with_pricing(
+            prompt_tokens=response.usage.input_tokens,
+            completion_tokens=response.usage.output_tokens,
+            total_tokens=response.usage.input_tokens + response.usage.output_tokens,
+            pricing=pricing,
+        )
 
 
 class AnthropicCompletionProvider(CompletionProvider):
     def complete(
         self, messages: List[Message], args: dict, stream: bool = False
     ) -> Iterator[CompletionEvent]:
-        kwargs = {
-            "stop_sequences": [anthropic.HUMAN_PROMPT],
-            "max_tokens": 4096,
-            "model": args["model"],
-        }
-
-        if "temperature" in args:
-            kwargs["temperature"] = args["temperature"]
-        if "top_p" in args:
-            kwargs["top_p"] = args["top_p"]
-
-        if len(messages) > 0 and messages[0]["role"] == "system":
-            kwargs["system"] = messages[0]["content"]
-            messages = messages[1:]
-
-        kwargs["messages"] = messages
-
+        kwargs = make_request(messages, args)
         client = get_client()
-        input_tokens = None
         try:
             if stream:
+                stream_events = _StreamEvents(args["model"])
                 with client.messages.stream(**kwargs) as completion:
                     for event in completion:
-                        if event.type == "content_block_delta":
-                            yield MessageDeltaEvent(event.delta.text)
-                        if event.type == "message_start":
-                            input_tokens = event.message.usage.input_tokens
-                        if (
-                            event.type == "message_delta"
-                            and (pricing := claude_pricing(args["model"]))
-                            and input_tokens
-                        ):
-                            yield UsageEvent.with_pricing(
-                                prompt_tokens=input_tokens,
-                                completion_tokens=event.usage.output_tokens,
-                                total_tokens=input_tokens + event.usage.output_tokens,
-                                pricing=pricing,
-                            )
+                        yield from stream_events.events(event)
 
             else:
                 response = client.messages.create(**kwargs, stream=False)
-                yield MessageDeltaEvent("".join(c.text for c in response.content))
-                if pricing := claude_pricing(args["model"]):
-                    yield UsageEvent.with_pricing(
-                        prompt_tokens=response.usage.input_tokens,
-                        completion_tokens=response.usage.output_tokens,
-                        total_tokens=response.usage.input_tokens
-                        + response.usage.output_tokens,
-                        pricing=pricing,
-                    )
+                yield from response_events(response, args["model"])
+        except anthropic.BadRequestError as e:
+            raise BadRequestError(e.message) from e
+        except anthropic.APIError as e:
+            raise CompletionError(e.message) from e
+
+    async def acomplete(
+        self, messages: List[Message], args: dict, stream: bool = False
+    ) -> AsyncIterator[CompletionEvent]:
+        kwargs = make_request(messages, args)
+        client = get_async_client()
+        try:
+            if stream:
+                stream_events = _StreamEvents(args["model"])
+                async with client.messages.stream(**kwargs) as completion:
+                    async for event in completion:
+                        for completion_event in stream_events.events(event):
+                            yield completion_event
+
+            else:
+                response = await client.messages.create(**kwargs, stream=False)
+                for event in response_events(response, args["model"]):
+                    yield event
         except anthropic.BadRequestError as e:
             raise BadRequestError(e.message) from e
         except anthropic.APIError as e:
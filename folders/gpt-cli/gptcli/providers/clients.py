@@ -0,0 +1,131 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from attr import dataclass
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger("gptcli-clients")
+
+T = TypeVar("T")
+
+# SDK clients shared by every provider instance, so each request reuses the
+# connection pool (and the TLS sessions in it) of the previous one instead of
+# building a new client per call.
+_ClientCache = Dict[Tuple[str, Hashable], Any]
+_clients: _ClientCache = {}
+# httpx async connections belong to the event loop that opened them, so async
+# clients are kept per loop and go away with it.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ClientCache]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+@dataclass
+class HttpSettings:
+    """Connection pool settings for the SDK clients; None keeps the SDK's default."""
+
+    max_connections: Optional[int] = None
+    max_keepalive_connections: Optional[int] = None
+    keepalive_expiry: Optional[float] = None
+    http2: bool = False
+
+
+settings = HttpSettings()
+
+
+def configure(new_settings: HttpSettings):
+    """Use `new_settings` for clients created from now on; cached clients are dropped."""
+    global settings
+    if new_settings == settings:
+        return
+    settings = new_settings
+    clear()
+
+
+def clear():
+    with _lock:
+        _clients.clear()
+        _async_clients.clear()
+
+
+def get_client(provider: str, key: Hashable, create: Callable[[], T]) -> T:
+    """The cached client for (provider, key), e.g. the base URL and API key; created on first use."""
+    with _lock:
+        client = _clients.get((provider, key))
+        if client is None:
+            client = _clients[(provider, key)] = create()
+        return client
+
+
+def get_async_client(provider: str, key: Hashable, create: Callable[[], T]) -> T:
+    """Like get_client, for async clients used on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get((provider, key))
+        if client is None:
+            client = clients[(provider, key)] = create()
+        return client
+
+
+def _http2() -> bool:
+    if settings.http2 and importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "http2 needs the h2 package (pip install httpx[http2]); using HTTP/1.1"
+        )
+        return False
+    return settings.http2
+
+
+def _limits(default: "httpx.Limits") -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.max_connections or default.max_connections,
+        max_keepalive_connections=settings.max_keepalive_connections
+        or default.max_keepalive_connections,
+        keepalive_expiry=settings.keepalive_expiry or default.keepalive_expiry,
+    )
+
+
+def _customized() -> bool:
+    return settings != HttpSettings()
+
+
+def http_client(
+    default_limits: "httpx.Limits", timeout: Any
+) -> "Optional[httpx.Client]":
+    """An httpx client with the configured pool settings, or None to let the SDK build its own."""
+    if not _customized():
+        return None
+    import httpx
+
+    return httpx.Client(limits=_limits(default_limits), http2=_http2(), timeout=timeout)
+
+
+def async_http_client(
+    default_limits: "httpx.Limits", timeout: Any
+) -> "Optional[httpx.AsyncClient]":
+    if not _customized():
+        return None
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=_limits(default_limits), http2=_http2(), timeout=timeout
+    )
@@ -1,6 +1,7 @@
 import os
 import cohere
-from typing import Iterator, List
+import httpx
+from typing import AsyncIterator, Iterator, List, Optional
 
 from gptcli.completion import (
     CompletionEvent,
@@ -12,9 +13,13 @@ from gptcli.completion import (
     Pricing,
     UsageEvent,
 )
+from gptcli.providers import clients
 
 api_key = os.environ.get("COHERE_API_KEY")
 
+# The SDK's own default, kept when it is given a configured httpx client.
+COHERE_TIMEOUT = 300
+
 ROLE_MAP = {
     "system": "SYSTEM",
     "user": "USER",
@@ -35,86 +40,64 @@ def map_message(message: Message) -> cohere.Message:
 
 class CohereCompletionProvider(CompletionProvider):
     def __init__(self):
-        self.client = cohere.Client(api_key=api_key)
+        self.client = clients.get_client(
+            "cohere",
+            api_key,
+            lambda: cohere.Client(
+                api_key=api_key,
+                httpx_client=clients.http_client(httpx.Limits(), COHERE_TIMEOUT),
+            ),
+        )
+
+    @property
+    def async_client(self) -> cohere.AsyncClient:
+        return clients.get_async_client(
+            "cohere",
+            api_key,
+            lambda: cohere.AsyncClient(
+                api_key=api_key,
+                httpx_client=clients.async_http_client(httpx.Limits(), COHERE_TIMEOUT),
+            ),
+        )
 
     def complete(
         self, messages: List[Message], args: dict, stream: bool = False
     ) -> Iterator[CompletionEvent]:
-        kwargs = {}
-        if "temperature" in args:
-            kwargs["temperature"] = args["temperature"]
-        if "top_p" in args:
-            kwargs["p"] = args["top_p"]
-
-        model = args["model"]
+        request = make_request(messages, args)
+        try:
+            if stream:
+                response_iter = self.client.chat_stream(**request)
 
-        if messages[0]["role"] == "system":
-            kwargs["preamble"] = messages[0]["content"]
-            messages = messages[1:]
+                for response in response_iter:
+                    yield from stream_events(response, args["model"])
 
-        message = messages[-1]
-        assert message["role"] == "user", "Last message must be user message"
+            else:
+                response = self.client.chat(**request)
+                yield from response_events(response, args["model"])
 
-        chat_history = [map_message(m) for m in messages[:-1]]
+        except cohere.BadRequestError as e:
+            raise BadRequestError(e.body) from e
+        except (
+            cohere.TooManyRequestsError,
+            cohere.InternalServerError,
+            cohere.core.api_error.ApiError,  # type: ignore
+        ) as e:
+            raise CompletionError(e.body) from e
 
+    async def acomplete(
+        self, messages: List[Message], args: dict, stream: bool = False
+    ) -> AsyncIterator[CompletionEvent]:
+        request = make_request(messages, args)
         try:
             if stream:
-                response_iter = self.client.chat_stream(
-                    chat_history=chat_history,
-                    message=message["content"],
-                    model=model,
-                    **kwargs,
-                )
-
-                for response in response_iter:
-                    if response.event_type == "text-generation":
-                        yield MessageDeltaEvent(response.text)
-
-                    if (
-                        response.event_type == "stream-end"
-                        and response.response.meta
-                        and response.response.meta.tokens
-                        and (pricing := COHERE_PRICING.get(args["model"]))
-                    ):
-                        input_tokens = int(
-                            response.response.meta.tokens.input_tokens or 0
-                        )
-                        output_tokens = int(
-                            response.response.meta.tokens.output_tokens or 0
-                        )
-                        total_tokens = input_tokens + output_tokens
-
-                        yield UsageEvent.with_pricing(
-                            prompt_tokens=input_tokens,
-                            completion_tokens=output_tokens,
-                            total_tokens=total_tokens,
-                            pricing=pricing,
-                        )
+                async for response in self.async_client.chat_stream(**request):
+                    for event in stream_events(response, args["model"]):
+                        yield event
 
             else:
-                response = self.client.chat(
-                    chat_history=chat_history,
-                    message=message["content"],
-                    model=model,
-                    **kwargs,
-                )
-                yield MessageDeltaEvent(response.text)
-
-                if (
-                    response.meta
-                    and response.meta.tokens
-                    and (pricing := COHERE_PRICING.get(args["model"]))
-                ):
-                    input_tokens = int(response.meta.tokens.input_tokens or 0)
-                    output_tokens = int(response.meta.tokens.output_tokens or 0)
-                    total_tokens = input_tokens + output_tokens
-
-                    yield UsageEvent.with_pricing(
-                        prompt_tokens=input_tokens,
-                        completion_tokens=output_tokens,
-                        total_tokens=total_tokens,
-                        pricing=pricing,
-                    )
+                response = await self.async_client.chat(**request)
+                for event in response_events(response, args["model"]):
+                    yield event
 
         except cohere.BadRequestError as e:
             raise BadRequestError(e.body) from e
@@ -126,6 +109,60 @@ class CohereCompletionProvider(CompletionProvider):
             raise CompletionError(e.body) from e
 
 
+def make_request(messages: List[Message], args: dict) -> dict:
+    kwargs = {}
+    if "temperature" in args:
+        kwargs["temperature"] = args["temperature"]
+    if "top_p" in args:
+        kwargs["p"] = args["top_p"]
+
+    if messages[0]["role"] == "system":
+        kwargs["preamble"] = messages[0]["content"]
+        messages = messages[1:]
+
+    message = messages[-1]
+    assert message["role"] == "user", "Last message must be user message"
+
+    return dict(
+        chat_history=[map_message(m) for m in messages[:-1]],
+        message=message["content"],
+        model=args["model"],
+        **kwargs,
+    )
+
+
+def usage_event(meta, model: str) -> Optional[UsageEvent]:
+    if meta and meta.tokens and (pricing := COHERE_PRICING.get(model)):
+        input_tokens = int(meta.tokens.input_tokens or 0)
+        output_tokens = int(meta.tokens.output_tokens or 0)
+        total_tokens = input_tokens + output_tokens
+
+        return UsageEvent.with_pricing(
+            prompt_tokens=input_tokens,
+            completion_tokens=output_tokens,
+            total_tokens=total_tokens,
+            pricing=pricing,
+        )
+    return None
+
+
+def stream_events(response, model: str) -> Iterator[CompletionEvent]:
+    if response.event_type == "text-generation":
+        yield MessageDeltaEvent(response.text)
+
+    if response.event_type == "stream-end" and (
+        usage := usage_event(response.response.meta, model)
+    ):
+        yield usage
+
+
+def response_events(response, model: str) -> Iterator[CompletionEvent]:
+    yield MessageDeltaEvent(response.text)
+
+    if usage := usage_event(response.meta, model):
+        yield usage
+
+
 COHERE_PRICING: dict[str, Pricing] = {
     "command-r": {
         "prompt": 0.5 / 1_000_000,
@@ -1,6 +1,9 @@
+import logging
 import os
 import sys
-from typing import Iterator, List, Optional, TypedDict, cast
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypedDict, cast
 
 try:
     from llama_cpp import Completion, CompletionChunk, Llama
@@ -16,17 +19,245 @@ from gptcli.completion import (
     MessageDeltaEvent,
 )
 
+logger = logging.getLogger("gptcli-llama")
 
-class LLaMAModelConfig(TypedDict):
+
+class _LLaMAModelConfigRequired(TypedDict):
     path: str
     human_prompt: str
     assistant_prompt: str
 
 
+class LLaMAModelConfig(_LLaMAModelConfigRequired, total=False):
+    # Map the weights instead of reading them into memory (default: true).
+    use_mmap: bool
+    # Lock the weights in RAM so they are not paged out (default: true).
+    use_mlock: bool
+    # Load the model at startup instead of on its first request.
+    preload: bool
+    # Context size in tokens (default: 2048).
+    n_ctx: int
+    # Evaluated prompt states kept besides the live context, so interleaved
+    # chats can each resume from their own transcript (default: 2).
+    saved_states: int
+
+
 LLAMA_MODELS: Optional[dict[str, LLaMAModelConfig]] = None
 
 
-def init_llama_models(models: dict[str, LLaMAModelConfig]):
+def load_params(model_config: LLaMAModelConfig) -> Dict[str, Any]:
+    """The Llama() arguments besides the path; a model is cached per path and these."""
+    return {
+        "n_ctx": model_config.get("n_ctx", 2048),
+        "use_mmap": model_config.get("use_mmap", True),
+        "use_mlock": model_config.get("use_mlock", True),
+    }
+
+
+def load_llama(path: str, params: Dict[str, Any]):
+    with suppress_stderr():
+        return Llama(model_path=path, verbose=False, **params)
+
+
+def common_prefix_length(a, b) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def evaluated_tokens(llm) -> List[int]:
+    """The tokens currently evaluated in `llm`'s context."""
+    # Llama has no accessor for these; this reads the same buffer as its
+    # private `_input_ids`. Checked against llama-cpp-python 0.2.74, the
+    # version pinned by the `llama` extra.
+    return llm.input_ids[: llm.n_tokens].tolist()
+
+
+def state_size(state) -> int:
+    """Bytes held by a LlamaState: the llama.cpp context plus its tokens and logits."""
+    size = getattr(state, "llama_state_size", 0)
+    for array in (getattr(state, "input_ids", None), getattr(state, "scores", None)):
+        size += getattr(array, "nbytes", 0)
+    return size
+
+
+class SavedStates:
+    """
+    Evaluated contexts (llama.cpp states) keyed by the tokens they hold,
+    most recently used last, at most `capacity` of them. `nbytes` is their
+    total size, which ModelCache charges to the memory budget.
+    """
+
+    def __init__(self, capacity: int = 2, size: Callable[[Any], int] = state_size):
+        self.capacity = capacity
+        self.size = size
+        self.states: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self.nbytes = 0
+
+    def longest_prefix(self, tokens: List[int]) -> Tuple[int, Any]:
+        """The state sharing the longest prefix with `tokens`, and that prefix length."""
+        best, best_state = 0, None
+        for saved_tokens, state in self.states.items():
+            n = common_prefix_length(saved_tokens, tokens)
+            if n > best:
+                best, best_state = n, state
+        return best, best_state
+
+    def save(self, tokens: Tuple[int, ...], state: Any):
+        if self.capacity <= 0:
+            return
+        # A state that the new one extends is no longer needed.
+        for saved_tokens in list(self.states):
+            if tokens[: len(saved_tokens)] == saved_tokens:
+                self.nbytes -= self.size(self.states.pop(saved_tokens))
+        self.states[tokens] = state
+        self.nbytes += self.size(state)
+        while len(self.states) > self.capacity:
+            self.drop_oldest()
+
+    def drop_oldest(self):
+        _, state = self.states.popitem(last=False)
+        self.nbytes -= self.size(state)
+
+
+class PrefixStats:
+    """How much of each prompt was already evaluated in the model's context."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.prompt_tokens = 0
+        self.reused_tokens = 0
+
+    def record(self, prompt_tokens: int, reused_tokens: int):
+        self.requests += 1
+        self.hits += reused_tokens > 0
+        self.prompt_tokens += prompt_tokens
+        self.reused_tokens += reused_tokens
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+    @property
+    def token_reuse(self) -> float:
+        return self.reused_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+class CachedModel:
+    def __init__(self, llm, size: int):
+        self.llm = llm
+        self.size = size
+        # A llama.cpp context runs one completion at a time.
+        self.lock = threading.Lock()
+        self.states = SavedStates()
+        self.prefix_stats = PrefixStats()
+
+    def prepare(self, tokens: List[int]) -> int:
+        """
+        Put the context in the state that shares the longest prefix with
+        `tokens` and return that prefix length; llama.cpp then evaluates
+        only the remaining tokens.
+        """
+        # Keep the last prompt token to evaluate: its logits start the reply.
+        wanted = tokens[:-1]
+        live = common_prefix_length(evaluated_tokens(self.llm), wanted)
+        saved, state = self.states.longest_prefix(wanted)
+        if saved > live:
+            self.llm.load_state(state)
+            live = saved
+        self.prefix_stats.record(len(tokens), live)
+        return live
+
+    def save(self):
+        """Keep the context just evaluated, for a later prompt that extends it."""
+        if self.states.capacity > 0:
+            self.states.save(tuple(evaluated_tokens(self.llm)), self.llm.save_state())
+
+    @property
+    def memory(self) -> int:
+        """The weights' size plus the saved states'."""
+        return self.size + self.states.nbytes
+
+
+class ModelCache:
+    """
+    Loaded models shared by the whole process, keyed by path and load
+    parameters, so the weights are read once rather than on every request.
+    Once the models' total memory (their GGUF file sizes plus their saved
+    states) would pass `budget_bytes`, the least recently used ones are
+    dropped; the model being requested is always kept.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: Optional[int] = None,
+        load: Callable[[str, Dict[str, Any]], Any] = load_llama,
+    ):
+        self.budget_bytes = budget_bytes
+        self.load = load
+        self.models: "OrderedDict[Tuple, CachedModel]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, path: str, params: Dict[str, Any]) -> CachedModel:
+        key = (os.path.abspath(path), tuple(sorted(params.items())))
+        with self.lock:
+            model = self.models.get(key)
+            if model is not None:
+                self.models.move_to_end(key)
+                return model
+
+            size = os.path.getsize(path)
+            self._make_room(size)
+            model = CachedModel(self.load(path, params), size)
+            self.models[key] = model
+            self.loads += 1
+            return model
+
+    def fit(self, model: CachedModel):
+        """
+        Bring the total back under the budget after `model` saved a state:
+        its own oldest states go first, as they are cheaper to recompute
+        than other models are to reload. Call with `model.lock` held.
+        """
+        if self.budget_bytes is None:
+            return
+        with self.lock:
+            others = sum(m.memory for m in self.models.values() if m is not model)
+            while model.states.states and others + model.memory > self.budget_bytes:
+                model.states.drop_oldest()
+            self._make_room(0, keep=model)
+
+    def _make_room(self, size: int, keep: Optional[CachedModel] = None):
+        if self.budget_bytes is None:
+            return
+        used = sum(model.memory for model in self.models.values())
+        for key, model in list(self.models.items()):
+            if used + size <= self.budget_bytes:
+                break
+            if model is keep:
+                continue
+            del self.models[key]
+            used -= model.memory
+            # Its weights are freed once no running completion holds it.
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+
+MODEL_CACHE = ModelCache()
+
+
+def init_llama_models(
+    models: dict[str, LLaMAModelConfig], memory_budget_bytes: Optional[int] = None
+):
     if not LLAMA_AVAILABLE:
         print(
             "Error: To use llama, you need to install gpt-command-line with the llama optional dependency: \
@@ -44,6 +275,11 @@ pip install gpt-command-line[llama]."
 
     global LLAMA_MODELS
     LLAMA_MODELS = models
+    MODEL_CACHE.budget_bytes = memory_budget_bytes
+
+    for model_config in models.values():
+        if model_config.get("preload"):
+            MODEL_CACHE.get(model_config["path"], load_params(model_config))
 
 
 def role_to_name(role: str, model_config: LLaMAModelConfig) -> str:
@@ -67,6 +303,9 @@ def make_prompt(messages: List[Message], model_config: LLaMAModelConfig) -> str:
 
 
 class LLaMACompletionProvider(CompletionProvider):
+    # llama.cpp runs in-process and has no async API, so `acomplete` keeps
+    # the default: `complete` on a worker thread.
+
     def complete(
         self, messages: List[Message], args: dict, stream: bool = False
     ) -> Iterator[CompletionEvent]:
@@ -74,13 +313,7 @@ class LLaMACompletionProvider(CompletionProvider):
 
         model_config = LLAMA_MODELS[args["model"]]
 
-        with suppress_stderr():
-            llm = Llama(
-                model_path=model_config["path"],
-                n_ctx=2048,
-                verbose=False,
-                use_mlock=True,
-            )
+        model = MODEL_CACHE.get(model_config["path"], load_params(model_config))
         prompt = make_prompt(messages, model_config)
         print(prompt)
 
@@ -90,19 +323,44 @@ class LLaMACompletionProvider(CompletionProvider):
         if "top_p" in args:
             extra_args["top_p"] = args["top_p"]
 
-        gen = llm.create_completion(
-            prompt,
-            max_tokens=1024,
-            stop=model_config["human_prompt"],
-            stream=stream,
-            echo=False,
-            **extra_args,
-        )
-        if stream:
-            for x in cast(Iterator[CompletionChunk], gen):
-                yield MessageDeltaEvent(x["choices"][0]["text"])
-        else:
-            yield MessageDeltaEvent(cast(Completion, gen)["choices"][0]["text"])
+        with model.lock:
+            model.states.capacity = model_config.get("saved_states", 2)
+            # Tokenized as create_completion does.
+            tokens = model.llm.tokenize(prompt.encode("utf-8"), special=True)
+            reused = model.prepare(tokens)
+            stats = model.prefix_stats
+            logger.info(
+                "LLaMA prompt: %d of %d tokens already evaluated (prefix hits %d/%d, %.0f%% of tokens)",
+                reused,
+                len(tokens),
+                stats.hits,
+                stats.requests,
+                stats.token_reuse * 100,
+            )
+
+            gen = model.llm.create_completion(
+                prompt,
+                max_tokens=1024,
+                stop=model_config["human_prompt"],
+                stream=stream,
+                echo=False,
+                **extra_args,
+            )
+            if stream:
+                for x in cast(Iterator[CompletionChunk], gen):
+                    yield MessageDeltaEvent(x["choices"][0]["text"])
+            else:
+                yield MessageDeltaEvent(cast(Completion, gen)["choices"][0]["text"])
+            model.save()
+            MODEL_CACHE.fit(model)
+
+
+def prefix_stats() -> Dict[str, PrefixStats]:
+    """Prefix reuse of each loaded model, by model path."""
+    with MODEL_CACHE.lock:
+        return {
+            path: model.prefix_stats for (path, _), model in MODEL_CACHE.models.items()
+        }
 
 
 # https://stackoverflow.com/a/50438156
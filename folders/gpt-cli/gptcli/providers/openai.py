@@ -1,8 +1,12 @@
 import re
-from typing import Iterator, List, Optional, cast
+from typing import AsyncIterator, Iterator, List, Optional, cast
 import openai
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessageParam
+from openai import DEFAULT_CONNECTION_LIMITS, DEFAULT_TIMEOUT, AsyncOpenAI, OpenAI
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionChunk,
+    ChatCompletionMessageParam,
+)
 
 from gptcli.completion import (
     CompletionEvent,
@@ -14,73 +18,146 @@ from gptcli.completion import (
     Pricing,
     UsageEvent,
 )
+from gptcli.providers import clients
 
 
 class OpenAICompletionProvider(CompletionProvider):
     def __init__(self):
-        self.client = OpenAI(api_key=openai.api_key, base_url=openai.base_url)
+        self.client = clients.get_client(
+            "openai",
+            (openai.api_key, openai.base_url),
+            lambda: OpenAI(
+                api_key=openai.api_key,
+                base_url=openai.base_url,
+                http_client=clients.http_client(
+                    DEFAULT_CONNECTION_LIMITS, DEFAULT_TIMEOUT
+                ),
+            ),
+        )
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return clients.get_async_client(
+            "openai",
+            (self.client.api_key, str(self.client.base_url)),
+            lambda: AsyncOpenAI(
+                api_key=self.client.api_key,
+                base_url=self.client.base_url,
+                http_client=clients.async_http_client(
+                    DEFAULT_CONNECTION_LIMITS, DEFAULT_TIMEOUT
+                ),
+            ),
+        )
 
     def complete(
         self, messages: List[Message], args: dict, stream: bool = False
     ) -> Iterator[CompletionEvent]:
-        kwargs = {}
-        if "temperature" in args:
-            kwargs["temperature"] = args["temperature"]
-        if "top_p" in args:
-            kwargs["top_p"] = args["top_p"]
-
-        model = args["model"]
-        if model.startswith("oai-compat:"):
-            model = model[len("oai-compat:") :]
-
+        request = make_request(messages, args)
         try:
             if stream:
                 response_iter = self.client.chat.completions.create(
-                    messages=cast(List[ChatCompletionMessageParam], messages),
                     stream=True,
-                    model=model,
                     stream_options={"include_usage": True},
-                    **kwargs,
+                    **request,
                 )
 
                 for response in response_iter:
-                    if (
-                        len(response.choices) > 0
-                        and response.choices[0].finish_reason is None
-                        and response.choices[0].delta.content
-                    ):
-                        yield MessageDeltaEvent(response.choices[0].delta.content)
-
-                    if response.usage and (pricing := gpt_pricing(args["model"])):
-                        yield UsageEvent.with_pricing(
-                            prompt_tokens=response.usage.prompt_tokens,
-                            completion_tokens=response.usage.completion_tokens,
-                            total_tokens=response.usage.total_tokens,
-                            pricing=pricing,
-                        )
+                    yield from chunk_events(response, args["model"])
             else:
                 response = self.client.chat.completions.create(
-                    messages=cast(List[ChatCompletionMessageParam], messages),
-                    model=model,
                     stream=False,
-                    **kwargs,
+                    **request,
                 )
-                next_choice = response.choices[0]
-                if next_choice.message.content:
-                    yield MessageDeltaEvent(next_choice.message.content)
-                if response.usage and (pricing := gpt_pricing(args["model"])):
-                    yield UsageEvent.with_pricing(
-                        prompt_tokens=response.usage.prompt_tokens,
-                        completion_tokens=response.usage.completion_tokens,
-                        total_tokens=response.usage.total_tokens,
-                        pricing=pricing,
-                    )
+                yield from response_events(response, args["model"])
 
         except openai.BadRequestError as e:
             raise BadRequestError(e.message) from e
         except openai.APIError as e:
             raise CompletionError(e.message) from e
 
+    async def acomplete(
+        self, messages: List[Message], args: dict, stream: bool = False
+    ) -> AsyncIterator[CompletionEvent]:
+        request = make_request(messages, args)
+        try:
+            if stream:
+                response_iter = await self.async_client.chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **request,
+                )
+
+                # Closing the stream drops the connection if the caller
+                # stops reading early.
+                async with response_iter:
+                    async for response in response_iter:
+                        for event in chunk_events(response, args["model"]):
+                            yield event
+            else:
+                response = await self.async_client.chat.completions.create(
+                    stream=False,
+                    **request,
+                )
+                for event in response_events(response, args["model"]):
+                    yield event
+
+        except openai.BadRequestError as e:
+            raise BadRequestError(e.message) from e
+        except openai.APIError as e:
+            raise CompletionError(e.message) from e
+
+
+def make_request(messages: List[Message], args: dict) -> dict:
+    kwargs = {}
+    if "temperature" in args:
+        kwargs["temperature"] = args["temperature"]
+    if "top_p" in args:
+        kwargs["top_p"] = args["top_p"]
+    if "response_format" in args:
+        kwargs["response_format"] = args["response_format"]
+
+    model = args["model"]
+    if model.startswith("oai-compat:"):
+        model = model[len("oai-compat:") :]
+
+    return dict(
+        messages=cast(List[ChatCompletionMessageParam], messages),
+        model=model,
+        **kwargs,
+    )
+
+
+def chunk_events(
+    response: ChatCompletionChunk, model: str
+) -> Iterator[CompletionEvent]:
+    if (
+        len(response.choices) > 0
+        and response.choices[0].finish_reason is None
+        and response.choices[0].delta.content
+    ):
+        yield MessageDeltaEvent(response.choices[0].delta.content)
+
+    if response.usage and (pricing := gpt_pricing(model)):
+        yield UsageEvent.with_pricing(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+            pricing=pricing,
+        )
+
+
+def response_events(response: ChatCompletion, model: str) -> Iterator[CompletionEvent]:
+    next_choice = response.choices[0]
+    if next_choice.message.content:
+        yield MessageDeltaEvent(next_choice.message.content)
+    if response.usage and (pricing := gpt_pricing(model)):
+        yield UsageEvent.with_pricing(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+            pricing=pricing,
+        )
+
 
 GPT_3_5_TURBO_PRICE_PER_TOKEN: Pricing = {
     "prompt": 0.50 / 1_000_000,
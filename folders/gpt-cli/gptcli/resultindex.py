@@ -0,0 +1,124 @@
+import csv
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Dict, Iterator, Optional
+
+# Bytes before the indexed offset that are fingerprinted, to notice a CSV
+# that was rewritten (e.g. by cleaner.py) rather than appended to.
+_FINGERPRINT_BYTES = 4096
+
+
+class ResultIndex:
+    """
+    Number of rows per essay (first column) in an append-only results CSV.
+
+    `refresh()` parses only the rows appended since the last refresh, so
+    `count()` stays O(1) however large the CSV grows. The counts and the
+    byte offset they cover are kept in a sidecar file (`<csv>.index.json`
+    by default); on restart only the rows after that offset are read. If
+    the CSV no longer matches the sidecar (it shrank or its content before
+    the offset changed), the index is rebuilt from the start.
+
+    A last row that is still being written (no line break yet) is left for
+    the next refresh.
+    """
+
+    def __init__(self, csv_path: str, index_path: Optional[str] = None):
+        self.csv_path = csv_path
+        self.index_path = index_path or f"{csv_path}.index.json"
+        self.counts: Dict[str, int] = Counter()
+        self.offset = 0
+        self.fingerprint = self._fingerprint(0)
+        self.rebuilds = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            offset, fingerprint, counts = (
+                saved["offset"],
+                saved["fingerprint"],
+                saved["counts"],
+            )
+        except (OSError, ValueError, KeyError):
+            return
+        if self._fingerprint(offset) == fingerprint:
+            self.offset = offset
+            self.fingerprint = fingerprint
+            self.counts = Counter(counts)
+        else:
+            self.rebuilds += 1
+
+    def _fingerprint(self, offset: int) -> Optional[str]:
+        try:
+            with open(self.csv_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < offset:
+                    return None
+                start = max(0, offset - _FINGERPRINT_BYTES)
+                f.seek(start)
+                return hashlib.sha1(f.read(offset - start)).hexdigest()
+        except OSError:
+            return None
+
+    def refresh(self) -> int:
+        """Index the rows appended since the last refresh; returns how many were added."""
+        if self.offset and self._fingerprint(self.offset) != self.fingerprint:
+            # The CSV was rewritten rather than appended to: start again.
+            self.counts = Counter()
+            self.offset = 0
+            self.rebuilds += 1
+        if not os.path.exists(self.csv_path):
+            return 0
+
+        added = 0
+        with open(self.csv_path, "rb") as f:
+            f.seek(self.offset)
+            lines = _LineReader(f)
+            for row in csv.reader(lines):
+                if not lines.complete:
+                    break  # The row's last line has no line break yet.
+                if row and row[0]:
+                    self.counts[row[0]] += 1
+                    added += 1
+                self.offset += lines.consumed
+                lines.consumed = 0
+        self.fingerprint = self._fingerprint(self.offset)
+        self._save()
+        return added
+
+    def _save(self):
+        saved = {
+            "offset": self.offset,
+            "fingerprint": self.fingerprint,
+            "counts": self.counts,
+        }
+        temporary_path = f"{self.index_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.replace(temporary_path, self.index_path)
+
+    def count(self, name: str) -> int:
+        return self.counts.get(name, 0)
+
+
+class _LineReader:
+    """Yields decoded lines to csv.reader and counts the bytes it hands out."""
+
+    def __init__(self, f):
+        self.f = f
+        self.consumed = 0
+        self.complete = True
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.consumed += len(line)
+        self.complete = line.endswith(b"\n")
+        return line.decode("utf-8", errors="replace")
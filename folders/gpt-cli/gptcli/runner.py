@@ -0,0 +1,175 @@
+import logging
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from gptcli.assistant import Assistant, AssistantGlobalArgs, init_assistant
+from gptcli.completion import Message
+from gptcli.config import (
+    CONFIG_FILE_PATHS,
+    GptCliConfig,
+    choose_config_file,
+    init_providers,
+    read_yaml_config,
+)
+
+logger = logging.getLogger("gptcli-runner")
+
+Key = TypeVar("Key")
+
+# Returns why a response is unusable, or None to accept it.
+Validator = Callable[[str], Optional[str]]
+
+
+class InvalidResponse(Exception):
+    """A response the validator rejected."""
+
+    def __init__(self, reason: str, response: str):
+        super().__init__(reason)
+        self.reason = reason
+        self.response = response
+
+
+class AttemptLimitReached(Exception):
+    """A prompt was not sent because its key had used up its attempts."""
+
+
+def load_assistant(
+    assistant_name: Optional[str] = None, model: Optional[str] = None
+) -> Assistant:
+    """
+    Build the assistant the same way `gpt <assistant_name> --model <model>`
+    does, reading API keys and assistants from the gpt-cli config file.
+    Without a name, the config's default assistant is used.
+    """
+    config_file_path = choose_config_file(CONFIG_FILE_PATHS)
+    if config_file_path:
+        config = read_yaml_config(config_file_path)
+    else:
+        config = GptCliConfig()
+    init_providers(config)
+    return init_assistant(
+        AssistantGlobalArgs(assistant_name or config.default_assistant, model=model),
+        config.assistants,
+    )
+
+
+def complete_prompt(assistant: Assistant, prompt: str) -> str:
+    """
+    What `gpt -p <prompt>` prints, without starting a process: a one-off
+    conversation of the assistant's messages and `prompt`.
+    """
+    messages = assistant.init_messages()
+    user_message: Message = {"role": "user", "content": prompt}
+    messages.append(user_message)
+    logger.info("User: %s", prompt)
+    result = ""
+    for response in assistant.complete_chat(messages, stream=True):
+        if response.type == "message_delta":
+            result += response.text
+    logger.info("Assistant: %s", result)
+    return result
+
+
+class PromptPool:
+    """
+    Sends one-off prompts to a shared assistant from `concurrency` worker
+    threads. A worker waits `pause` seconds after each request, for
+    providers with tight rate limits.
+
+    `failures` counts every failed attempt by reason: the validator's reason
+    for a rejected response, or the exception type for a failed request.
+    """
+
+    def __init__(self, assistant: Assistant, concurrency: int = 1, pause: float = 0):
+        self.assistant = assistant
+        self.concurrency = concurrency
+        self.pause = pause
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.failures: Counter = Counter()
+
+    def _complete(self, prompt: str) -> str:
+        try:
+            return complete_prompt(self.assistant, prompt)
+        finally:
+            if self.pause:
+                time.sleep(self.pause)
+
+    def submit(self, prompt: str) -> "Future[str]":
+        """Start completing `prompt` on a worker; the future holds the response."""
+        return self.executor.submit(self._complete, prompt)
+
+    def map(
+        self,
+        prompts: Iterable[Tuple[Key, str]],
+        validate: Optional[Validator] = None,
+        max_attempts: int = 1,
+    ) -> Iterator[Tuple[Key, Optional[str], Optional[Exception]]]:
+        """
+        Complete every (key, prompt) and yield (key, response, None) or
+        (key, None, error) as each one finishes. `prompts` is consumed lazily,
+        keeping only about `concurrency` prompts in flight.
+
+        Each response is passed to `validate` as soon as it arrives. A
+        rejected response or a failed request is sent again straight away,
+        ahead of new prompts, until its key has used `max_attempts` requests
+        (shared by all prompts with that key); then the last error is
+        yielded, as an InvalidResponse for a rejected response. Prompts of a
+        key that has no attempts left yield AttemptLimitReached unsent.
+        """
+        pending: Dict[Future, Tuple[Key, str]] = {}
+        retries: Deque[Tuple[Key, str]] = deque()
+        attempts: Counter = Counter()
+        prompts = iter(prompts)
+        exhausted = False
+        while True:
+            while len(pending) < self.concurrency:
+                if retries:
+                    key, prompt = retries.popleft()
+                elif not exhausted:
+                    try:
+                        key, prompt = next(prompts)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                else:
+                    break
+                if attempts[key] >= max_attempts:
+                    yield key, None, AttemptLimitReached(
+                        f"{max_attempts} attempts used for {key}"
+                    )
+                    continue
+                attempts[key] += 1
+                pending[self.submit(prompt)] = (key, prompt)
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, prompt = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    response = future.result()
+                    reason = validate(response) if validate is not None else None
+                    if reason is None:
+                        yield key, response, None
+                        continue
+                    error = InvalidResponse(reason, response)
+                    self.failures[reason] += 1
+                    logger.warning("Response for %s rejected: %s", key, reason)
+                else:
+                    self.failures[type(error).__name__] += 1
+                    logger.warning("Request for %s failed: %s", key, error)
+                if attempts[key] < max_attempts:
+                    retries.append((key, prompt))
+                else:
+                    yield key, None, error
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> "PromptPool":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
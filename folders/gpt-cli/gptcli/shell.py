@@ -3,26 +3,50 @@ import logging
 import sys
 import subprocess
 import tempfile
+from typing import Optional
 from gptcli.assistant import Assistant
+from gptcli.completion import CompletionError, Message, UsageEvent
+from gptcli.session import ChatListener
 
 
-def simple_response(assistant: Assistant, prompt: str, stream: bool) -> None:
+def simple_response(
+    assistant: Assistant,
+    prompt: str,
+    stream: bool,
+    listener: Optional[ChatListener] = None,
+) -> None:
+    listener = listener or ChatListener()
     messages = assistant.init_messages()
-    messages.append({"role": "user", "content": prompt})
+    user_message: Message = {"role": "user", "content": prompt}
+    messages.append(user_message)
     logging.info("User: %s", prompt)
-    response_iter = assistant.complete_chat(messages, stream=stream)
+    listener.on_chat_message(user_message)
     result = ""
+    usage: Optional[UsageEvent] = None
     try:
-        for response in response_iter:
-            if response.type == "message_delta":
-                result += response.text
-                sys.stdout.write(response.text)
+        response_iter = assistant.complete_chat(messages, stream=stream)
+        with listener.response_streamer() as streamer:
+            for response in response_iter:
+                if response.type == "message_delta":
+                    result += response.text
+                    sys.stdout.write(response.text)
+                    streamer.on_next_token(response.text)
+                elif response.type == "usage":
+                    usage = response
     except KeyboardInterrupt:
         pass
+    except CompletionError as e:
+        # Still fails the run, but the events stream says why.
+        listener.on_error(e)
+        raise
     finally:
         sys.stdout.flush()
         logging.info("Assistant: %s", result)
 
+    next_message: Message = {"role": "assistant", "content": result}
+    listener.on_chat_message(next_message)
+    listener.on_chat_response(messages, next_message, {}, usage)
+
 
 def execute(assistant: Assistant, prompt: str) -> None:
     messages = assistant.init_messages()
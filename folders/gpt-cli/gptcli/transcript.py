@@ -0,0 +1,66 @@
+import json
+import os
+from typing import Dict, List, Optional, TextIO
+
+from gptcli.completion import Message
+from gptcli.session import ChatListener
+
+
+class TranscriptChatListener(ChatListener):
+    """
+    Writes every message of a chat to `stream` as one JSON object per line:
+    {"step": N, "role": ..., "content": ...}. `step` is the 1-based index of
+    the user message a record belongs to, so the reply to the Nth prompt is
+    the assistant record with step N. Clearing the conversation starts the
+    count again.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.step = 0
+
+    def on_chat_clear(self):
+        self.step = 0
+
+    def on_chat_message(self, message: Message):
+        if message["role"] == "user":
+            self.step += 1
+        record = {
+            "step": self.step,
+            "role": message["role"],
+            "content": message["content"],
+        }
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+
+def open_transcript(path: Optional[str]) -> Optional[TextIO]:
+    if path is None:
+        return None
+    return open(path, "a", encoding="utf-8", buffering=1)
+
+
+def read_transcript(path: str) -> List[Dict]:
+    """
+    Read the records written by TranscriptChatListener. A truncated last
+    line (the writer was killed mid-write) is ignored.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def assistant_responses(records: List[Dict]) -> Dict[int, str]:
+    """Map each step to its assistant reply; a re-run step keeps its latest reply."""
+    responses = {}
+    for record in records:
+        if record.get("role") == "assistant":
+            responses[record["step"]] = record["content"]
+    return responses
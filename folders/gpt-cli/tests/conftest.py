@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+
+GPT_CLI = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+# The gpt-multi scripts (chain.py, results.py, ...) are imported as
+# top-level modules, as fiver.py does.
+GPT_MULTI = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "gpt-multi")
+)
+if GPT_MULTI not in sys.path:
+    sys.path.insert(0, GPT_MULTI)
+
+
+def import_script(folder, name):
+    """
+    Import the script `name`.py of `folder` (GPT_CLI or GPT_MULTI) by path:
+    both folders have a fiver.py and a gptrunner.py, and pytest puts
+    folders/gpt-cli first on sys.path.
+    """
+    module_name = f"{os.path.basename(folder)}_{name}".replace("-", "_")
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            module_name, os.path.join(folder, f"{name}.py")
+        )
+        sys.modules[module_name] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(sys.modules[module_name])
+    return sys.modules[module_name]
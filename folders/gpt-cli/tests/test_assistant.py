@@ -1,3 +1,4 @@
+from unittest import mock
 import pytest
 from gptcli.assistant import AssistantGlobalArgs, init_assistant
 
@@ -71,3 +72,16 @@ def test_init_assistant(args, custom_assistants, expected_config):
     assert assistant.config.get("model") == expected_config.get("model")
     assert assistant.config.get("temperature") == expected_config.get("temperature")
     assert assistant.config.get("top_p") == expected_config.get("top_p")
+
+
+def test_complete_chat_passes_response_format():
+    assistant = init_assistant(AssistantGlobalArgs("dev", model="gpt-4o"), {})
+    response_format = {"type": "json_object"}
+    with mock.patch("gptcli.assistant.get_completion_provider") as get_provider:
+        assistant.complete_chat([], stream=False, response_format=response_format)
+        assistant.complete_chat([], stream=False)
+
+    (_, with_format, _), _ = get_provider.return_value.complete.call_args_list[0]
+    (_, without_format, _), _ = get_provider.return_value.complete.call_args_list[1]
+    assert with_format["response_format"] == response_format
+    assert "response_format" not in without_format
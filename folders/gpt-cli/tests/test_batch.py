@@ -0,0 +1,227 @@
+import email
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from gptcli.batch import (
+    AnthropicBatchBackend,
+    BatchRequest,
+    OpenAIBatchBackend,
+    wait_for_batch,
+)
+
+
+def reply(params):
+    """The stand-in model echoes the last user message; "fail" fails."""
+    prompt = params["messages"][-1]["content"]
+    return None if prompt == "fail" else f"echo: {prompt}"
+
+
+class BatchServer(BaseHTTPRequestHandler):
+    """Just enough of the OpenAI batch and Anthropic message batch APIs; a batch ends on its second poll."""
+
+    files = {}
+    batches = {}
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_lines(self, lines):
+        data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers["Content-Length"]))
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            form = email.message_from_bytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                + self.read_body()
+            )
+            (upload,) = [
+                part
+                for part in form.get_payload()
+                if part.get_param("name", header="content-disposition") == "file"
+            ]
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = [
+                json.loads(line)
+                for line in upload.get_payload(decode=True).splitlines()
+            ]
+            self.send_json(
+                {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": 0,
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                }
+            )
+        elif self.path == "/v1/batches":
+            body = json.loads(self.read_body())
+            assert body["endpoint"] == "/v1/chat/completions"
+            output, errors = [], []
+            for line in self.files[body["input_file_id"]]:
+                content = reply(line["body"])
+                if content is None:
+                    errors.append(
+                        {
+                            "custom_id": line["custom_id"],
+                            "response": {
+                                "status_code": 400,
+                                "body": {"error": {"message": "bad prompt"}},
+                            },
+                        }
+                    )
+                else:
+                    output.append(
+                        {
+                            "custom_id": line["custom_id"],
+                            "response": {
+                                "status_code": 200,
+                                "body": {
+                                    "choices": [{"message": {"content": content}}]
+                                },
+                            },
+                        }
+                    )
+            self.files["file-out"], self.files["file-err"] = output, errors
+            self.batches["batch-1"] = {"polls": 0}
+            self.send_json(self.openai_batch("batch-1"))
+        elif self.path == "/v1/messages/batches":
+            assert self.headers["anthropic-beta"].startswith("message-batches")
+            body = json.loads(self.read_body())
+            results = []
+            for request in body["requests"]:
+                content = reply(request["params"])
+                if content is None:
+                    result = {
+                        "type": "errored",
+                        "error": {"type": "invalid_request_error"},
+                    }
+                else:
+                    result = {
+                        "type": "succeeded",
+                        "message": {"content": [{"type": "text", "text": content}]},
+                    }
+                results.append({"custom_id": request["custom_id"], "result": result})
+            self.batches["msgbatch-1"] = {"polls": 0, "results": results}
+            self.send_json(self.anthropic_batch("msgbatch-1"))
+
+    def do_GET(self):
+        if self.path.startswith("/v1/batches/"):
+            batch_id = self.path.rsplit("/", 1)[1]
+            self.batches[batch_id]["polls"] += 1
+            self.send_json(self.openai_batch(batch_id))
+        elif self.path.startswith("/v1/files/"):
+            self.send_lines(self.files[self.path.split("/")[3]])
+        elif self.path.endswith("/results"):
+            self.send_lines(self.batches[self.path.split("/")[4]]["results"])
+        elif self.path.startswith("/v1/messages/batches/"):
+            batch_id = self.path.rsplit("/", 1)[1]
+            self.batches[batch_id]["polls"] += 1
+            self.send_json(self.anthropic_batch(batch_id))
+
+    def openai_batch(self, batch_id):
+        ended = self.batches[batch_id]["polls"] >= 2
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-0",
+            "completion_window": "24h",
+            "created_at": 0,
+            "status": "completed" if ended else "in_progress",
+            "output_file_id": "file-out" if ended else None,
+            "error_file_id": "file-err" if ended else None,
+            "request_counts": {
+                "total": 2,
+                "completed": 1 if ended else 0,
+                "failed": 1 if ended else 0,
+            },
+        }
+
+    def anthropic_batch(self, batch_id):
+        ended = self.batches[batch_id]["polls"] >= 2
+        host = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return {
+            "id": batch_id,
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else 2,
+                "succeeded": 1 if ended else 0,
+            },
+            "results_url": (
+                f"{host}/v1/messages/batches/{batch_id}/results" if ended else None
+            ),
+        }
+
+
+@pytest.fixture
+def server():
+    BatchServer.files, BatchServer.batches = {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+REQUESTS = [
+    BatchRequest(
+        "0-1-0",
+        [{"role": "system", "content": "Grade."}, {"role": "user", "content": "essay"}],
+        {"model": "gpt-4o", "temperature": 0},
+    ),
+    BatchRequest("1-1-0", [{"role": "user", "content": "fail"}], {"model": "gpt-4o"}),
+]
+
+
+def round_trip(backend):
+    batch_id = backend.submit(REQUESTS)
+    polls = []
+    status = wait_for_batch(backend, batch_id, poll_interval=0, on_poll=polls.append)
+    assert [poll.ended for poll in polls] == [False, True]
+    assert status.ended
+    return {result.custom_id: result for result in backend.results(batch_id)}
+
+
+def test_openai_batch_round_trip(server, tmp_path):
+    client = openai.OpenAI(api_key="sk-test", base_url=f"{server}/v1")
+    backend = OpenAIBatchBackend(client, work_dir=str(tmp_path))
+    results = round_trip(backend)
+
+    assert results["0-1-0"].content == "echo: essay"
+    assert results["1-1-0"].content is None and "bad prompt" in results["1-1-0"].error
+    first = BatchServer.files["file-0"][0]
+    assert first["url"] == "/v1/chat/completions"
+    assert first["body"]["messages"][0] == {"role": "system", "content": "Grade."}
+    # The local copy of the uploaded requests is removed.
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_anthropic_batch_round_trip(server):
+    backend = AnthropicBatchBackend(api_key="sk-ant-test", base_url=server)
+    results = round_trip(backend)
+
+    assert results["0-1-0"].content == "echo: essay"
+    assert results["1-1-0"].content is None
+    assert "invalid_request_error" in results["1-1-0"].error
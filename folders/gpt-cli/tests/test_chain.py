@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from chain import ChainCheckpoint, ChainError, ChainStepStalled, PromptChain
+from gptcli.completion import CompletionError, MessageDeltaEvent
+
+system_message = {"role": "system", "content": "system message"}
+
+
+def setup_chain(reply, **kwargs):
+    """A two-prompt chain whose assistant answers with `reply(messages)`, an iterator of tokens."""
+    assistant_mock = mock.MagicMock()
+    assistant_mock.config = {"model": "gpt-4o"}
+    assistant_mock.init_messages.return_value = [system_message]
+    assistant_mock.complete_chat.side_effect = lambda messages, **_: (
+        MessageDeltaEvent(token) for token in reply(list(messages))
+    )
+    return (
+        PromptChain(assistant_mock, ["first", "second"], "delimit.", **kwargs),
+        assistant_mock,
+    )
+
+
+def run(chain, checkpoint=None, on_step=None):
+    return asyncio.run(chain.run("the essay", checkpoint=checkpoint, on_step=on_step))
+
+
+def sent_prompts(assistant_mock):
+    return [
+        call.args[0][-1]["content"]
+        for call in assistant_mock.complete_chat.call_args_list
+    ]
+
+
+def test_checkpoint_is_kept_only_for_the_same_conversation(tmp_path):
+    path = str(tmp_path / "a.checkpoint.json")
+    messages = [
+        system_message,
+        {"role": "user", "content": "p"},
+        {"role": "assistant", "content": "r"},
+    ]
+    ChainCheckpoint(path, "fingerprint").save(messages, ["r"])
+
+    resumed = ChainCheckpoint(path, "fingerprint")
+    assert (resumed.messages, resumed.responses) == (messages, ["r"])
+    assert ChainCheckpoint(path, "other essay").responses == []
+
+    resumed.clear()
+    assert not (tmp_path / "a.checkpoint.json").exists()
+
+
+def test_a_failed_step_resumes_from_the_checkpoint(tmp_path):
+    failures = [CompletionError("overloaded")]
+
+    def reply(messages):
+        if messages[-1]["content"] == "delimit. second" and failures:
+            raise failures.pop()
+        yield f"<<start>>reply {len(messages)}<<end>>"
+
+    chain, assistant_mock = setup_chain(reply)
+    checkpoint = ChainCheckpoint(
+        str(tmp_path / "a.checkpoint.json"), chain.fingerprint("the essay")
+    )
+    steps = []
+    with pytest.raises(ChainError):
+        run(
+            chain,
+            checkpoint,
+            on_step=lambda step, status, seconds: steps.append((step, status)),
+        )
+    assert checkpoint.responses == ["reply 2"]
+
+    # A new run (e.g. after a crash) picks up the saved conversation.
+    resumed = ChainCheckpoint(checkpoint.path, chain.fingerprint("the essay"))
+    assert run(
+        chain,
+        resumed,
+        on_step=lambda step, status, seconds: steps.append((step, status)),
+    ) == [
+        "reply 2",
+        "reply 4",
+    ]
+    assert sent_prompts(assistant_mock) == [
+        "delimit. first the essay",
+        "delimit. second",
+        "delimit. second",
+    ]
+    retried = assistant_mock.complete_chat.call_args_list[-1].args[0]
+    assert [message["role"] for message in retried] == [
+        "system",
+        "user",
+        "assistant",
+        "user",
+    ]
+    assert steps == [("prompt01", "done"), ("prompt02", "failed"), ("prompt02", "done")]
+
+
+def test_a_stalled_stream_is_abandoned_and_retried(tmp_path):
+    release = threading.Event()
+    stalls = [True]
+
+    def reply(messages):
+        yield "<<start>>partial "
+        if stalls:
+            stalls.pop()
+            # No more tokens until the chain has given up on the step.
+            release.wait(10)
+        yield "reply<<end>>"
+
+    chain, assistant_mock = setup_chain(reply, step_timeout=30, stall_timeout=0.05)
+    record_stall = chain.timeouts.record_stall
+    # Let the abandoned stream go on as soon as the stall is detected.
+    chain.timeouts.record_stall = lambda *args: (record_stall(*args), release.set())
+    checkpoint = ChainCheckpoint(
+        str(tmp_path / "a.checkpoint.json"), chain.fingerprint("the essay")
+    )
+    with pytest.raises(ChainStepStalled):
+        run(chain, checkpoint)
+    assert chain.timeouts.stalls == {"gpt-4o/prompt01": 1}
+
+    assert run(chain, checkpoint) == ["partial reply", "partial reply"]
+    assert sent_prompts(assistant_mock)[1] == "delimit. first the essay"
+
+
+def test_waiting_for_the_first_token_is_not_a_stall():
+    def reply(messages):
+        # Far longer than stall_timeout before anything arrives.
+        time.sleep(0.3)
+        yield "<<start>>slow start<<end>>"
+
+    chain, _ = setup_chain(reply, step_timeout=30, stall_timeout=0.05)
+    assert run(chain) == ["slow start", "slow start"]
+    assert chain.timeouts.stalls == {}
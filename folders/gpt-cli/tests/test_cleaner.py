@@ -0,0 +1,36 @@
+import csv
+
+from cleaner import clean_row, filter_rows, first_violation, is_valid_row, markers_in
+
+
+def test_markers_in_finds_every_delimiter_family():
+    assert markers_in(["score @1@ and !!12!!", "#999# ₩4₩ @1234@ ^^"]) == {
+        "@",
+        "!",
+        "#",
+        "₩",
+    }
+    assert markers_in(["@@@", "a response without markers " * 1000]) == set()
+
+
+def test_is_valid_row_uses_cleaned_cells():
+    assert is_valid_row(clean_row(["a.txt", "Score: @@3@@"]))
+    assert not is_valid_row(clean_row(["a.txt", "Put the score between two @ symbols"]))
+    assert first_violation(["@1@ !2!"], "@!#") == "#"
+
+
+def test_filter_rows_counts_each_row_against_its_first_failure(tmp_path):
+    path = str(tmp_path / "results.csv")
+    rows = [
+        ["a.txt", "@1@ !1!"],
+        ["b.txt", "!1!"],
+        ["c.txt", "@1@"],
+        ["d.txt", "nothing"],
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+    total_lines, removed_lines, violations = filter_rows(path, "@!")
+    assert (total_lines, removed_lines, violations) == (4, 3, {"@": 2, "!": 1})
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["a.txt", "@1@ !1!"]]
@@ -0,0 +1,40 @@
+import asyncio
+
+from gptcli.assistant import get_completion_provider
+from gptcli.config import GptCliConfig, init_providers
+from gptcli.providers import clients
+
+
+def test_providers_share_a_client_per_base_url_and_key():
+    init_providers(
+        GptCliConfig(openai_base_url="http://localhost:1/v1/", api_key="sk-a")
+    )
+    first = get_completion_provider("gpt-4o")
+    assert get_completion_provider("gpt-4o-mini").client is first.client
+
+    init_providers(
+        GptCliConfig(openai_base_url="http://localhost:2/v1/", api_key="sk-a")
+    )
+    assert get_completion_provider("gpt-4o").client is not first.client
+
+
+def test_pool_settings_reach_new_clients():
+    try:
+        init_providers(GptCliConfig(api_key="sk-a", http_max_connections=7))
+        provider = get_completion_provider("gpt-4o")
+        assert provider.client._client._transport._pool._max_connections == 7
+    finally:
+        clients.configure(clients.HttpSettings())
+
+
+def test_async_clients_are_kept_per_event_loop():
+    init_providers(GptCliConfig(api_key="sk-a"))
+    provider = get_completion_provider("gpt-4o")
+
+    async def two_lookups():
+        return provider.async_client, provider.async_client
+
+    first, again = asyncio.run(two_lookups())
+    assert first is again
+    second, _ = asyncio.run(two_lookups())
+    assert second is not first
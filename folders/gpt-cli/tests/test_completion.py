@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from gptcli.assistant import Assistant
+from gptcli.completion import CompletionError, CompletionProvider, MessageDeltaEvent
+
+
+class CountingProvider(CompletionProvider):
+    """Blocking provider that yields "0", "1", ... and records when it is closed."""
+
+    def __init__(self, count=100, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.closed = threading.Event()
+        self.args = None
+
+    def complete(self, messages, args, stream=False):
+        self.args = args
+        try:
+            for n in range(self.count):
+                if n == self.fail_at:
+                    raise CompletionError("boom")
+                time.sleep(0.001)
+                yield MessageDeltaEvent(str(n))
+        finally:
+            self.closed.set()
+
+
+async def collect(events):
+    return [event.text async for event in events]
+
+
+def test_default_acomplete_runs_complete_on_a_thread():
+    assert asyncio.run(collect(CountingProvider(count=3).acomplete([], {}))) == [
+        "0",
+        "1",
+        "2",
+    ]
+
+
+def test_default_acomplete_raises_provider_errors():
+    async def run():
+        try:
+            await collect(CountingProvider(fail_at=2).acomplete([], {}))
+        except CompletionError as e:
+            return e.args
+
+    assert asyncio.run(run()) == ("boom",)
+
+
+def test_abandoned_acomplete_closes_the_request():
+    provider = CountingProvider()
+
+    async def run():
+        events = provider.acomplete([], {})
+        first = await events.__anext__()
+        await events.aclose()
+        return first.text
+
+    assert asyncio.run(run()) == "0"
+    assert provider.closed.wait(1)
+
+
+def test_acomplete_chat_uses_the_assistant_settings():
+    provider = CountingProvider(count=2)
+    assistant = Assistant({"model": "gpt-4o", "temperature": 0.2, "messages": []})
+    with mock.patch("gptcli.assistant.get_completion_provider", return_value=provider):
+        events = asyncio.run(collect(assistant.acomplete_chat([], {"top_p": 0.5})))
+    assert events == ["0", "1"]
+    assert provider.args == {"model": "gpt-4o", "temperature": 0.2, "top_p": 0.5}
@@ -0,0 +1,104 @@
+import io
+import json
+from unittest import mock
+
+import pytest
+
+from gptcli.completion import CompletionError, MessageDeltaEvent, UsageEvent
+from gptcli.events import EventsChatListener
+from gptcli.session import ChatSession
+from gptcli.shell import simple_response
+
+
+def setup_session():
+    assistant_mock = mock.MagicMock()
+    assistant_mock.init_messages.return_value = []
+    stream = io.StringIO()
+    session = ChatSession(assistant_mock, EventsChatListener(stream))
+    return assistant_mock, stream, session
+
+
+def read_events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_turn_events():
+    assistant_mock, stream, session = setup_session()
+    assistant_mock.complete_chat.return_value = [
+        MessageDeltaEvent("<<start>>hello"),
+        MessageDeltaEvent(" world<<end>>"),
+        UsageEvent(prompt_tokens=3, completion_tokens=2, total_tokens=5, cost=0.5),
+    ]
+
+    session.process_input("user message", {})
+
+    events = read_events(stream)
+    assert [e["event"] for e in events] == [
+        "turn_start",
+        "first_token",
+        "completion",
+        "usage",
+    ]
+    assert all(e["turn"] == 1 for e in events)
+    assert events[0]["content"] == "user message"
+    assert events[2]["content"] == "<<start>>hello world<<end>>"
+    assert events[3]["total_tokens"] == 5
+    assert events[3]["cost"] == 0.5
+
+
+def test_turns_are_numbered_and_reset_on_clear():
+    assistant_mock, stream, session = setup_session()
+    assistant_mock.complete_chat.side_effect = lambda *args, **kwargs: [
+        MessageDeltaEvent("response")
+    ]
+
+    session.process_input("first", {})
+    session.process_input("second", {})
+    session.process_input(":c", {})
+    session.process_input("third", {})
+
+    events = read_events(stream)
+    completions = [e["turn"] for e in events if e["event"] == "completion"]
+    assert completions == [1, 2, 1]
+
+
+def test_error_event():
+    assistant_mock, stream, session = setup_session()
+    assistant_mock.complete_chat.side_effect = CompletionError("error message")
+
+    session.process_input("user message", {})
+
+    events = read_events(stream)
+    assert {"event": "error", "message": "error message"}.items() <= events[1].items()
+
+
+def test_simple_response_events(capsys):
+    assistant_mock = mock.MagicMock()
+    assistant_mock.init_messages.return_value = []
+    assistant_mock.complete_chat.return_value = iter([MessageDeltaEvent("response")])
+    stream = io.StringIO()
+
+    simple_response(
+        assistant_mock, "prompt", stream=True, listener=EventsChatListener(stream)
+    )
+
+    assert capsys.readouterr().out == "response"
+    events = read_events(stream)
+    assert [e["event"] for e in events] == ["turn_start", "first_token", "completion"]
+    assert events[-1]["content"] == "response"
+
+
+def test_simple_response_error_event():
+    assistant_mock = mock.MagicMock()
+    assistant_mock.init_messages.return_value = []
+    assistant_mock.complete_chat.side_effect = CompletionError("error message")
+    stream = io.StringIO()
+
+    with pytest.raises(CompletionError):
+        simple_response(
+            assistant_mock, "prompt", stream=True, listener=EventsChatListener(stream)
+        )
+
+    events = read_events(stream)
+    assert [e["event"] for e in events] == ["turn_start", "error"]
+    assert events[1]["message"] == "error message"
@@ -0,0 +1,196 @@
+import asyncio
+import concurrent.futures
+import csv
+import os
+import subprocess
+import sys
+import time
+
+from chain import ChainError
+from ingest import Essay
+from journal import RunJournal
+from results import ResultsWriter
+
+from .conftest import GPT_CLI, GPT_MULTI, import_script
+
+fiver = import_script(GPT_MULTI, "fiver")
+
+
+def test_fiver_imports_the_shipped_gptcli(tmp_path):
+    # Only gpt-multi on the path, as when fiver.py is run as a script.
+    code = "import fiver, gptcli; print(fiver.__file__); print(gptcli.__file__)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": GPT_MULTI},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert output == [
+        os.path.join(GPT_MULTI, "fiver.py"),
+        os.path.join(GPT_CLI, "gptcli", "__init__.py"),
+    ]
+
+
+def test_the_pty_engine_runs_the_shipped_gpt_cli(tmp_path):
+    command = fiver.gpt_command("gpt-4o", "GrammarHelper")
+    script = os.path.join(GPT_MULTI, "run_gpt.py")
+    assert command == [
+        sys.executable,
+        script,
+        "--model",
+        "gpt-4o",
+        "--transcript-file",
+        fiver.transcript_file_path,
+        "GrammarHelper",
+    ]
+    # Started from anywhere, that CLI has the option the engine relies on.
+    help_text = subprocess.run(
+        [sys.executable, script, "--help"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert "--transcript-file" in help_text
+
+
+class FakeChain:
+    """
+    A two-step chain that answers "<essay text> N" for step N, after the
+    essay's delay in `delays`. Essays in `failing` raise ChainError.
+    """
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.started = []
+        self.finished = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def fingerprint(self, essay_text):
+        return essay_text
+
+    async def run(self, essay_text, label="", checkpoint=None, on_step=None):
+        self.started.append(essay_text)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Steps run their blocking calls on the default executor.
+            await asyncio.get_running_loop().run_in_executor(
+                None, time.sleep, self.delays.get(essay_text, 0.01)
+            )
+            if essay_text in self.failing:
+                on_step("prompt01", "failed", 0.01)
+                raise ChainError("boom")
+            on_step("prompt01", "done", 0.01)
+            on_step("prompt02", "done", 0.01)
+            return [f"{essay_text} 1", f"{essay_text} 2"]
+        finally:
+            self.in_flight -= 1
+            self.finished.append(essay_text)
+
+
+def essays(*names):
+    return [Essay(name, lambda name=name: f"essay {name}") for name in names]
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def run_native(
+    tmp_path, chain, essays, num_replicates=1, concurrency=2, max_pending=64
+):
+    """Run fiver's native scheduler; returns the per-replicate results and the CSV rows."""
+    path = str(tmp_path / "results.csv")
+    with RunJournal(str(tmp_path / "run.journal.sqlite")) as journal:
+        journal.add_units([essay.name for essay in essays], num_replicates)
+        header = ["filename", "prompt01", "prompt02"]
+        with ResultsWriter(path, header, max_pending=max_pending) as writer:
+            results = asyncio.run(
+                fiver.run_replicates_native(
+                    essays,
+                    str(tmp_path),
+                    chain,
+                    num_replicates,
+                    writer,
+                    journal,
+                    concurrency,
+                )
+            )
+    return results, read_rows(path)
+
+
+def test_rows_come_out_in_input_order(tmp_path):
+    # The first essay finishes last.
+    chain = FakeChain(delays={"essay a": 0.1})
+    results, rows = run_native(
+        tmp_path, chain, essays("a", "b", "c"), num_replicates=2, concurrency=4
+    )
+    assert results == [[True, True, True], [True, True, True]]
+    assert [row[0] for row in rows] == ["a", "a", "b", "b", "c", "c"]
+    assert rows[0] == ["a", "essay a 1", "essay a 2"]
+    assert chain.finished[-2:] == ["essay a", "essay a"]
+
+
+def test_concurrency_stays_within_the_limit(tmp_path, monkeypatch):
+    pools = []
+
+    class RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            pools.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(concurrent.futures, "ThreadPoolExecutor", RecordingExecutor)
+    chain = FakeChain(delays={f"essay {n}": 0.05 for n in range(12)})
+    results, rows = run_native(
+        tmp_path, chain, essays(*map(str, range(12))), concurrency=3
+    )
+    assert all(results[0]) and len(rows) == 12
+    assert 1 < chain.max_in_flight <= 3
+    # Room for a timed-out step still draining behind every worker.
+    assert pools == [6]
+
+
+def test_a_full_reorder_buffer_holds_workers_back(tmp_path):
+    chain = FakeChain(delays={"essay a": 0.2})
+    started_during_a = []
+    run = chain.run
+
+    async def recording_run(essay_text, **kwargs):
+        if "essay a" in chain.started and "essay a" not in chain.finished:
+            started_during_a.append(essay_text)
+        return await run(essay_text, **kwargs)
+
+    chain.run = recording_run
+    _, rows = run_native(
+        tmp_path, chain, essays("a", "b", "c", "d"), concurrency=4, max_pending=2
+    )
+    # Only b fits in the buffer behind a until a's row is written.
+    assert started_during_a == ["essay b"]
+    assert [row[0] for row in rows] == ["a", "b", "c", "d"]
+
+
+def test_a_failed_unit_is_skipped_without_stalling_the_writer(tmp_path):
+    chain = FakeChain(failing={"essay a"})
+    results, rows = run_native(tmp_path, chain, essays("a", "b", "c"), max_pending=1)
+    assert results == [[False, True, True]]
+    assert [row[0] for row in rows] == ["b", "c"]
+    # Every failed attempt is retried, up to ten.
+    assert chain.started.count("essay a") == 10
+
+
+def test_a_rerun_skips_units_the_journal_has_as_done(tmp_path):
+    run_native(
+        tmp_path, FakeChain(failing={"essay b"}), essays("a", "b"), num_replicates=2
+    )
+
+    chain = FakeChain()
+    results, rows = run_native(tmp_path, chain, essays("a", "b"), num_replicates=2)
+    assert results == [[True, True], [True, True]]
+    assert chain.started == ["essay b", "essay b"]
+    assert [row[0] for row in rows] == ["a", "a", "b", "b"]
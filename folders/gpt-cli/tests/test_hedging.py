@@ -0,0 +1,150 @@
+import threading
+from unittest import mock
+
+import pytest
+
+from gptcli.assistant import Assistant
+from gptcli.completion import CompletionError, MessageDeltaEvent
+from gptcli.hedging import HedgingPolicy
+
+# Generous bound for events the test is waiting on; only hit if a test fails.
+WAIT = 10
+
+
+def warmed_policy(**kwargs):
+    policy = HedgingPolicy(min_samples=3, **kwargs)
+    for _ in range(3):
+        policy.record("gpt-4o", 0.01)
+    # Enough earlier requests for the hedge rate cap to allow one hedge.
+    policy.requests = 99
+    return policy
+
+
+def scripted_attempts(*attempts):
+    """
+    Each call to start() runs the next attempt: a function that returns its
+    texts (or raises). `launched[i]` is set once attempt i has started.
+    """
+    calls = []
+    launched = [threading.Event() for _ in attempts]
+    lock = threading.Lock()
+
+    def start():
+        with lock:
+            index = len(calls)
+            calls.append(index)
+        launched[index].set()
+
+        def events():
+            for text in attempts[index]():
+                yield MessageDeltaEvent(text)
+
+        return events()
+
+    return start, calls, launched
+
+
+def texts(events):
+    return [event.text for event in events]
+
+
+def test_no_hedge_before_min_samples():
+    policy = HedgingPolicy(min_samples=3)
+    start, calls, _ = scripted_attempts(lambda: ["a", "b"])
+    assert texts(policy.complete("gpt-4o", start)) == ["a", "b"]
+    assert len(calls) == 1
+    assert policy.stats()["hedges"] == 0
+
+
+def test_slow_request_is_hedged_and_duplicate_wins():
+    policy = warmed_policy()
+    release_original = threading.Event()
+
+    def original():
+        release_original.wait(WAIT)
+        return ["slow"]
+
+    start, calls, _ = scripted_attempts(original, lambda: ["fast", "!"])
+    try:
+        assert texts(policy.complete("gpt-4o", start)) == ["fast", "!"]
+    finally:
+        release_original.set()
+    assert len(calls) == 2
+    assert policy.stats() == {"requests": 100, "hedges": 1, "hedge_wins": 1}
+
+
+def test_original_wins_if_it_answers_first():
+    policy = warmed_policy()
+    release_duplicate = threading.Event()
+    launched = []
+
+    def original():
+        # Answer only once the duplicate is in flight.
+        launched[1].wait(WAIT)
+        return ["original"]
+
+    def duplicate():
+        release_duplicate.wait(WAIT)
+        return ["duplicate"]
+
+    start, calls, events = scripted_attempts(original, duplicate)
+    launched.extend(events)
+    try:
+        assert texts(policy.complete("gpt-4o", start)) == ["original"]
+    finally:
+        release_duplicate.set()
+    assert len(calls) == 2
+    assert policy.stats()["hedge_wins"] == 0
+
+
+def test_hedge_rate_is_capped():
+    policy = warmed_policy(max_hedge_rate=0.01)
+    policy.hedges = 1
+    hedge_refused = threading.Event()
+    take_hedge = policy._take_hedge
+    policy._take_hedge = lambda: take_hedge() or hedge_refused.set()
+
+    def original():
+        hedge_refused.wait(WAIT)
+        return ["only"]
+
+    start, calls, _ = scripted_attempts(original)
+    assert texts(policy.complete("gpt-4o", start)) == ["only"]
+    assert hedge_refused.is_set()
+    assert len(calls) == 1
+
+
+def test_error_without_duplicate_is_raised():
+    policy = HedgingPolicy()
+
+    def original():
+        raise CompletionError("boom")
+
+    start, _, _ = scripted_attempts(original)
+    with pytest.raises(CompletionError):
+        list(policy.complete("gpt-4o", start))
+
+
+def test_failed_original_falls_back_to_duplicate():
+    policy = warmed_policy()
+    launched = []
+
+    def original():
+        launched[1].wait(WAIT)
+        raise CompletionError("boom")
+
+    start, _, events = scripted_attempts(original, lambda: ["ok"])
+    launched.extend(events)
+    assert texts(policy.complete("gpt-4o", start)) == ["ok"]
+
+
+def test_non_streamed_requests_are_not_hedged():
+    policy = warmed_policy()
+    assistant = Assistant({"model": "gpt-4o"})
+    assistant.hedging = policy
+    provider = mock.MagicMock()
+    provider.complete.return_value = iter([MessageDeltaEvent("whole reply")])
+    with mock.patch("gptcli.assistant.get_completion_provider", return_value=provider):
+        events = list(assistant.complete_chat([], stream=False))
+    assert texts(events) == ["whole reply"]
+    assert policy.stats()["requests"] == 99
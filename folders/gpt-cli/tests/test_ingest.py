@@ -0,0 +1,182 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+import ingest
+from bench_clean import reference_clean_text, synthetic_essay
+from ingest import clean_text, clean_texts, essays_from_directory, essays_from_tsv
+
+from .conftest import GPT_CLI, GPT_MULTI, import_script
+
+ESSAY = "The student go to school every day, and he like study english. " * 5
+
+
+def write_tsv(path, rows):
+    path.write_bytes("".join(row + "\n" for row in rows).encode("utf-8"))
+    return str(path)
+
+
+def old_multi_split(tsv_path, directory):
+    """How gpt-multi's gptrunner.py split the TSV into cleaned .txt files."""
+    with open(tsv_path, "r", encoding="utf-8") as f:
+        next(f)
+        for line in f:
+            line = line.rstrip("\r\n")
+            if "\t" not in line:
+                continue
+            filename, text_content = line.split("\t", 1)
+            filename = filename.strip()
+            if not filename:
+                continue
+            with open(
+                os.path.join(directory, f"{filename}.txt"), "w", encoding="utf-8"
+            ) as txt:
+                txt.write(clean_text(text_content))
+
+
+def test_tsv_essays_match_the_old_txt_split(tmp_path):
+    tsv = write_tsv(
+        tmp_path / "essays-raw.tsv",
+        [
+            "name\ttext",
+            "s2\tSecond “essay”\twith a tab",
+            "s1\tFirst essay…  with  spaces ",
+            "no tab on this row",
+            "\tno name",
+            "s3\t",
+            "s2\tThe later row wins",
+            "s10\tcafé",
+        ],
+    )
+    directory = tmp_path / "split"
+    directory.mkdir()
+    old_multi_split(tsv, str(directory))
+
+    old = [
+        (essay.name, essay.read()) for essay in essays_from_directory(str(directory))
+    ]
+    new = [(essay.name, essay.read()) for essay in essays_from_tsv(tsv)]
+    assert new == old
+    assert [name for name, _ in new] == ["s1", "s10", "s2", "s3"]
+    assert dict(new)["s2"] == "The later row wins"
+
+
+def old_cli_split(tsv_path, directory):
+    """How gpt-cli's gptrunner.py split the TSV into .txt files for fiver.py."""
+    with open(tsv_path, "r", encoding="utf-8") as file:
+        lines = [
+            line
+            for line in file
+            if len(line.split("\t")) > 1 and line.split("\t")[1].strip()
+        ]
+    for line in lines:
+        columns = line.split("\t")
+        with open(
+            os.path.join(directory, f"{columns[0]}.txt"), "a", encoding="utf-8"
+        ) as output:
+            output.write(columns[1])
+    student_number_file = os.path.join(directory, "Student Number.txt")
+    if os.path.exists(student_number_file):
+        os.remove(student_number_file)
+    for filename in os.listdir(directory):
+        if os.path.getsize(os.path.join(directory, filename)) < 250:
+            os.remove(os.path.join(directory, filename))
+
+
+def test_cli_tsv_essays_match_the_old_txt_split(tmp_path):
+    fiver = import_script(GPT_CLI, "fiver")
+    tsv = write_tsv(
+        tmp_path / "essays-prompts.tsv",
+        [
+            f"Student Number\t{ESSAY}",
+            f"s1\t{ESSAY}\tscore",
+            "s2\ttoo short",
+            f"s3\t{ESSAY[:120]}",
+            f"s3\t{ESSAY[120:]}",
+            "s4\t   ",
+            f"s5\t{ESSAY}",
+        ],
+    )
+    directory = tmp_path / "split"
+    directory.mkdir()
+    old_cli_split(tsv, str(directory))
+    old = {
+        essay.filename: (essay.size, essay.read())
+        for essay in fiver.essays_from_directory(str(directory))
+    }
+
+    table = fiver.JobTable.from_tsv(
+        tsv,
+        skip_header=False,
+        text_column="second",
+        duplicates="append",
+        skip_blank=True,
+    )
+    with table:
+        new = {
+            essay.filename: (essay.size, essay.read())
+            for essay in fiver.essays_from_table(table)
+        }
+    assert new == old
+    # The header row and the short essay are dropped; s3's rows are joined.
+    assert sorted(new) == ["s1.txt", "s3.txt", "s5.txt"]
+
+
+def test_gptrunner_deletes_the_tsv_only_after_fiver_succeeds(tmp_path):
+    shutil.copy(os.path.join(GPT_MULTI, "gptrunner.py"), tmp_path)
+    tsv = write_tsv(tmp_path / "essays-raw.tsv", ["name\ttext", f"s1\t{ESSAY}"])
+    # Stands in for fiver.py: records its arguments and whether the TSV is there.
+    (tmp_path / "fiver.py").write_text(
+        "import json, os, sys\n"
+        "tsv = sys.argv[sys.argv.index('--input-tsv') + 1]\n"
+        "with open(os.path.join(os.path.dirname(__file__), 'args.json'), 'w') as f:\n"
+        "    json.dump([sys.argv[1:], os.path.isfile(tsv)], f)\n"
+        "sys.exit(int(os.environ.get('FIVER_EXIT', '0')))\n"
+    )
+
+    def run(exit_code):
+        return subprocess.run(
+            [sys.executable, "gptrunner.py", "essays-", "--concurrency", "4"],
+            cwd=tmp_path,
+            env={**os.environ, "FIVER_EXIT": str(exit_code)},
+            capture_output=True,
+        )
+
+    assert run(1).returncode != 0
+    assert os.path.isfile(tsv)
+
+    assert run(0).returncode == 0
+    args, tsv_existed = json.loads((tmp_path / "args.json").read_text())
+    assert args == [str(tmp_path / "essays-"), "--input-tsv", tsv, "--concurrency", "4"]
+    assert tsv_existed
+    assert not os.path.exists(tsv)
+
+
+def test_clean_text_matches_the_old_implementation():
+    samples = [
+        "Plain ASCII, with tabs\tand\r\nline breaks!  ",
+        "Curly ‘quotes’ “here” and `backticks´ ′prime″ „low‟",
+        "Control \x00\x07\x0b\x0c\x1b\x1c\x7f and C1 \x85\x9f characters",
+        "Non-breaking\u00a0and ideographic\u3000spaces\u2028\u2029",
+        "Full-width Ａ１！？，． ligature ﬁ super² accents é e\u0301 ü",
+        "Emoji 😀, Hangul 한국어, dashes — – and ellipsis …",
+        "",
+    ]
+    # Every character of the Basic Multilingual Plane between two letters.
+    samples += [f"a{chr(code)}b" for code in range(0xD800)]
+    samples += [f"a{chr(code)}b" for code in range(0xE000, 0x10000)]
+    for text in samples:
+        assert clean_text(text) == reference_clean_text(text), repr(text)
+
+
+def test_clean_texts_keeps_order_in_and_out_of_the_pool(monkeypatch):
+    rng = random.Random(0)
+    corpus = [synthetic_essay(rng, 0.5) for _ in range(40)]
+    expected = [reference_clean_text(text) for text in corpus]
+    assert clean_texts(corpus, processes=1) == expected
+
+    monkeypatch.setattr(ingest, "MIN_PARALLEL_TEXTS", 10)
+    assert clean_texts(iter(corpus), processes=2, chunksize=3) == expected
@@ -0,0 +1,54 @@
+from gptcli.jobtable import JobTable
+
+
+def write_tsv(tmp_path, text):
+    path = tmp_path / "essays.tsv"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def texts(table):
+    return {job.name: table.text(job) for job in table}
+
+
+def test_rows_are_indexed_by_byte_offset(tmp_path):
+    path = write_tsv(tmp_path, "name\ttext\ns1\tcafé au lait\ns2\tsecond\tessay\n")
+    with JobTable.from_tsv(path) as table:
+        assert len(table) == 2
+        assert texts(table) == {"s1": "café au lait\n", "s2": "second\tessay\n"}
+        job = next(iter(table))
+        assert job.size == len("café au lait\n".encode("utf-8"))
+
+
+def test_second_column_without_header(tmp_path):
+    path = write_tsv(tmp_path, "s1\tfirst\textra\ns2\tlast line")
+    with JobTable.from_tsv(path, skip_header=False, text_column="second") as table:
+        assert texts(table) == {"s1": "first", "s2": "last line"}
+
+
+def test_duplicate_names(tmp_path):
+    path = write_tsv(tmp_path, "h\th\ns1\tone \ns1\ttwo\n")
+    with JobTable.from_tsv(path) as table:
+        assert texts(table) == {"s1": "two\n"}
+    with JobTable.from_tsv(path, duplicates="append") as table:
+        assert texts(table) == {"s1": "one \ntwo\n"}
+
+
+def test_rows_without_name_tab_or_text_are_ignored(tmp_path):
+    path = write_tsv(tmp_path, "h\th\nno tab here\n\tnameless\ns1\t  \ns2\tok\n")
+    with JobTable.from_tsv(path, skip_blank=True) as table:
+        assert texts(table) == {"s2": "ok\n"}
+
+
+def test_clean_is_applied_on_read(tmp_path):
+    path = write_tsv(tmp_path, "h\th\ns1\t  Some Text \n")
+    with JobTable.from_tsv(path, clean=str.strip) as table:
+        job = next(iter(table))
+        assert table.text(job) == "Some Text"
+        assert table.raw_text(job) == "  Some Text \n"
+
+
+def test_empty_file(tmp_path):
+    path = write_tsv(tmp_path, "")
+    with JobTable.from_tsv(path) as table:
+        assert len(table) == 0
@@ -0,0 +1,51 @@
+import sqlite3
+
+from journal import RunJournal
+
+
+def test_units_are_registered_once(tmp_path):
+    with RunJournal(str(tmp_path / "run.journal.sqlite")) as journal:
+        journal.add_units(["a", "b"], 2)
+        journal.finish_unit("a", 1, "done")
+        journal.add_units(["a", "b", "c"], 2)
+        assert journal.counts() == {"pending": 5, "done": 1}
+        assert journal.done_units() == {("a", 1)}
+
+
+def test_a_reopened_journal_resumes_where_the_run_stopped(tmp_path):
+    path = str(tmp_path / "run.journal.sqlite")
+    journal = RunJournal(path)
+    journal.add_units(["a", "b"], 1)
+    journal.start_unit("a", 1)
+    journal.record_step("a", 1, "prompt01", "done", 2.0)
+    journal.finish_unit("a", 1, "done")
+    journal.start_unit("b", 1)
+    # The run is killed here: b is left running and the journal is not closed.
+
+    reopened = RunJournal(path)
+    assert reopened.done_units() == {("a", 1)}
+    assert reopened.counts() == {"done": 1, "running": 1}
+    reopened.start_unit("b", 1)
+    reopened.finish_unit("b", 1, "done")
+    reopened.close()
+    journal.close()
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        attempts = connection.execute(
+            "SELECT attempts FROM units WHERE essay = 'b'"
+        ).fetchone()
+    assert attempts == (2,)
+
+
+def test_every_attempt_at_a_step_is_counted(tmp_path):
+    path = str(tmp_path / "run.journal.sqlite")
+    with RunJournal(path) as journal:
+        journal.add_units(["a"], 1)
+        journal.record_step("a", 1, "prompt02", "failed", 30.0)
+        journal.record_step("a", 1, "prompt02", "done", 4.5)
+    with sqlite3.connect(path) as connection:
+        step = connection.execute(
+            "SELECT status, attempts, seconds FROM steps WHERE essay = 'a' AND step = 'prompt02'"
+        ).fetchone()
+    assert step == ("done", 2, 4.5)
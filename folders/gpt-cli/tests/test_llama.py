@@ -0,0 +1,146 @@
+from gptcli.providers.llama import (
+    CachedModel,
+    ModelCache,
+    SavedStates,
+    evaluated_tokens,
+)
+
+
+def make_model_files(tmp_path, sizes):
+    paths = []
+    for name, size in sizes.items():
+        path = tmp_path / f"{name}.gguf"
+        path.write_bytes(b"\0" * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_models_are_loaded_once_per_path_and_params(tmp_path):
+    (a,) = make_model_files(tmp_path, {"a": 10})
+    loaded = []
+    cache = ModelCache(
+        load=lambda path, params: loaded.append((path, params)) or object()
+    )
+
+    first = cache.get(a, {"n_ctx": 2048})
+    assert cache.get(a, {"n_ctx": 2048}) is first
+    assert cache.get(a, {"n_ctx": 4096}) is not first
+    assert len(loaded) == cache.loads == 2
+
+
+def test_least_recently_used_models_are_evicted_past_the_budget(tmp_path):
+    a, b, c = make_model_files(tmp_path, {"a": 40, "b": 40, "c": 40})
+    cache = ModelCache(budget_bytes=100, load=lambda path, params: object())
+
+    model_a = cache.get(a, {})
+    cache.get(b, {})
+    cache.get(a, {})  # b is now the least recently used
+    cache.get(c, {})
+    assert cache.evictions == 1
+    assert cache.get(a, {}) is model_a
+    assert cache.loads == 3
+
+    cache.get(b, {})
+    assert cache.loads == 4
+
+
+def test_a_model_larger_than_the_budget_is_still_loaded(tmp_path):
+    (big,) = make_model_files(tmp_path, {"big": 200})
+    cache = ModelCache(budget_bytes=100, load=lambda path, params: object())
+    assert cache.get(big, {}) is cache.get(big, {})
+
+
+class Context:
+    """Stands in for a Llama context: the evaluated tokens, saved and restored as a state."""
+
+    class Tokens(list):
+        def __getitem__(self, index):
+            item = super().__getitem__(index)
+            return Context.Tokens(item) if isinstance(index, slice) else item
+
+        def tolist(self):
+            return list(self)
+
+    def __init__(self):
+        self.evaluate([])
+
+    def evaluate(self, tokens):
+        # Like Llama, the buffer is longer than the evaluated tokens.
+        self.input_ids = self.Tokens(tokens + [0, 0])
+        self.n_tokens = len(tokens)
+
+    def save_state(self):
+        return list(self.input_ids[: self.n_tokens])
+
+    def load_state(self, state):
+        self.evaluate(list(state))
+
+
+def test_prompts_resume_from_the_longest_evaluated_prefix():
+    model = CachedModel(Context(), 0)
+    essay_a, essay_b = [1, 2, 3, 4], [1, 9, 9, 9]
+
+    assert model.prepare(essay_a + [5]) == 0
+    model.llm.evaluate(essay_a + [5, 50])  # prompt plus the reply
+    model.save()
+
+    # A second chat on the same model replaces the live context...
+    assert model.prepare(essay_b + [5]) == 1
+    model.llm.evaluate(essay_b + [5, 60])
+    model.save()
+
+    # ...but the first chat's next turn is restored from its saved state.
+    assert model.prepare(essay_a + [5, 50, 6, 7]) == 6
+    assert evaluated_tokens(model.llm) == essay_a + [5, 50]
+    assert (model.prefix_stats.requests, model.prefix_stats.hits) == (3, 2)
+
+
+def test_saved_states_keep_only_the_latest_state_of_each_chat():
+    states = SavedStates(capacity=2)
+    states.save((1, 2), "a1")
+    states.save((1, 2, 3), "a2")
+    states.save((7,), "b")
+    assert list(states.states.values()) == ["a2", "b"]
+    assert states.longest_prefix([1, 2, 3, 4]) == (3, "a2")
+
+    states.save((8,), "c")
+    assert list(states.states.values()) == ["b", "c"]
+
+
+def test_saved_states_count_against_the_budget(tmp_path):
+    a, b = make_model_files(tmp_path, {"a": 40, "b": 40})
+    cache = ModelCache(budget_bytes=100, load=lambda path, params: Context())
+    model_a = cache.get(a, {})
+    model_b = cache.get(b, {})
+    model_b.states.size = len
+
+    model_b.llm.evaluate([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+    model_b.save()
+    cache.fit(model_b)
+    assert model_b.memory == 50
+    assert cache.evictions == 0
+
+    # Another chat's state passes the budget: b's oldest state goes, not model a.
+    model_b.llm.evaluate(list(range(20, 40)))
+    model_b.save()
+    cache.fit(model_b)
+    assert list(model_b.states.states) == [tuple(range(20, 40))]
+    assert model_b.memory == 60
+    assert cache.get(a, {}) is model_a
+
+    # A new model is loaded only after evicting models, saved states included.
+    (c,) = make_model_files(tmp_path, {"c": 50})
+    cache.get(c, {})
+    assert cache.evictions == 1
+    assert cache.get(a, {}) is model_a
+
+
+def test_a_state_larger_than_the_budget_is_not_kept(tmp_path):
+    (a,) = make_model_files(tmp_path, {"a": 40})
+    cache = ModelCache(budget_bytes=50, load=lambda path, params: Context())
+    model = cache.get(a, {})
+    model.states.size = len
+    model.llm.evaluate(list(range(20)))
+    model.save()
+    cache.fit(model)
+    assert model.states.states == {} and model.memory == 40
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+from gptcli.logtail import LogTailer, PollingWatcher, make_watcher
+
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_counts_only_new_bytes(tmp_path):
+    log = tmp_path / "gptcli.log"
+    tailer = LogTailer(str(log), "Token usage")
+    assert tailer.poll() == 0
+
+    append(log, "INFO - Token usage 10\n")
+    assert tailer.poll() == 1
+    offset = tailer.offset
+
+    append(log, "INFO - assistant: hi\nINFO - Token usage 12\n")
+    assert tailer.poll() == 2
+    assert tailer.offset > offset
+
+
+def test_match_split_across_writes(tmp_path):
+    log = tmp_path / "gptcli.log"
+    tailer = LogTailer(str(log), "Token usage")
+
+    append(log, "INFO - Token us")
+    assert tailer.poll() == 0
+    append(log, "age 10\n")
+    assert tailer.poll() == 1
+
+
+def test_replaced_and_truncated_file(tmp_path):
+    log = tmp_path / "gptcli.log"
+    tailer = LogTailer(str(log), "Token usage")
+
+    append(log, "Token usage\nToken usage\n")
+    assert tailer.poll() == 2
+
+    os.rename(log, tmp_path / "gptcli_error1.log")
+    assert tailer.poll() == 0
+    append(log, "Token usage\n")
+    assert tailer.poll() == 1
+
+    with open(log, "w", encoding="utf-8"):
+        pass
+    assert tailer.poll() == 0
+
+
+def test_wait_for_wakes_on_append(tmp_path):
+    log = tmp_path / "gptcli.log"
+    tailer = LogTailer(str(log), "Token usage", watcher=make_watcher(str(tmp_path)))
+
+    writer = threading.Timer(0.1, append, args=(log, "Token usage\n"))
+    writer.start()
+    start = time.monotonic()
+    try:
+        assert tailer.wait_for(1, timeout=5)
+    finally:
+        writer.join()
+        tailer.close()
+    assert time.monotonic() - start < 2
+
+
+def test_wait_for_timeout(tmp_path):
+    tailer = LogTailer(
+        str(tmp_path / "gptcli.log"), "Token usage", watcher=PollingWatcher(0.01)
+    )
+    assert not tailer.wait_for(1, timeout=0.05)
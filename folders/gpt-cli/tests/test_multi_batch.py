@@ -0,0 +1,157 @@
+import csv
+import json
+from collections import Counter
+
+import pytest
+
+from batch import run_replicates_batch
+from chain import PromptChain
+from gptcli.assistant import Assistant
+from gptcli.batch import BatchBackend, BatchResult, BatchStatus
+from ingest import Essay
+from journal import RunJournal
+from results import ResultsWriter
+
+
+class FakeBackend(BatchBackend):
+    """
+    Batches end on their first poll. Each request is answered with its own
+    custom_id, unless `failures` still holds failures for it.
+    """
+
+    def __init__(self, failures=None):
+        self.batches = {}
+        self.failures = Counter(failures or {})
+        self.interrupt = set()
+
+    def submit(self, requests):
+        batch_id = f"batch-{len(self.batches) + 1}"
+        self.batches[batch_id] = list(requests)
+        return batch_id
+
+    def poll(self, batch_id):
+        if batch_id in self.interrupt:
+            raise KeyboardInterrupt
+        return BatchStatus("completed", True, {})
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id]:
+            if self.failures[request.custom_id] > 0:
+                self.failures[request.custom_id] -= 1
+                yield BatchResult(request.custom_id, None, "server error")
+            else:
+                yield BatchResult(
+                    request.custom_id, f"<<start>>reply {request.custom_id}<<end>>"
+                )
+
+
+ESSAYS = [Essay("a", lambda: "essay a"), Essay("b", lambda: "essay b")]
+
+
+def run(tmp_path, backend, num_replicates=1, max_attempts=3):
+    """Run the chain over ESSAYS; returns the per-replicate results and the journal's counts."""
+    chain = PromptChain(
+        Assistant(
+            {"model": "gpt-4o", "messages": [{"role": "system", "content": "Grade."}]}
+        ),
+        ["first", "second"],
+        "delimit.",
+    )
+    directories = []
+    for replicate in range(1, num_replicates + 1):
+        directory = tmp_path / f"replicate{replicate}"
+        directory.mkdir(exist_ok=True)
+        directories.append(str(directory))
+    header = ["filename", "prompt01", "prompt02"]
+    with RunJournal(str(tmp_path / "run.journal.sqlite")) as journal:
+        journal.add_units([essay.name for essay in ESSAYS], num_replicates)
+        with ResultsWriter(str(tmp_path / "results.csv"), header) as writer:
+            results = run_replicates_batch(
+                ESSAYS,
+                str(tmp_path),
+                directories,
+                chain,
+                writer,
+                journal,
+                backend=backend,
+                poll_interval=0,
+                max_attempts=max_attempts,
+                sleep=lambda seconds: None,
+            )
+        return results, journal.counts()
+
+
+def read_rows(tmp_path):
+    with open(tmp_path / "results.csv", newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_every_step_is_one_round_continuing_the_conversation(tmp_path):
+    backend = FakeBackend()
+    results, counts = run(tmp_path, backend, num_replicates=2)
+
+    assert results == [[True, True], [True, True]]
+    assert counts == {"done": 4}
+    # Rows come in essay-major order, whatever order the results arrive in.
+    assert read_rows(tmp_path) == [
+        ["a", "reply 0-1-0", "reply 0-1-1"],
+        ["a", "reply 0-2-0", "reply 0-2-1"],
+        ["b", "reply 1-1-0", "reply 1-1-1"],
+        ["b", "reply 1-2-0", "reply 1-2-1"],
+    ]
+    assert len(backend.batches) == 2
+    second_step = backend.batches["batch-2"][0]
+    assert [message["role"] for message in second_step.messages] == [
+        "system",
+        "user",
+        "assistant",
+        "user",
+    ]
+    assert second_step.messages[1]["content"] == "delimit. first essay a"
+    assert second_step.messages[3]["content"] == "delimit. second"
+    assert not (tmp_path / "batch.json").exists()
+
+
+def test_a_failed_step_is_sent_again_in_the_next_round(tmp_path):
+    backend = FakeBackend(failures={"1-1-0": 1})
+    results, counts = run(tmp_path, backend)
+
+    assert results == [[True, True]]
+    assert counts == {"done": 2}
+    # Round 2 carries b's retry of prompt 1 alongside a's prompt 2.
+    assert [request.custom_id for request in backend.batches["batch-2"]] == [
+        "0-1-1",
+        "1-1-0",
+    ]
+    assert [request.custom_id for request in backend.batches["batch-3"]] == ["1-1-1"]
+    assert read_rows(tmp_path)[1] == ["b", "reply 1-1-0", "reply 1-1-1"]
+
+
+def test_a_unit_is_given_up_after_max_attempts(tmp_path):
+    backend = FakeBackend(failures={"0-1-1": 5})
+    results, counts = run(tmp_path, backend, max_attempts=2)
+
+    assert results == [[False, True]]
+    assert counts == {"done": 1, "failed": 1}
+    assert read_rows(tmp_path) == [["b", "reply 1-1-0", "reply 1-1-1"]]
+    # a keeps its first step, so a later run only re-sends the second.
+    checkpoint = json.loads((tmp_path / "replicate1" / "a.checkpoint.json").read_text())
+    assert checkpoint["responses"] == ["reply 0-1-0"]
+
+
+def test_a_rerun_collects_the_batch_submitted_before_an_interruption(tmp_path):
+    backend = FakeBackend()
+    backend.interrupt.add("batch-2")
+    with pytest.raises(KeyboardInterrupt):
+        run(tmp_path, backend)
+    assert json.loads((tmp_path / "batch.json").read_text()) == {"batch_id": "batch-2"}
+    assert read_rows(tmp_path) == []
+
+    backend.interrupt.clear()
+    results, counts = run(tmp_path, backend)
+
+    assert results == [[True, True]]
+    assert counts == {"done": 2}
+    # The second step was not submitted (or paid for) again.
+    assert len(backend.batches) == 2
+    assert [row[0] for row in read_rows(tmp_path)] == ["a", "b"]
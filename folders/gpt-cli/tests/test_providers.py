@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import gptcli.providers
+from gptcli.assistant import get_completion_provider
+from gptcli.config import GptCliConfig, init_providers
+from gptcli.providers import clients
+
+
+@pytest.fixture
+def provider_settings(monkeypatch):
+    """Restore the provider settings and clients that init_providers changes."""
+    import openai
+
+    import gptcli.providers.anthropic
+
+    monkeypatch.setattr(gptcli.providers, "_pending_setup", {})
+    monkeypatch.setattr(clients, "settings", clients.settings)
+    monkeypatch.setattr(
+        gptcli.providers.anthropic, "api_key", gptcli.providers.anthropic.api_key
+    )
+    monkeypatch.setattr(openai, "api_key", openai.api_key)
+    monkeypatch.setattr(openai, "base_url", openai.base_url)
+    yield
+    # Drop the clients created with the test settings.
+    clients.clear()
+
+
+def test_gpt_does_not_import_provider_sdks():
+    code = (
+        "import sys, gptcli.gpt; "
+        "print(sorted(m for m in ('openai', 'anthropic', 'cohere', 'google.generativeai') if m in sys.modules))"
+    )
+    # From folders/gpt-cli, so the child imports this gptcli wherever pytest runs.
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_settings_reach_providers(provider_settings):
+    import gptcli.providers.anthropic
+
+    init_providers(GptCliConfig(anthropic_api_key="test-key"))
+    assert gptcli.providers.anthropic.api_key == "test-key"
+
+    init_providers(
+        GptCliConfig(openai_base_url="http://localhost:1/v1/", api_key="sk-test")
+    )
+    provider = get_completion_provider("gpt-4o")
+    assert str(provider.client.base_url) == "http://localhost:1/v1/"
+    assert provider.client.api_key == "sk-test"
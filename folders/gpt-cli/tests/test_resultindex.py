@@ -0,0 +1,66 @@
+import csv
+
+from gptcli.resultindex import ResultIndex
+
+
+def append_rows(path, rows):
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+
+def test_counts_rows_per_essay_incrementally(tmp_path):
+    path = str(tmp_path / "results.csv")
+    append_rows(path, [["a.txt", "one"], ["b.txt", 'multi\nline "quoted"']])
+    index = ResultIndex(path)
+    assert index.refresh() == 2
+    assert (index.count("a.txt"), index.count("b.txt"), index.count("c.txt")) == (
+        1,
+        1,
+        0,
+    )
+
+    append_rows(path, [["a.txt", "two"]])
+    assert index.refresh() == 1
+    assert index.count("a.txt") == 2
+
+
+def test_restart_reads_only_the_tail(tmp_path):
+    path = str(tmp_path / "results.csv")
+    append_rows(path, [["a.txt", "one"]] * 3)
+    ResultIndex(path).refresh()
+
+    append_rows(path, [["a.txt", "four"]])
+    index = ResultIndex(path)
+    assert index.count("a.txt") == 3
+    assert index.refresh() == 1
+    assert index.count("a.txt") == 4
+    assert index.rebuilds == 0
+
+
+def test_rewritten_csv_is_reindexed(tmp_path):
+    path = str(tmp_path / "results.csv")
+    append_rows(path, [["a.txt", "one"], ["b.txt", "one"]])
+    ResultIndex(path).refresh()
+
+    # cleaner.py rewrites the CSV without the rows it rejects.
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["b.txt", "one, now a longer row than before"]])
+    index = ResultIndex(path)
+    index.refresh()
+    assert (index.count("a.txt"), index.count("b.txt")) == (0, 1)
+    assert index.rebuilds == 1
+
+
+def test_unfinished_last_row_waits(tmp_path):
+    path = str(tmp_path / "results.csv")
+    append_rows(path, [["a.txt", "one"]])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('b.txt,"half written')
+    index = ResultIndex(path)
+    assert index.refresh() == 1
+    assert index.count("b.txt") == 0
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(' row"\r\n')
+    assert index.refresh() == 1
+    assert index.count("b.txt") == 1
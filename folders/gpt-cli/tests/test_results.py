@@ -0,0 +1,66 @@
+import csv
+
+from results import ResultsWriter
+
+HEADER = ["filename", "prompt01"]
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_rows_are_written_in_sequence_order(tmp_path):
+    path = str(tmp_path / "results.csv")
+    written = []
+    with ResultsWriter(path, HEADER) as writer:
+        writer.put(2, ["c", "3"], on_written=lambda: written.append("c"))
+        writer.put(1, ["b", "2"], on_written=lambda: written.append("b"))
+        # Nothing can be written before row 0 arrives.
+        assert read_rows(path) == [HEADER]
+        assert written == []
+
+        writer.put(0, ["a", "1"], on_written=lambda: written.append("a"))
+        assert read_rows(path) == [HEADER, ["a", "1"], ["b", "2"], ["c", "3"]]
+        assert written == ["a", "b", "c"]
+        assert writer.rows_written == 3
+
+
+def test_skipped_sequences_release_the_rows_after_them(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with ResultsWriter(path, HEADER) as writer:
+        writer.put(1, ["b", "2"])
+        writer.skip(0)
+        writer.skip(2)
+        writer.put(3, ["d", "4"])
+        assert read_rows(path) == [HEADER, ["b", "2"], ["d", "4"]]
+        assert writer.next_sequence == 4
+
+
+def test_has_room_bounds_the_reorder_buffer(tmp_path):
+    with ResultsWriter(str(tmp_path / "results.csv"), HEADER, max_pending=2) as writer:
+        assert writer.has_room(1)
+        assert not writer.has_room(2)
+        writer.put(0, ["a", "1"])
+        assert writer.has_room(2)
+
+
+def test_close_writes_rows_still_waiting_behind_a_gap(tmp_path):
+    path = str(tmp_path / "results.csv")
+    written = []
+    writer = ResultsWriter(path, HEADER)
+    writer.put(2, ["c", "3"], on_written=lambda: written.append("c"))
+    writer.put(1, ["b", "2"], on_written=lambda: written.append("b"))
+    writer.close()
+
+    assert read_rows(path) == [HEADER, ["b", "2"], ["c", "3"]]
+    assert written == ["b", "c"]
+
+
+def test_an_existing_file_is_appended_to_without_a_second_header(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with ResultsWriter(path, HEADER) as writer:
+        writer.put(0, ["a", "1"])
+    with ResultsWriter(path, HEADER) as writer:
+        writer.put(0, ["b", "2"])
+    assert read_rows(path) == [HEADER, ["a", "1"], ["b", "2"]]
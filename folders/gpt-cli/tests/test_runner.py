@@ -0,0 +1,123 @@
+import threading
+import time
+
+from gptcli.completion import CompletionError, MessageDeltaEvent, UsageEvent
+from gptcli.runner import (
+    AttemptLimitReached,
+    InvalidResponse,
+    PromptPool,
+    complete_prompt,
+)
+
+
+class FakeAssistant:
+    """Answers "<prompt>!" in two deltas; a prompt starting with "fail" raises."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.seen = []
+
+    def init_messages(self):
+        return [{"role": "system", "content": "system"}]
+
+    def complete_chat(self, messages, stream=True):
+        prompt = messages[-1]["content"]
+        self.seen.append(messages)
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if prompt.startswith("fail"):
+                raise CompletionError("boom")
+            yield MessageDeltaEvent(prompt)
+            yield UsageEvent(
+                prompt_tokens=1, completion_tokens=1, total_tokens=2, cost=0.0
+            )
+            yield MessageDeltaEvent("!")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_complete_prompt_joins_deltas():
+    assistant = FakeAssistant()
+    assert complete_prompt(assistant, "hello") == "hello!"
+    assert assistant.seen[0] == [
+        {"role": "system", "content": "system"},
+        {"role": "user", "content": "hello"},
+    ]
+
+
+def test_pool_completes_every_prompt_and_reports_errors():
+    assistant = FakeAssistant(delay=0.02)
+    prompts = [(f"e{n}", f"essay {n}") for n in range(6)] + [("bad", "fail me")]
+    with PromptPool(assistant, concurrency=3) as pool:
+        results = {key: (output, error) for key, output, error in pool.map(prompts)}
+    assert results.pop("bad")[1].args == ("boom",)
+    assert results == {f"e{n}": (f"essay {n}!", None) for n in range(6)}
+    assert 1 < assistant.max_in_flight <= 3
+
+
+def test_pool_reads_prompts_lazily():
+    assistant = FakeAssistant(delay=0.02)
+    read = []
+
+    def prompts():
+        for n in range(10):
+            read.append(n)
+            yield n, str(n)
+
+    with PromptPool(assistant, concurrency=2) as pool:
+        results = pool.map(prompts())
+        next(results)
+        assert len(read) <= 3
+        assert len(list(results)) == 9
+
+
+def test_submit_returns_a_future():
+    with PromptPool(FakeAssistant(), concurrency=2) as pool:
+        assert pool.submit("hi").result() == "hi!"
+        error = pool.submit("fail").exception()
+    assert isinstance(error, CompletionError)
+
+
+def test_rejected_responses_are_retried_until_the_attempt_limit():
+    class FlakyAssistant(FakeAssistant):
+        """Answers with a marker on every third request."""
+
+        def complete_chat(self, messages, stream=True):
+            n = len(self.seen)
+            yield from super().complete_chat(messages, stream)
+            if n % 3 == 2:
+                yield MessageDeltaEvent(" @1@")
+
+    assistant = FlakyAssistant()
+    validate = lambda output: None if "@1@" in output else "no @ marker"
+    prompts = [("a", "essay a")] * 2 + [("b", "essay b")]
+    with PromptPool(assistant, concurrency=1) as pool:
+        results = list(pool.map(prompts, validate, max_attempts=4))
+    assert [(key, output) for key, output, _ in results] == [
+        ("a", "essay a! @1@"),
+        ("a", None),
+        ("b", "essay b! @1@"),
+    ]
+    assert isinstance(results[1][2], InvalidResponse)
+    assert pool.failures == {"no @ marker": 4}
+    assert len(assistant.seen) == 6
+
+
+def test_keys_without_attempts_left_are_not_sent():
+    assistant = FakeAssistant()
+    with PromptPool(assistant, concurrency=1) as pool:
+        results = list(pool.map([("bad", "fail")] * 3, max_attempts=2))
+    assert [type(error) for _, _, error in results] == [
+        CompletionError,
+        AttemptLimitReached,
+        AttemptLimitReached,
+    ]
+    assert pool.failures == {"CompletionError": 2}
+    assert len(assistant.seen) == 2
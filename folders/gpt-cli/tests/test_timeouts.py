@@ -0,0 +1,58 @@
+from timeouts import StepTimeouts, percentile
+
+
+def test_default_timeout_until_enough_samples():
+    timeouts = StepTimeouts(default_timeout=120, min_samples=5)
+    for seconds in [10, 10, 10, 10]:
+        timeouts.record("gpt-4o", "prompt01", seconds)
+    assert timeouts.timeout("gpt-4o", "prompt01") == 120
+    assert timeouts.timeout("gpt-4o", "prompt01", default=60) == 60
+
+    timeouts.record("gpt-4o", "prompt01", 10)
+    assert timeouts.timeout("gpt-4o", "prompt01") == 20
+
+
+def test_timeout_is_headroom_times_p95_within_bounds():
+    timeouts = StepTimeouts(
+        default_timeout=120, min_samples=5, headroom=2.0, min_timeout=15
+    )
+    for seconds in range(1, 21):  # p95 of 1..20 is 19
+        timeouts.record("gpt-4o", "prompt01", seconds)
+        timeouts.record("gpt-4o", "prompt02", seconds / 10)
+        timeouts.record("gpt-4o", "prompt03", seconds * 100)
+    assert percentile(list(range(1, 21)), 0.95) == 19
+    assert timeouts.timeout("gpt-4o", "prompt01") == 38
+    assert timeouts.timeout("gpt-4o", "prompt02") == 15  # min_timeout
+    assert timeouts.timeout("gpt-4o", "prompt03") == 240  # twice the default
+    # Other models and steps keep the default.
+    assert timeouts.timeout("claude-3-haiku", "prompt01") == 120
+
+
+def test_only_the_latest_window_counts():
+    timeouts = StepTimeouts(min_samples=1, window=3, min_timeout=0)
+    for seconds in [50, 50, 50, 1, 1, 1]:
+        timeouts.record("gpt-4o", "prompt01", seconds)
+    assert timeouts.timeout("gpt-4o", "prompt01") == 2
+
+
+def test_latencies_are_saved_between_runs(tmp_path):
+    path = str(tmp_path / "step_latency.json")
+    timeouts = StepTimeouts(min_samples=2)
+    timeouts.record("gpt-4o", "prompt01", 10)
+    timeouts.record("gpt-4o", "prompt01", 20)
+    timeouts.record_timeout("gpt-4o", "prompt01")
+    timeouts.save(path)
+
+    loaded = StepTimeouts(min_samples=2)
+    loaded.load(path)
+    assert loaded.timeout("gpt-4o", "prompt01") == 40
+    # Timeout and stall counts are per run.
+    assert loaded.timeouts == {}
+
+
+def test_a_missing_or_corrupt_history_is_ignored(tmp_path):
+    timeouts = StepTimeouts()
+    timeouts.load(str(tmp_path / "missing.json"))
+    (tmp_path / "corrupt.json").write_text("{not json")
+    timeouts.load(str(tmp_path / "corrupt.json"))
+    assert timeouts.latencies == {}
@@ -0,0 +1,77 @@
+import io
+import json
+from unittest import mock
+
+from gptcli.completion import MessageDeltaEvent
+from gptcli.session import ChatSession
+from gptcli.shell import simple_response
+from gptcli.transcript import (
+    TranscriptChatListener,
+    assistant_responses,
+    read_transcript,
+)
+
+
+def run_session(replies):
+    assistant_mock = mock.MagicMock()
+    assistant_mock.init_messages.return_value = []
+    stream = io.StringIO()
+    session = ChatSession(assistant_mock, TranscriptChatListener(stream))
+    for i, reply in enumerate(replies):
+        assistant_mock.complete_chat.return_value = [MessageDeltaEvent(reply)]
+        session.process_input(f"prompt {i + 1}", {})
+    return session, assistant_mock, stream
+
+
+def test_records_have_step_role_and_content(tmp_path):
+    _, _, stream = run_session(['first "quoted"\nreply', "second"])
+    path = tmp_path / "transcript.jsonl"
+    path.write_text(stream.getvalue())
+
+    records = read_transcript(str(path))
+    assert records == [
+        {"step": 1, "role": "user", "content": "prompt 1"},
+        {"step": 1, "role": "assistant", "content": 'first "quoted"\nreply'},
+        {"step": 2, "role": "user", "content": "prompt 2"},
+        {"step": 2, "role": "assistant", "content": "second"},
+    ]
+    assert assistant_responses(records) == {1: 'first "quoted"\nreply', 2: "second"}
+
+
+def test_rerun_keeps_latest_reply():
+    session, assistant_mock, stream = run_session(["first"])
+    assistant_mock.complete_chat.return_value = [MessageDeltaEvent("again")]
+    session.process_input(":r", {})
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert assistant_responses(records) == {1: "again"}
+
+
+def test_prompt_mode_records_the_reply(capsys):
+    assistant_mock = mock.MagicMock()
+    assistant_mock.init_messages.return_value = []
+    assistant_mock.complete_chat.return_value = [
+        MessageDeltaEvent("the "),
+        MessageDeltaEvent("reply"),
+    ]
+    stream = io.StringIO()
+    simple_response(
+        assistant_mock, "prompt 1", stream=True, listener=TranscriptChatListener(stream)
+    )
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["role"] for record in records] == ["user", "assistant"]
+    assert assistant_responses(records) == {1: "the reply"}
+    assert capsys.readouterr().out == "the reply"
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    path.write_text(
+        '{"step": 1, "role": "assistant", "content": "ok"}\n{"step": 2, "ro'
+    )
+    assert assistant_responses(read_transcript(str(path))) == {1: "ok"}
+
+
+def test_missing_transcript_is_empty(tmp_path):
+    assert read_transcript(str(tmp_path / "missing.jsonl")) == []
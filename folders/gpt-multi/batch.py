@@ -0,0 +1,186 @@
+"""
+Batch engine for fiver.py.
+
+Instead of one request per step as each essay goes, every essay x
+replicate ("unit") sends its next step in one provider batch (OpenAI Batch
+API or Anthropic message batches). A batch may take up to a day, but
+costs half as much and does not count against the rate limits, which
+suits overnight grading runs. A chain of N prompts takes N batch rounds:
+round K sends prompt K of every unit, continuing each unit's conversation
+from its checkpoint.
+"""
+import json
+import os
+import time
+
+import gptcli_path  # sets up sys.path; must precede any gptcli import
+from chain import ChainCheckpoint, extract_marked_response, step_key
+from gptcli.batch import BatchRequest, batch_backend, wait_for_batch
+
+
+def custom_id(index, replicate, step):
+    """The id of a unit's step in a batch; both providers allow [a-zA-Z0-9_-]{1,64}."""
+    return f"{index}-{replicate}-{step}"
+
+
+class BatchUnit:
+    """One essay x replicate and its progress through the chain."""
+
+    def __init__(self, sequence, index, replicate, essay, checkpoint):
+        self.sequence = sequence
+        self.index = index
+        self.replicate = replicate
+        self.essay = essay
+        self.checkpoint = checkpoint
+        # Failed attempts at the current step.
+        self.attempts = 0
+
+    @property
+    def label(self):
+        return f"{self.essay.name} (replicate {self.replicate})"
+
+    @property
+    def step(self):
+        return len(self.checkpoint.responses)
+
+    @property
+    def custom_id(self):
+        return custom_id(self.index, self.replicate, self.step)
+
+    def request(self, chain):
+        """The request for this unit's next step, continuing its conversation."""
+        messages = list(self.checkpoint.messages) or chain.assistant.init_messages()
+        essay_text = self.essay.read() if self.step == 0 else ""
+        messages.append({"role": "user", "content": chain.build_prompt(self.step, essay_text)})
+        return BatchRequest(self.custom_id, messages, chain.assistant.completion_args())
+
+
+def load_pending_batch(path):
+    """The id of the batch a previous run submitted and did not collect, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["batch_id"]
+
+
+def save_pending_batch(path, batch_id):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"batch_id": batch_id}, f)
+    os.replace(temp_path, path)
+
+
+def run_replicates_batch(essays, input_directory, replicate_directories, chain, results_writer, journal,
+                         backend=None, poll_interval=60, max_attempts=3, sleep=time.sleep):
+    """
+    Run one chain per essay and replicate through the provider's batch API,
+    one step of every unit per batch round. Checkpoints for replicate N
+    live in `replicate_directories[N - 1]`, as with the native engine, and a
+    unit whose current step fails `max_attempts` rounds in a row is given
+    up on. The batch in flight is recorded in `batch.json` in
+    `input_directory`, so a rerun after a crash or Ctrl-C collects it
+    instead of paying for it again. Rows are put into `results_writer` in
+    the same order as the native engine's, which needs room for every unit.
+    Returns one list per replicate holding True for each essay that
+    succeeded (now or in an earlier run) and False for each essay that
+    failed.
+    """
+    if backend is None:
+        backend = batch_backend(chain.model, work_dir=input_directory)
+    pending_path = os.path.join(input_directory, "batch.json")
+
+    num_replicates = len(replicate_directories)
+    done_units = journal.done_units()
+    results = [[False] * len(essays) for _ in range(num_replicates)]
+    units = []
+    for index, essay in enumerate(essays):
+        for replicate in range(1, num_replicates + 1):
+            if (essay.name, replicate) in done_units:
+                results[replicate - 1][index] = True
+            else:
+                checkpoint = ChainCheckpoint(
+                    os.path.join(replicate_directories[replicate - 1], f"{essay.name}.checkpoint.json"),
+                    chain.fingerprint(essay.read()),
+                )
+                units.append(BatchUnit(len(units), index, replicate, essay, checkpoint))
+                journal.start_unit(essay.name, replicate)
+    if done_units:
+        print(f"Resuming: {len(units)} of {len(essays) * num_replicates} units left to run.")
+
+    def finish(unit):
+        # Only done once the row is in the combined CSV.
+        results_writer.put(
+            unit.sequence,
+            [unit.essay.name] + unit.checkpoint.responses,
+            on_written=lambda: journal.finish_unit(unit.essay.name, unit.replicate, "done"),
+        )
+        results[unit.replicate - 1][unit.index] = True
+        unit.checkpoint.clear()
+
+    def on_poll(status):
+        counts = ", ".join(f"{name} {count}" for name, count in status.counts.items())
+        print(f"[{time.strftime('%H:%M:%S', time.localtime())}] Batch {status.status}" + (f": {counts}" if counts else ""))
+
+    # Units whose last step was saved just before a crash only need their row.
+    for unit in [unit for unit in units if unit.step == len(chain.base_prompts)]:
+        finish(unit)
+        units.remove(unit)
+
+    batch_id = load_pending_batch(pending_path)
+    while units:
+        if batch_id is None:
+            requests = [unit.request(chain) for unit in units]
+            batch_id = backend.submit(requests)
+            save_pending_batch(pending_path, batch_id)
+            steps = sorted({unit.step + 1 for unit in units})
+            print(f"Submitted batch {batch_id}: {len(requests)} requests "
+                  f"(prompt {', '.join(str(step).zfill(2) for step in steps)}).")
+        else:
+            print(f"Collecting batch {batch_id} from the previous run.")
+
+        started = time.monotonic()
+        wait_for_batch(backend, batch_id, poll_interval, on_poll=on_poll, sleep=sleep)
+        elapsed = time.monotonic() - started
+
+        # Results for other steps (e.g. a batch submitted before the
+        # checkpoints were last saved) are ignored.
+        round_units = {unit.custom_id: unit for unit in units}
+        answered = set()
+        for result in backend.results(batch_id):
+            unit = round_units.get(result.custom_id)
+            if unit is None or unit in answered:
+                continue
+            if result.content is None:
+                print(f"Error: Prompt {str(unit.step + 1).zfill(2)} failed for {unit.label}: {result.error}")
+                continue
+            answered.add(unit)
+            request = unit.request(chain)
+            unit.checkpoint.save(
+                request.messages + [{"role": "assistant", "content": result.content}],
+                unit.checkpoint.responses + [extract_marked_response(result.content)],
+            )
+            journal.record_step(unit.essay.name, unit.replicate, step_key(unit.step - 1), "done", elapsed)
+            unit.attempts = 0
+
+        remaining = []
+        for unit in units:
+            if unit not in answered:
+                journal.record_step(unit.essay.name, unit.replicate, step_key(unit.step), "failed", elapsed)
+                unit.attempts += 1
+                if unit.attempts >= max_attempts:
+                    print(f"Error: Reached max attempts ({max_attempts}) for {unit.label}.")
+                    journal.finish_unit(unit.essay.name, unit.replicate, "failed")
+                    results_writer.skip(unit.sequence)
+                    continue
+            if unit.step == len(chain.base_prompts):
+                finish(unit)
+            else:
+                remaining.append(unit)
+        units = remaining
+
+        os.remove(pending_path)
+        batch_id = None
+
+    if batch_id is not None:
+        os.remove(pending_path)
+    return results
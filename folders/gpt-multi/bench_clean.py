@@ -0,0 +1,124 @@
+"""
+Benchmark ingest.clean_text against the clean_text gptrunner.py used before.
+
+Generates a synthetic corpus of learner-style essays: by default 60% plain
+ASCII with line breaks and tabs, the rest sprinkled with curly quotes,
+primes, full-width characters, accents, emoji and other non-ASCII text.
+The corpus is cleaned with the old function, with clean_text in this
+process and with clean_texts across a process pool, and the throughput of
+each is reported. Exits with status 1 if any output differs from the old
+function's.
+
+Usage: python bench_clean.py [--essays 100000] [--unicode-share 0.4]
+                              [--processes N] [--seed 0]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+from ingest import clean_text, clean_texts
+
+WORDS = (
+    "the student go to school every day and he like study english because it is "
+    "important for his future job in my opinion people should learn many language "
+    "however some person think that it is waste of time I am agree with them"
+).split()
+
+# Characters the cleaner has to rewrite or drop.
+ASCII_NOISE = ["`", "\r\n", "\n", "\t", "  ", ";", ":", "(", ")", '"', "\x0c"]
+UNICODE_NOISE = ASCII_NOISE + [
+    "‘", "’", "‚", "‛", "“", "”", "„", "‟", "´", "′", "″",
+    " ", "　", "…", "—", "–", "é", "ü", "ﬁ", "²", "Ａ", "１", "！", "？", "，", "．", "😀", "한국어",
+]
+
+
+def reference_clean_text(text):
+    """clean_text as gptrunner.py defined it, kept for comparison."""
+    # Normalize unicode
+    text = unicodedata.normalize("NFKC", text)
+
+    # Convert quote/apostrophe variants to plain apostrophe
+    quote_variants = [
+        "‘", "’", "‚", "‛",
+        "“", "”", "„", "‟",
+        "`", "´", "′", "″"
+    ]
+
+    for char in quote_variants:
+        text = text.replace(char, "'")
+
+    # Remove all line breaks and tabs
+    text = text.replace("\r", " ")
+    text = text.replace("\n", " ")
+    text = text.replace("\t", " ")
+
+    # Keep only:
+    # letters, numbers, spaces, and ! ? . , - '
+    text = re.sub(r"[^A-Za-z0-9 !?\.,\-']", "", text)
+
+    # Collapse repeated whitespace
+    text = re.sub(r"\s+", " ", text).strip()
+
+    return text
+
+
+def synthetic_essay(rng, unicode_share):
+    noise = UNICODE_NOISE if rng.random() < unicode_share else ASCII_NOISE
+    parts = []
+    for _ in range(rng.randint(120, 400)):
+        parts.append(rng.choice(WORDS))
+        roll = rng.random()
+        if roll < 0.08:
+            parts.append(rng.choice(noise))
+        elif roll < 0.15:
+            parts.append(rng.choice(".,!?"))
+        parts.append(" ")
+    return "".join(parts)
+
+
+def timed(label, function, corpus, megabytes):
+    started = time.perf_counter()
+    result = function(corpus)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>24}: {elapsed:7.2f}s, {len(corpus) / elapsed:9.0f} essays/s, {megabytes / elapsed:6.1f} MB/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_text on a synthetic corpus.")
+    parser.add_argument("--essays", type=int, default=100000, help="Number of synthetic essays.")
+    parser.add_argument("--unicode-share", type=float, default=0.4, help="Fraction of essays with non-ASCII characters.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for clean_texts (default: one per CPU).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_essay(rng, args.unicode_share) for _ in range(args.essays)]
+    megabytes = sum(len(text.encode("utf-8")) for text in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} essays, {megabytes:.1f} MB")
+
+    expected, reference_seconds = timed("old clean_text", lambda texts: [reference_clean_text(t) for t in texts], corpus, megabytes)
+    single, single_seconds = timed("clean_text", lambda texts: [clean_text(t) for t in texts], corpus, megabytes)
+    pooled, pooled_seconds = timed(
+        f"clean_texts ({args.processes or os.cpu_count()} procs)",
+        lambda texts: clean_texts(texts, processes=args.processes),
+        corpus,
+        megabytes,
+    )
+    print(f"Speedup: {reference_seconds / single_seconds:.1f}x in one process, "
+          f"{reference_seconds / pooled_seconds:.1f}x with the pool")
+
+    mismatches = sum(1 for old, new in zip(expected, single) if old != new)
+    mismatches += sum(1 for old, new in zip(expected, pooled) if old != new)
+    if mismatches or len(pooled) != len(expected):
+        print(f"Output differs from the old clean_text for {mismatches} essays.")
+        sys.exit(1)
+    print("Output identical to the old clean_text.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Compare the fused (single request) chain with the regular six-step chain.
+
+Runs both modes over the same fixed sample of essays (the first N .txt
+files of a directory, in name order) and reports latency, token usage and
+how often the two modes agree on the counts asked for in the prompts.
+
+Usage: python bench_fused.py <directory> [--sample 10] [--model gpt-4o]
+Per-essay results are written to <directory>-bench.csv.
+"""
+import argparse
+import asyncio
+import csv
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+
+from fiver import load_base_prompts, new_delimiter_instruction
+from chain import ChainError, FusedPromptChain, PromptChain, load_assistant
+
+# Fields compared between the two modes, with the step whose reply holds them.
+# The triple-checked counts (prompt04) are the ones used downstream.
+COMPARED_FIELDS = [
+    ("total_errors", 3),
+    ("spelling_errors", 3),
+    ("punctuation_errors", 3),
+    ("certainty", 2),
+]
+
+
+def extract_field(text, name):
+    """Return the number in <name:##>, or None if the reply lacks it."""
+    match = re.search(rf"<{re.escape(name)}:\s*(\d+)\s*>", text)
+    return int(match.group(1)) if match else None
+
+
+async def run_one(chain, essay_text):
+    usage = []
+    started = time.perf_counter()
+    try:
+        responses = await chain.run(essay_text, usage=usage)
+    except ChainError as e:
+        print(f"  failed: {e}")
+        responses = None
+    elapsed = time.perf_counter() - started
+    prompt_tokens = sum(u.prompt_tokens for u in usage if u is not None)
+    completion_tokens = sum(u.completion_tokens for u in usage if u is not None)
+    return responses, elapsed, prompt_tokens, completion_tokens
+
+
+def summarize(rows, mode):
+    mode_rows = [row for row in rows if row["mode"] == mode and row["ok"]]
+    if not mode_rows:
+        print(f"{mode}: no successful runs")
+        return
+    seconds = [row["seconds"] for row in mode_rows]
+    print(
+        f"{mode:>8}: {len(mode_rows)} ok, "
+        f"median {statistics.median(seconds):.2f}s, mean {statistics.mean(seconds):.2f}s, "
+        f"prompt tokens {sum(row['prompt_tokens'] for row in mode_rows)}, "
+        f"completion tokens {sum(row['completion_tokens'] for row in mode_rows)}"
+    )
+
+
+async def main():
+    # Prompts are read from the script's directory, as in fiver.py.
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Benchmark fused vs. chained prompts.")
+    parser.add_argument("directory", help="Directory containing one .txt file per essay.")
+    parser.add_argument("--sample", type=int, default=10, help="Number of essays to run.")
+    parser.add_argument("--assistant", default="GrammarHelper", help="gpt-cli assistant to use.")
+    parser.add_argument("--model", default="gpt-4o", help="Model to use for both modes.")
+    parser.add_argument("--step-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    input_directory = args.directory.rstrip("/")
+    text_files = sorted(glob.glob(os.path.join(input_directory, "*.txt")))[: args.sample]
+    if not text_files:
+        print(f"No .txt files found in {input_directory}")
+        sys.exit(1)
+
+    base_prompts = load_base_prompts()
+    assistant = load_assistant(args.assistant, args.model)
+    chains = {
+        "chained": PromptChain(assistant, base_prompts, new_delimiter_instruction, args.step_timeout),
+        "fused": FusedPromptChain(assistant, base_prompts, step_timeout=args.step_timeout),
+    }
+
+    rows = []
+    agreement = {name: [0, 0] for name, _ in COMPARED_FIELDS}
+    for input_file in text_files:
+        filename = os.path.basename(input_file)
+        with open(input_file, "r", encoding="utf-8") as f:
+            essay_text = f.read()
+
+        results = {}
+        for mode, chain in chains.items():
+            print(f"{filename} [{mode}]")
+            responses, elapsed, prompt_tokens, completion_tokens = await run_one(chain, essay_text)
+            results[mode] = responses
+            row = {
+                "filename": filename,
+                "mode": mode,
+                "ok": responses is not None,
+                "seconds": round(elapsed, 3),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            }
+            for name, step in COMPARED_FIELDS:
+                row[name] = extract_field(responses[step], name) if responses else None
+            rows.append(row)
+
+        if results["chained"] and results["fused"]:
+            for name, step in COMPARED_FIELDS:
+                chained_value = extract_field(results["chained"][step], name)
+                fused_value = extract_field(results["fused"][step], name)
+                if chained_value is not None and fused_value is not None:
+                    agreement[name][1] += 1
+                    agreement[name][0] += chained_value == fused_value
+
+    output_path = f"{input_directory}-bench.csv"
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print("=" * 60)
+    for mode in chains:
+        summarize(rows, mode)
+    for name, (same, compared) in agreement.items():
+        if compared:
+            print(f"{name}: modes agree on {same}/{compared} essays")
+    print(f"Per-essay results written to {output_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,468 @@
+"""
+In-process prompt chain engine for fiver.py.
+
+Runs the prompt*.txt steps for one essay as a single gptcli ChatSession,
+calling Assistant.complete_chat directly instead of typing prompts into a
+`gpt` subprocess and polling gptcli.log for "Token usage". FusedPromptChain
+sends the same steps as one request with a structured (JSON) response.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Callable, List, Optional
+
+# Called after every attempt at a step with (step name, "done" or "failed", seconds).
+StepCallback = Callable[[str, str, float], None]
+
+import gptcli_path  # sets up sys.path; must precede any gptcli import
+from gptcli.assistant import Assistant
+from gptcli.completion import (
+    CompletionError,
+    Message,
+    MessageDeltaEvent,
+    ModelOverrides,
+    UsageEvent,
+)
+from gptcli.composite import CompositeChatListener
+from gptcli.logging import LoggingChatListener
+# load_assistant is imported from here by fiver.py and bench_fused.py.
+from gptcli.runner import load_assistant
+from gptcli.session import ChatListener, ChatSession, ResponseStreamer
+
+from timeouts import StepTimeouts
+
+START_MARKER = "<<start>>"
+END_MARKER = "<<end>>"
+
+
+class ChainError(Exception):
+    """A chain step failed and the essay has to be retried."""
+
+
+class ChainStepTimeout(ChainError):
+    pass
+
+
+class ChainStepStalled(ChainError):
+    """No tokens arrived for `stall_timeout` seconds."""
+
+
+class StreamAborted(Exception):
+    """Raised into an abandoned step's stream to stop reading it."""
+
+
+def extract_marked_response(text: str) -> str:
+    """
+    Return the text between <<start>> and <<end>>. A reply that drops either
+    marker is kept whole rather than rejected.
+    """
+    start = text.find(START_MARKER)
+    if start != -1:
+        text = text[start + len(START_MARKER):]
+    end = text.find(END_MARKER)
+    if end != -1:
+        text = text[:end]
+    return text.replace(START_MARKER, "").replace(END_MARKER, "").strip()
+
+
+class ChainStreamer(ResponseStreamer):
+    def __init__(self, listener: "ChainListener"):
+        self.listener = listener
+
+    def on_next_token(self, token: str):
+        if self.listener.aborted:
+            raise StreamAborted()
+        self.listener.last_token_time = time.monotonic()
+
+
+class ChainListener(ChatListener):
+    """
+    Records errors and usage so the chain can tell whether a step worked,
+    and when the last token arrived so a stalled stream can be abandoned.
+    """
+
+    def __init__(self):
+        self.error: Optional[Exception] = None
+        self.usage: List[Optional[UsageEvent]] = []
+        # None until the step's first token; waiting for it is not a stall.
+        self.last_token_time: Optional[float] = None
+        # Set when the chain gives up on a step; the stream stops at its next token.
+        self.aborted = False
+
+    def on_error(self, error: Exception):
+        self.error = error
+
+    def response_streamer(self) -> ResponseStreamer:
+        return ChainStreamer(self)
+
+    def on_chat_response(
+        self,
+        messages: List[Message],
+        response: Message,
+        overrides: ModelOverrides,
+        usage: Optional[UsageEvent] = None,
+    ):
+        self.usage.append(usage)
+
+
+class ChainCheckpoint:
+    """
+    The completed steps of one essay's chain, saved to `path` after every
+    step so that a retry (or a rerun after a crash) resumes from the step
+    that failed instead of re-sending the essay and re-paying for the
+    steps that already succeeded. A checkpoint written for different
+    prompts, essay text or model is ignored.
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.messages: List[Message] = []
+        self.responses: List[str] = []
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+            if saved.get("fingerprint") == fingerprint:
+                self.messages = saved["messages"]
+                self.responses = saved["responses"]
+
+    def save(self, messages: List[Message], responses: List[str]):
+        self.messages = list(messages)
+        self.responses = list(responses)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fingerprint": self.fingerprint,
+                    "messages": self.messages,
+                    "responses": self.responses,
+                },
+                f,
+            )
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        self.messages = []
+        self.responses = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PromptChain:
+    """
+    The prompt*.txt chain bound to one assistant. Each call to `run` holds
+    its own conversation (resumed from a checkpoint if one is given); the
+    essay text is only sent with the first prompt.
+
+    Each step's deadline comes from `timeouts`, which learns it from the
+    step's observed latencies (`step_timeout` until it has enough). A step
+    whose stream goes `stall_timeout` seconds without a token after its
+    first one is abandoned early; 0 disables stall detection.
+    """
+
+    def __init__(
+        self,
+        assistant: Assistant,
+        base_prompts: List[str],
+        delimiter_instruction: str,
+        step_timeout: float = 120,
+        timeouts: Optional[StepTimeouts] = None,
+        stall_timeout: float = 30,
+    ):
+        self.assistant = assistant
+        self.base_prompts = base_prompts
+        self.delimiter_instruction = delimiter_instruction
+        self.step_timeout = step_timeout
+        self.timeouts = timeouts if timeouts is not None else StepTimeouts(step_timeout)
+        self.stall_timeout = stall_timeout
+
+    @property
+    def model(self) -> str:
+        return self.assistant.config.get("model", "")
+
+    def fingerprint(self, essay_text: str) -> str:
+        """Identifies the conversation a checkpoint belongs to."""
+        digest = hashlib.sha256()
+        for part in [self.model, *self.base_prompts, essay_text]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def build_prompt(self, step: int, essay_text: str) -> str:
+        if step == 0:
+            full_prompt = f"{self.delimiter_instruction} {self.base_prompts[step]} {essay_text}"
+        else:
+            full_prompt = f"{self.delimiter_instruction} {self.base_prompts[step]}"
+        return full_prompt.replace('"', '')
+
+    async def run(
+        self,
+        essay_text: str,
+        label: str = "",
+        checkpoint: Optional[ChainCheckpoint] = None,
+        usage: Optional[List[Optional[UsageEvent]]] = None,
+        on_step: Optional[StepCallback] = None,
+    ) -> List[str]:
+        """
+        Send every prompt in order and return one extracted response per step.
+        With a checkpoint, steps it already holds are skipped and the
+        conversation continues from its saved messages; every completed step
+        is saved back to it. If `usage` is given, each response's UsageEvent
+        is appended to it; `on_step` is told how every attempted step went.
+        Raises ChainError if any step fails or exceeds `step_timeout`.
+        """
+        listener = ChainListener()
+        if usage is not None:
+            listener.usage = usage
+        session = ChatSession(
+            self.assistant, CompositeChatListener([LoggingChatListener(), listener])
+        )
+        responses: List[str] = []
+        if checkpoint is not None and checkpoint.responses:
+            session.messages = list(checkpoint.messages)
+            responses = list(checkpoint.responses)
+            print(f"{label}Resuming from prompt {str(len(responses) + 1).zfill(2)}")
+
+        for step in range(len(responses), len(self.base_prompts)):
+            prompt = self.build_prompt(step, essay_text)
+            timestamp = time.strftime("%H:%M:%S", time.localtime())
+            print(f"{label}Prompt {str(step + 1).zfill(2)} sent at {timestamp}")
+
+            started = time.monotonic()
+            try:
+                await self._wait_step(
+                    asyncio.to_thread(session.process_input, prompt, {}),
+                    listener,
+                    step_key(step),
+                    started,
+                    self.timeouts.timeout(self.model, step_key(step)),
+                )
+                if listener.error is not None:
+                    raise ChainError(f"Response {step + 1} failed: {listener.error}") from listener.error
+            except ChainError:
+                if on_step is not None:
+                    on_step(step_key(step), "failed", time.monotonic() - started)
+                raise
+            elapsed = time.monotonic() - started
+            self.timeouts.record(self.model, step_key(step), elapsed)
+            if on_step is not None:
+                on_step(step_key(step), "done", elapsed)
+
+            responses.append(extract_marked_response(session.messages[-1]["content"]))
+            if checkpoint is not None:
+                checkpoint.save(session.messages, responses)
+        return responses
+
+    async def _wait_step(self, coroutine, listener, step_name, started, timeout, stall_timeout=None):
+        """
+        Run one step, giving up when it exceeds `timeout` or its stream
+        stalls. The stall clock starts at the first token, so a request
+        that is slow to start is only bounded by `timeout`. The step's
+        thread cannot be interrupted; it is told to stop reading at its
+        next token and otherwise left to finish on its own.
+        """
+        if stall_timeout is None:
+            stall_timeout = self.stall_timeout
+        task = asyncio.ensure_future(coroutine)
+        listener.aborted = False
+        listener.last_token_time = None
+        while True:
+            now = time.monotonic()
+            wait = started + timeout - now
+            if wait <= 0:
+                listener.aborted = True
+                task.cancel()
+                self.timeouts.record_timeout(self.model, step_name)
+                raise ChainStepTimeout(f"Timeout waiting for {step_name} after {timeout:.0f}s")
+            if stall_timeout and listener.last_token_time is not None:
+                stall_wait = listener.last_token_time + stall_timeout - now
+                if stall_wait <= 0:
+                    listener.aborted = True
+                    task.cancel()
+                    self.timeouts.record_stall(self.model, step_name)
+                    raise ChainStepStalled(
+                        f"No tokens for {stall_timeout:.0f}s while waiting for {step_name}"
+                    )
+                wait = min(wait, stall_wait)
+            elif stall_timeout:
+                # Look again once the first token may have arrived.
+                wait = min(wait, stall_timeout)
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                return task.result()
+
+
+def step_key(step: int) -> str:
+    """JSON field holding the response to a step: prompt01, prompt02, ..."""
+    return f"prompt{str(step + 1).zfill(2)}"
+
+
+def parse_json_object(text: str) -> dict:
+    """
+    Parse the JSON object in a reply. Anything around the outermost braces
+    (a ```json fence, a stray sentence) is ignored, since providers without
+    structured output only follow the format loosely.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object in response")
+    result = json.loads(text[start : end + 1])
+    if not isinstance(result, dict):
+        raise ValueError("response is not a JSON object")
+    return result
+
+
+class FusedPromptChain(PromptChain):
+    """
+    The prompt*.txt chain sent as a single request. The model is asked to
+    work through every step in order and to reply with one JSON object that
+    has a field per step, so an essay costs one round trip and the essay is
+    sent once instead of with a growing history on every step.
+
+    OpenAI models are held to the schema through `response_format`; Google
+    models are asked for JSON output; other providers only get the
+    instructions in the prompt.
+    """
+
+    def __init__(
+        self,
+        assistant: Assistant,
+        base_prompts: List[str],
+        delimiter_instruction: str = "",
+        step_timeout: float = 120,
+        timeouts: Optional[StepTimeouts] = None,
+        stall_timeout: float = 30,
+    ):
+        # The delimiter instruction is not used: each step has its own field.
+        super().__init__(
+            assistant, base_prompts, delimiter_instruction, step_timeout, timeouts, stall_timeout
+        )
+
+    @property
+    def timeout(self) -> float:
+        # One request produces every step's output.
+        return self.timeouts.timeout(
+            self.model, "fused", default=self.step_timeout * len(self.base_prompts)
+        )
+
+    def response_format(self) -> dict:
+        properties = {
+            step_key(step): {"type": "string", "description": prompt.strip()}
+            for step, prompt in enumerate(self.base_prompts)
+        }
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "prompt_chain",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    def build_fused_prompt(self, essay_text: str) -> str:
+        keys = [step_key(step) for step in range(len(self.base_prompts))]
+        lines = [
+            f"Work through the following {len(self.base_prompts)} steps in order, "
+            "as if each step were a separate message in the same conversation "
+            "and could rely on your answers to the earlier steps. "
+            "Reply with a single JSON object and nothing else. It must have "
+            f"exactly these string fields: {', '.join(keys)}. Put your full "
+            "answer to each step in the field of the same number.",
+            "",
+        ]
+        for step, prompt in enumerate(self.base_prompts):
+            if step == 0:
+                lines.append(f"Step {step + 1} ({keys[step]}): {prompt.strip()} {essay_text}")
+            else:
+                lines.append(f"Step {step + 1} ({keys[step]}): {prompt.strip()}")
+        return "\n".join(lines).replace('"', '')
+
+    async def run(
+        self,
+        essay_text: str,
+        label: str = "",
+        checkpoint: Optional[ChainCheckpoint] = None,
+        usage: Optional[List[Optional[UsageEvent]]] = None,
+        on_step: Optional[StepCallback] = None,
+    ) -> List[str]:
+        """
+        Send the fused prompt and return one response per step, in the same
+        form as PromptChain.run. There are no intermediate steps to resume
+        from, so `checkpoint` is ignored; `on_step` hears about the single
+        "fused" step.
+        Raises ChainError if the request fails, exceeds `timeout`, or the
+        reply is not a JSON object with every step's field.
+        """
+        listener = ChainListener()
+        if usage is not None:
+            listener.usage = usage
+        listeners = CompositeChatListener([LoggingChatListener(), listener])
+
+        messages = self.assistant.init_messages()
+        user_message: Message = {"role": "user", "content": self.build_fused_prompt(essay_text)}
+        messages.append(user_message)
+        listeners.on_chat_message(user_message)
+
+        def complete():
+            text = ""
+            usage_event = None
+            for event in self.assistant.complete_chat(
+                messages, stream=False, response_format=self.response_format()
+            ):
+                if isinstance(event, MessageDeltaEvent):
+                    text += event.text
+                elif isinstance(event, UsageEvent):
+                    usage_event = event
+            return text, usage_event
+
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        print(f"{label}Fused prompt sent at {timestamp}")
+        started = time.monotonic()
+        try:
+            fields = await self._run_fused(listener, listeners, messages, complete, started)
+        except ChainError:
+            if on_step is not None:
+                on_step("fused", "failed", time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        self.timeouts.record(self.model, "fused", elapsed)
+        if on_step is not None:
+            on_step("fused", "done", elapsed)
+        keys = [step_key(step) for step in range(len(self.base_prompts))]
+        return [str(fields[key]).strip() for key in keys]
+
+    async def _run_fused(self, listener, listeners, messages, complete, started) -> dict:
+        try:
+            # The reply is not streamed, so there are no tokens to watch for stalls.
+            text, usage_event = await self._wait_step(
+                asyncio.to_thread(complete), listener, "fused", started, self.timeout, stall_timeout=0
+            )
+        except CompletionError as e:
+            listeners.on_error(e)
+            raise ChainError(f"Fused response failed: {e}") from e
+
+        response: Message = {"role": "assistant", "content": text}
+        listeners.on_chat_message(response)
+        listeners.on_chat_response(messages, response, {}, usage_event)
+
+        try:
+            fields = parse_json_object(text)
+        except ValueError as e:
+            raise ChainError(f"Fused response is not valid JSON: {e}") from e
+        keys = [step_key(step) for step in range(len(self.base_prompts))]
+        missing = [key for key in keys if key not in fields]
+        if missing:
+            raise ChainError(f"Fused response is missing {', '.join(missing)}")
+        return fields
@@ -1,11 +1,32 @@
 import subprocess
 import time
-import csv
 import glob
 import sys
 import os
-import re
 import shutil
+import asyncio
+import argparse
+import concurrent.futures
+import logging
+
+import gptcli_path  # sets up sys.path; must precede any gptcli import
+from batch import run_replicates_batch
+from chain import (
+    ChainCheckpoint,
+    ChainError,
+    FusedPromptChain,
+    PromptChain,
+    extract_marked_response,
+    load_assistant,
+    step_key,
+)
+from gptcli.hedging import HedgingPolicy
+from gptcli.logtail import LogTailer
+from gptcli.transcript import assistant_responses, read_transcript
+from ingest import essays_from_directory, essays_from_tsv
+from journal import RunJournal
+from results import ResultsWriter
+from timeouts import StepTimeouts
 
 # -------------------------------
 # Helper: Safe move with retries.
@@ -26,12 +47,28 @@ def safe_move(src, dst, retries=10, delay=0.5):
 # -------------------------------
 # Platform-specific GPT process spawning
 # -------------------------------
+def gpt_command(model="gpt-4o", assistant_name="GrammarHelper"):
+    """
+    The command line of the pty engine's gpt process: the gpt CLI shipped in
+    folders/gpt-cli (through run_gpt.py), run by this Python. The `gpt` on
+    PATH is the pip-installed gpt-command-line, which has no --transcript-file.
+    """
+    return [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_gpt.py"),
+        "--model",
+        model,
+        "--transcript-file",
+        transcript_file_path,
+        assistant_name,
+    ]
+
 if os.name == "nt":
     try:
         import winpty
     except ImportError:
-        print("Error: winpty is not installed. Please install it with: pip install winpty")
-        sys.exit(1)
+        # Only the PTY engine needs winpty; checked in main().
+        winpty = None
 
     class ProcessWrapper:
         """
@@ -80,22 +117,22 @@ if os.name == "nt":
             # In our case, we simply pause a moment to let the process wrap up.
             time.sleep(1)
 
-    def spawn_gpt():
+    def spawn_gpt(model="gpt-4o", assistant_name="GrammarHelper"):
         """
         Spawn the GPT process using winpty on Windows.
         Returns a ProcessWrapper that mimics subprocess.Popen.
         """
         pty_instance = winpty.PTY(cols=80, rows=24)
-        # Use a full command string. Adjust "gpt.exe" if needed.
-        pty_instance.spawn("gpt.exe --model gpt-4o GrammarHelper")
+        # winpty takes a full command string.
+        pty_instance.spawn(subprocess.list2cmdline(gpt_command(model, assistant_name)))
         return ProcessWrapper(pty_instance)
 else:
-    def spawn_gpt():
+    def spawn_gpt(model="gpt-4o", assistant_name="GrammarHelper"):
         """
         Spawn the GPT process using subprocess.Popen on non-Windows systems.
         """
         return subprocess.Popen(
-            ["gpt", "--model", "gpt-4o", "GrammarHelper"],
+            gpt_command(model, assistant_name),
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -123,110 +160,80 @@ def get_ordinal_suffix(n):
     else:
         return f"{n}th"
 
-# Set the script's directory as the working directory.
-script_directory = os.path.dirname(os.path.abspath(__file__))
-os.chdir(script_directory)
-
-# Ensure a directory is provided as an argument.
-if len(sys.argv) < 2:
-    print("Usage: python script.py <directory>")
-    sys.exit(1)
-
-input_directory = sys.argv[1].rstrip("/")  # Remove trailing slash if present
-if not os.path.isdir(input_directory):
-    print("The provided argument is not a valid directory.")
-    sys.exit(1)
-
 # New delimiter instruction.
 new_delimiter_instruction = "start your response with <<start>> and end your response with <<end>>."
 
-# Path to the GPT log file.
+# Path to the GPT log file (PTY engine only).
 log_file_path = "gptcli.log"
 
-# Get base prompts from prompt*.txt in the current directory.
-prompt_files = sorted(glob.glob("prompt*.txt"))
-if not prompt_files:
-    print("No prompt files found in the current directory.")
-    sys.exit(1)
+# One JSON record per message of the gpt session (PTY engine only). Each
+# reply adds exactly one assistant record; the pattern cannot occur inside
+# a record's content, where quotes are escaped.
+transcript_file_path = "gptcli.transcript.jsonl"
+transcript_tailer = LogTailer(transcript_file_path, '"role": "assistant"')
 
-base_prompts = []
-for prompt_file in prompt_files:
-    with open(prompt_file, "r", encoding="utf-8") as f:
-        base_prompts.append(f.read().strip())
+# Log file for the in-process engine's session transcript.
+native_log_file_path = "fiver.log"
 
-num_prompts = len(base_prompts)
-print(f"Number of base prompts found: {num_prompts}")
+# Number of times every essay is run through the chain.
+num_replicates = 5
 
-# Get text files from the provided directory.
-text_files = sorted(glob.glob(os.path.join(input_directory, "*.txt")))
-num_text_files = len(text_files)
-print(f"Number of text files found in {input_directory}: {num_text_files}")
+# Observed response latencies per model and step, kept between runs to
+# derive each step's timeout.
+latency_history_path = "step_latency.json"
 
-def count_token_usage(log_file):
-    """Count occurrences of 'Token usage' in the log file."""
-    if os.path.exists(log_file):
-        with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-            return len(re.findall(r"Token usage", f.read()))
-    return 0
+
+def load_base_prompts():
+    """Read prompt*.txt from the current directory, in filename order."""
+    base_prompts = []
+    for prompt_file in sorted(glob.glob("prompt*.txt")):
+        with open(prompt_file, "r", encoding="utf-8") as f:
+            base_prompts.append(f.read().strip())
+    return base_prompts
 
 def wait_for_responses(expected_count, timeout=120):
     """
-    Wait until the number of 'Token usage' strings in the log file
-    matches the expected count. Retries until the timeout is reached.
-    """
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        time.sleep(2)  # Check every 2 seconds
-        current_count = count_token_usage(log_file_path)
-        if current_count >= expected_count:
-            return True  # Success, we got all responses
-    return False  # Timeout reached
-
-def extract_responses_and_save(filename, iteration_successful_csvs):
-    """
-    Extract responses from gptcli.log and save them to filename.csv 
-    with preserved line breaks.
+    Wait until the transcript holds `expected_count` assistant replies,
+    or until the timeout is reached.
+    Only the bytes appended since the last check are read, and the wait
+    wakes up as soon as the transcript changes instead of every 2 seconds.
     """
-    if not os.path.exists(log_file_path):
-        print(f"Error: Log file for {filename} not found.")
-        return False
-
-    with open(log_file_path, "r", encoding="utf-8", errors="replace") as log_file:
-        log_data = log_file.read()
-
-        # Extract responses using assistant messages.
-        matches = re.findall(
-            r"gptcli-session - INFO - assistant:.*?<<start>>(.*?)<<end>>",
-            log_data, 
-            re.DOTALL
-        )
-
-        if len(matches) < num_prompts:
-            print(f"Error: Missing responses for {filename}. Expected {num_prompts}, but got {len(matches)}.")
-            return False
+    return transcript_tailer.wait_for(expected_count, timeout)
 
-        # Preserve line breaks inside responses.
-        responses = [resp.strip() for resp in matches]
+def results_header(num_prompts):
+    """Header of the combined CSV: filename, prompt01, prompt02, ..."""
+    return ["filename"] + [f"prompt{str(i+1).zfill(2)}" for i in range(num_prompts)]
 
-    csv_file = os.path.join(input_directory, f"{filename}.csv")
-    header = ["filename"] + [f"prompt{str(i+1).zfill(2)}" for i in range(num_prompts)]
+def extract_responses(filename, num_prompts):
+    """
+    Read the reply to each prompt from the gpt transcript, with preserved
+    line breaks.
+    Returns the list of responses, or None if any are missing.
+    """
+    if not os.path.exists(transcript_file_path):
+        print(f"Error: Transcript for {filename} not found.")
+        return None
 
-    with open(csv_file, mode="w", newline="", encoding="utf-8") as f_csv:
-        writer = csv.writer(f_csv, quoting=csv.QUOTE_ALL)
-        writer.writerow(header)  # Write header.
-        writer.writerow([filename] + responses)
+    # The reply to prompt N is the assistant record with step N.
+    replies = assistant_responses(read_transcript(transcript_file_path))
+    found = [step for step in range(1, num_prompts + 1) if step in replies]
+    if len(found) < num_prompts:
+        print(f"Error: Missing responses for {filename}. Expected {num_prompts}, but got {len(found)}.")
+        return None
 
-    print(f"CSV file saved: {csv_file}")
-    iteration_successful_csvs.append(csv_file)
-    return True
+    return [extract_marked_response(replies[step]) for step in range(1, num_prompts + 1)]
 
-def process_text_file(input_file, base_prompts, new_delimiter_instruction, iteration_successful_csvs):
+def process_text_file(essay, input_directory, base_prompts, new_delimiter_instruction, model="gpt-4o", assistant_name="GrammarHelper", step_timeouts=None, on_step=None):
     """
-    Runs a GPT session for a single text file and handles up to 10 retries
-    if there's a timeout waiting for responses.
-    Returns True if processing eventually succeeds, otherwise False.
+    Runs a GPT session for a single essay and handles up to 10 retries
+    if there's a timeout waiting for responses. Each step's timeout comes
+    from `step_timeouts` (a fixed 120 seconds without it), and `on_step`
+    is told how every attempted step went.
+    Returns the responses if processing eventually succeeds, otherwise None.
     """
-    filename = os.path.splitext(os.path.basename(input_file))[0]
+    if step_timeouts is None:
+        step_timeouts = StepTimeouts(min_samples=float("inf"))
+    filename = essay.name
     failure_counter = 0
 
     while failure_counter < 10:
@@ -237,12 +244,17 @@ def process_text_file(input_file, base_prompts, new_delimiter_instruction, itera
             )
             safe_move(log_file_path, error_logfile)
             print(f"Saved failed attempt log: {error_logfile}")
+        if os.path.exists(transcript_file_path):
+            safe_move(
+                transcript_file_path,
+                os.path.join(input_directory, f"gptcli_{filename}_error{failure_counter + 1}.jsonl"),
+            )
+        transcript_tailer.reset()  # Count from the start of the new transcript.
 
-        with open(input_file, "r", encoding="utf-8") as f_in:
-            file_text = f_in.read().strip()
+        file_text = essay.read()
 
         # Start a new GPT process for this file using our spawn_gpt() helper.
-        process = spawn_gpt()
+        process = spawn_gpt(model, assistant_name)
 
         # Read the initial prompt from GPT (for Windows, our wrapper provides readline()).
         process.stdout.readline()
@@ -263,9 +275,17 @@ def process_text_file(input_file, base_prompts, new_delimiter_instruction, itera
             print(f"Prompt {str(i+1).zfill(2)} sent at {timestamp}")
             
             # Wait for the response before sending the next prompt.
-            success = wait_for_responses(i + 1)
-            if not success:
-                print(f"Error: Timeout waiting for response {i + 1} for {filename}. Retrying...")
+            started = time.monotonic()
+            timeout = step_timeouts.timeout(model, step_key(i))
+            success = wait_for_responses(i + 1, timeout)
+            elapsed = time.monotonic() - started
+            if on_step is not None:
+                on_step(step_key(i), "done" if success else "failed", elapsed)
+            if success:
+                step_timeouts.record(model, step_key(i), elapsed)
+            else:
+                print(f"Error: Timeout waiting for response {i + 1} for {filename} after {timeout:.0f}s. Retrying...")
+                step_timeouts.record_timeout(model, step_key(i))
                 failure_counter += 1
                 process.kill()
                 break  # Restart the GPT process.
@@ -275,18 +295,170 @@ def process_text_file(input_file, base_prompts, new_delimiter_instruction, itera
             process.stdin.flush()
             process.communicate()
 
-            # Extract responses and save CSV.
-            if extract_responses_and_save(filename, iteration_successful_csvs):
+            # Extract responses.
+            responses = extract_responses(filename, len(base_prompts))
+            if responses is not None:
                 new_logfile = os.path.join(input_directory, f"gptcli_{filename}.txt")
-                safe_move(log_file_path, new_logfile)
+                if os.path.exists(log_file_path):
+                    safe_move(log_file_path, new_logfile)
+                safe_move(transcript_file_path, os.path.join(input_directory, f"gptcli_{filename}.jsonl"))
                 # print(f"Renamed log file: {new_logfile}")
-                return True  # success
+                return responses  # success
             else:
                 print(f"Error processing {filename}, retrying...")
                 failure_counter += 1
 
     print(f"Error: Reached max retries (10) for {filename}.")
-    return False
+    return None
+
+async def process_text_file_native(essay, checkpoint_directory, chain, on_step=None):
+    """
+    Runs the prompt chain in-process for a single essay and handles up
+    to 10 retries if a step fails or times out. Each retry resumes from
+    the step that failed. `on_step` is passed on to the chain.
+    Returns the responses on success, otherwise None.
+    """
+    filename = essay.name
+    label = f"[{filename}] "
+    file_text = essay.read()
+
+    # Completed steps survive a failed attempt (and a crash), so retries
+    # only re-send the steps that are still missing.
+    checkpoint = ChainCheckpoint(
+        os.path.join(checkpoint_directory, f"{filename}.checkpoint.json"),
+        chain.fingerprint(file_text),
+    )
+
+    for failure_counter in range(10):
+        try:
+            responses = await chain.run(file_text, label=label, checkpoint=checkpoint, on_step=on_step)
+        except ChainError as e:
+            print(f"Error: {e} for {filename}. Retrying...")
+            continue
+
+        checkpoint.clear()
+        return responses
+
+    print(f"Error: Reached max retries (10) for {filename}.")
+    return None
+
+def journal_step_recorder(journal, essay, replicate):
+    """An on_step callback that records each step attempt of one unit in the journal."""
+    def record(step, status, seconds):
+        journal.record_step(essay, replicate, step, status, seconds)
+    return record
+
+def journal_unit_finisher(journal, essay, replicate):
+    """An on_written callback that marks one unit done in the journal."""
+    def finish():
+        journal.finish_unit(essay, replicate, "done")
+    return finish
+
+async def run_replicates_native(essays, input_directory, chain, num_replicates, results_writer, journal, concurrency=1):
+    """
+    Run `num_replicates` independent chains per essay in a single pass,
+    with up to `concurrency` chains in flight. Units are queued essay by
+    essay, so an essay's later replicates never wait behind the rest of the
+    corpus. Each finished unit is appended to `results_writer` right away,
+    in queue order (every replicate of the first essay, then the next
+    essay, ...). Checkpoints for replicate N live in the "Nth-iteration"
+    folder. Units the journal already has as done are skipped, and every
+    unit and step is recorded in it.
+    Returns one list per replicate holding True for each essay that
+    succeeded (now or in an earlier run) and False for each essay that
+    failed.
+    """
+    # Every in-flight step occupies one thread; size the pool so timed-out
+    # steps that are still draining do not starve the workers.
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=concurrency * 2)
+    )
+
+    checkpoint_directories = replicate_directories(input_directory, num_replicates)
+
+    done_units = journal.done_units()
+    queue = asyncio.Queue()
+    results = [[False] * len(essays) for _ in range(num_replicates)]
+    for index, essay in enumerate(essays):
+        for replicate in range(num_replicates):
+            if (essay.name, replicate + 1) in done_units:
+                results[replicate][index] = True
+            else:
+                queue.put_nowait((queue.qsize(), replicate, index, essay))
+    if done_units:
+        print(f"Resuming: {queue.qsize()} of {len(essays) * num_replicates} units left to run.")
+    # Signalled whenever rows are written, so workers held back by a full
+    # reorder buffer can go on.
+    written = asyncio.Condition()
+
+    async def worker():
+        while not queue.empty():
+            sequence, replicate, index, essay = queue.get_nowait()
+            async with written:
+                await written.wait_for(lambda: results_writer.has_room(sequence))
+
+            filename = essay.name
+            print(f"Processing: {filename} ({get_ordinal_suffix(replicate + 1)} iteration)")
+            journal.start_unit(filename, replicate + 1)
+            responses = await process_text_file_native(
+                essay,
+                checkpoint_directories[replicate],
+                chain,
+                on_step=journal_step_recorder(journal, filename, replicate + 1),
+            )
+            if responses is None:
+                journal.finish_unit(filename, replicate + 1, "failed")
+                results_writer.skip(sequence)
+            else:
+                # Only done once the row is in the combined CSV.
+                results_writer.put(
+                    sequence,
+                    [filename] + responses,
+                    on_written=journal_unit_finisher(journal, filename, replicate + 1),
+                )
+                results[replicate][index] = True
+            async with written:
+                written.notify_all()
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, queue.qsize()))))
+    return results
+
+def replicate_directories(input_directory, num_replicates):
+    """Create and return the "Nth-iteration" checkpoint folder of every replicate."""
+    directories = []
+    for replicate in range(1, num_replicates + 1):
+        replicate_directory = os.path.join(input_directory, f"{get_ordinal_suffix(replicate)}-iteration")
+        os.makedirs(replicate_directory, exist_ok=True)
+        directories.append(replicate_directory)
+    return directories
+
+def finish_iteration_folders(input_directory, replicate_results):
+    """
+    Remove the checkpoint folder of every replicate in which all essays
+    succeeded (if it is empty); merge the others into "Nth-iteration_error".
+    """
+    for iteration, results in enumerate(replicate_results, start=1):
+        iteration_suffix = get_ordinal_suffix(iteration)
+        iteration_directory = os.path.join(input_directory, f"{iteration_suffix}-iteration")
+        if all(results):
+            if not os.listdir(iteration_directory):
+                os.rmdir(iteration_directory)
+            continue
+
+        subfolder_name = f"{iteration_suffix}-iteration_error"
+        print(f"[Iteration {iteration_suffix}] {results.count(False)} essays failed; "
+              f"moving their checkpoints to subfolder: {subfolder_name}")
+        merge_folder(iteration_directory, os.path.join(input_directory, subfolder_name))
+
+def merge_folder(source, destination):
+    """Move every file in `source` into `destination`, then remove `source`."""
+    os.makedirs(destination, exist_ok=True)
+    for item in os.listdir(source):
+        target = os.path.join(destination, item)
+        if os.path.exists(target):
+            os.remove(target)
+        shutil.move(os.path.join(source, item), target)
+    os.rmdir(source)
 
 def move_non_txt_files_into_subfolder(input_directory, subfolder_name, original_txt_files):
     """
@@ -308,68 +480,302 @@ def move_non_txt_files_into_subfolder(input_directory, subfolder_name, original_
                 os.remove(destination)
             shutil.move(item_full_path, destination)
 
-# -------------------------------
-# Main 5-iteration loop
-# -------------------------------
-# Store the full paths to the original .txt files so we don't move them:
-original_txt_files = [
-    os.path.join(input_directory, os.path.basename(tf))
-    for tf in text_files
-]
-
-# We will keep appending to this combined CSV file each iteration.
-combined_csv_path = os.path.join(
-    script_directory, f"{os.path.basename(input_directory)}.csv"
-)
+def report_step_timeouts(step_timeouts):
+    """Save the observed latencies and print per-step timeouts, timeouts hit and stalls."""
+    step_timeouts.save(latency_history_path)
+    print("Per-step latency and timeouts:")
+    for line in step_timeouts.summary_lines():
+        print(f"  {line}")
+
+def report_journal(journal):
+    """Print how many essay x replicate units are done, failed or still to run."""
+    counts = journal.counts()
+    left = sum(count for status, count in counts.items() if status not in ("done", "failed"))
+    print(f"Journal: {counts.get('done', 0)} units done, {counts.get('failed', 0)} failed, "
+          f"{left} not run yet ({journal.path}).")
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run the prompt*.txt chain over every .txt file in a directory, five times."
+    )
+    parser.add_argument(
+        "directory",
+        help="Directory containing one .txt file per essay; with --input-tsv, the working directory for logs and checkpoints.",
+    )
+    parser.add_argument(
+        "--input-tsv",
+        help="Read the essays straight from this TSV (header row, then name<TAB>text) instead of from .txt files.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["native", "pty", "batch"],
+        default="native",
+        help="`native` (default) calls gptcli in-process; `pty` drives the gpt CLI from folders/gpt-cli as a subprocess; "
+             "`batch` sends each prompt for every essay as one OpenAI or Anthropic batch (slow, but half the price).",
+    )
+    parser.add_argument("--assistant", default="GrammarHelper", help="gpt-cli assistant to use.")
+    parser.add_argument("--model", default="gpt-4o", help="Model to use for every prompt.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of essays to process at once (native engine only).",
+    )
+    parser.add_argument(
+        "--step-timeout",
+        type=float,
+        default=120,
+        help="Seconds to wait for each response until enough latencies have been seen to derive per-step timeouts.",
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=30,
+        help="Give up on a response after this many seconds without a token; 0 disables (native engine only).",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="Send the whole chain as one request with a JSON field per prompt (native engine only).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate of any request slower than the model's p95 and keep the first to answer "
+             "(native engine only, not with --fused).",
+    )
+    parser.add_argument(
+        "--max-hedge-rate",
+        type=float,
+        default=0.05,
+        help="Largest fraction of requests that may be duplicated by --hedge.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60,
+        help="Seconds between checks on a submitted batch (batch engine only).",
+    )
+    return parser.parse_args()
+
+def main():
+    # Set the script's directory as the working directory.
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_directory)
+
+    args = parse_args()
+
+    input_directory = args.directory.rstrip("/")  # Remove trailing slash if present
+    if args.input_tsv is not None:
+        if not os.path.isfile(args.input_tsv):
+            print(f"Input TSV not found: {args.input_tsv}")
+            sys.exit(1)
+        os.makedirs(input_directory, exist_ok=True)
+    elif not os.path.isdir(input_directory):
+        print("The provided argument is not a valid directory.")
+        sys.exit(1)
+
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1.")
+        sys.exit(1)
+
+    if args.engine == "pty" and args.concurrency > 1:
+        # Every gpt subprocess writes to the same gptcli.log.
+        print("The pty engine can only process one essay at a time; use --engine native for --concurrency.")
+        sys.exit(1)
+
+    if args.engine == "pty" and args.hedge:
+        print("--hedge needs the native engine.")
+        sys.exit(1)
+
+    if args.engine == "pty" and args.fused:
+        print("--fused needs the native engine.")
+        sys.exit(1)
+
+    if args.hedge and args.fused:
+        # Only streamed requests are hedged, and the fused request is not streamed.
+        print("--hedge cannot be combined with --fused.")
+        sys.exit(1)
 
-for iteration in range(1, 6):
-    iteration_suffix = get_ordinal_suffix(iteration)  # e.g. "1st", "2nd", etc.
-    print("=" * 60)
-    print(f"Starting {iteration_suffix} iteration...")
-    print("=" * 60)
-
-    # Track CSV files created this iteration.
-    iteration_successful_csvs = []
-    iteration_success = True
-
-    # Process each text file.
-    for input_file in text_files:
-        print(f"Processing: {input_file}")
-        result = process_text_file(
-            input_file,
+    if args.engine == "batch" and (args.hedge or args.fused):
+        print("--hedge and --fused need the native engine.")
+        sys.exit(1)
+
+    if args.engine == "pty" and os.name == "nt" and winpty is None:
+        print("Error: winpty is not installed. Please install it with: pip install winpty")
+        sys.exit(1)
+
+    # Get base prompts from prompt*.txt in the current directory.
+    base_prompts = load_base_prompts()
+    if not base_prompts:
+        print("No prompt files found in the current directory.")
+        sys.exit(1)
+
+    num_prompts = len(base_prompts)
+    print(f"Number of base prompts found: {num_prompts}")
+
+    # Essays are indexed up front but only read when they are processed.
+    if args.input_tsv is not None:
+        essays = essays_from_tsv(args.input_tsv)
+        print(f"Number of essays found in {args.input_tsv}: {len(essays)}")
+    else:
+        essays = essays_from_directory(input_directory)
+        print(f"Number of text files found in {input_directory}: {len(essays)}")
+
+    step_timeouts = StepTimeouts(args.step_timeout)
+    step_timeouts.load(latency_history_path)
+
+    chain = None
+    if args.engine in ("native", "batch"):
+        logging.basicConfig(
+            filename=native_log_file_path,
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        )
+        assistant = load_assistant(args.assistant, args.model)
+        if args.hedge:
+            assistant.hedging = HedgingPolicy(max_hedge_rate=args.max_hedge_rate)
+        chain_class = FusedPromptChain if args.fused else PromptChain
+        chain = chain_class(
+            assistant,
             base_prompts,
             new_delimiter_instruction,
-            iteration_successful_csvs
+            step_timeout=args.step_timeout,
+            timeouts=step_timeouts,
+            stall_timeout=args.stall_timeout,
         )
-        if not result:
-            iteration_success = False
-            # Optionally, break out of the loop if desired.
-            # break
-
-    # If this iteration generated any CSV files, append them to the combined CSV.
-    if iteration_successful_csvs:
-        file_already_exists = os.path.exists(combined_csv_path)
-        mode = "a" if file_already_exists else "w"
-        with open(combined_csv_path, mode=mode, newline="", encoding="utf-8") as combined_csv:
-            writer = csv.writer(combined_csv)
-            for i, csv_file in enumerate(iteration_successful_csvs):
-                with open(csv_file, mode="r", encoding="utf-8") as f_csv:
-                    reader = csv.reader(f_csv)
-                    rows = list(reader)
-                    if (not file_already_exists) and i == 0:
-                        writer.writerows(rows)  # Write header.
-                    else:
-                        writer.writerows(rows[1:])  # Skip header for appended files.
-
-        print(f"[Iteration {iteration_suffix}] Appended to combined CSV: {combined_csv_path}")
-
-    # Decide the subfolder name.
-    if iteration_success:
-        subfolder_name = f"{iteration_suffix}-iteration"
-    else:
-        subfolder_name = f"{iteration_suffix}-iteration_error"
 
-    print(f"Moving non-txt files to subfolder: {subfolder_name}")
-    move_non_txt_files_into_subfolder(input_directory, subfolder_name, original_txt_files)
+    # -------------------------------
+    # Main iteration loop
+    # -------------------------------
+    # Store the full paths to the original .txt files so we don't move them
+    # (there are none when the essays come from a TSV):
+    original_txt_files = [] if args.input_tsv is not None else [
+        os.path.join(input_directory, f"{essay.name}.txt")
+        for essay in essays
+    ]
+
+    # Every finished essay is appended to this combined CSV right away.
+    combined_csv_path = os.path.join(
+        script_directory, f"{os.path.basename(input_directory)}.csv"
+    )
+    header = results_header(num_prompts)
+
+    # Every essay x replicate and every step is journaled as it runs, so
+    # rerunning the same directory resumes exactly the units not done yet.
+    # All updates are committed immediately, so a crash or Ctrl-C loses none.
+    journal = RunJournal(os.path.join(
+        script_directory, f"{os.path.basename(input_directory)}.journal.sqlite"
+    ))
+    journal.add_units([essay.name for essay in essays], num_replicates)
+
+    if args.engine == "batch":
+        # One batch round per prompt; every unit's row arrives in the last
+        # round, so the reorder buffer must hold all of them.
+        print("=" * 60)
+        print(f"Starting {num_replicates} iterations as batches...")
+        print("=" * 60)
+        with ResultsWriter(
+            combined_csv_path, header, max_pending=max(64, len(essays) * num_replicates)
+        ) as results_writer:
+            replicate_results = run_replicates_batch(
+                essays,
+                input_directory,
+                replicate_directories(input_directory, num_replicates),
+                chain,
+                results_writer,
+                journal,
+                poll_interval=args.poll_interval,
+            )
+        print(f"Appended {results_writer.rows_written} rows to combined CSV: {combined_csv_path}")
+        finish_iteration_folders(input_directory, replicate_results)
+        report_journal(journal)
+        journal.close()
+        print(f"All {num_replicates} iterations complete.")
+        return
+
+    if chain is not None:
+        # Every replicate of every essay is scheduled in one pass. Rows are
+        # written essay by essay; failed units leave their checkpoint in the
+        # replicate's folder.
+        print("=" * 60)
+        print(f"Starting {num_replicates} iterations in one pass...")
+        print("=" * 60)
+        with ResultsWriter(
+            combined_csv_path, header, max_pending=max(64, args.concurrency * 4)
+        ) as results_writer:
+            replicate_results = asyncio.run(
+                run_replicates_native(
+                    essays, input_directory, chain, num_replicates, results_writer, journal, args.concurrency
+                )
+            )
+        print(f"Appended {results_writer.rows_written} rows to combined CSV: {combined_csv_path}")
+        report_step_timeouts(step_timeouts)
+        if chain.assistant.hedging is not None:
+            stats = chain.assistant.hedging.stats()
+            print(f"Hedged {stats['hedges']} of {stats['requests']} requests; "
+                  f"the duplicate answered first {stats['hedge_wins']} times.")
+
+        finish_iteration_folders(input_directory, replicate_results)
+        report_journal(journal)
+        journal.close()
+        print(f"All {num_replicates} iterations complete.")
+        return
+
+    done_units = journal.done_units()
+    with ResultsWriter(combined_csv_path, header) as results_writer:
+        sequence = 0
+        for iteration in range(1, num_replicates + 1):
+            iteration_suffix = get_ordinal_suffix(iteration)  # e.g. "1st", "2nd", etc.
+            print("=" * 60)
+            print(f"Starting {iteration_suffix} iteration...")
+            print("=" * 60)
+
+            iteration_success = True
+
+            # Process each essay.
+            for essay in essays:
+                filename = essay.name
+                if (filename, iteration) in done_units:
+                    continue
+                print(f"Processing: {filename}")
+                journal.start_unit(filename, iteration)
+                responses = process_text_file(
+                    essay,
+                    input_directory,
+                    base_prompts,
+                    new_delimiter_instruction,
+                    args.model,
+                    args.assistant,
+                    step_timeouts,
+                    journal_step_recorder(journal, filename, iteration),
+                )
+                if responses is None:
+                    iteration_success = False
+                    journal.finish_unit(filename, iteration, "failed")
+                    results_writer.skip(sequence)
+                else:
+                    results_writer.put(
+                        sequence,
+                        [filename] + responses,
+                        on_written=journal_unit_finisher(journal, filename, iteration),
+                    )
+                sequence += 1
+
+            # Decide the subfolder name.
+            if iteration_success:
+                subfolder_name = f"{iteration_suffix}-iteration"
+            else:
+                subfolder_name = f"{iteration_suffix}-iteration_error"
+
+            print(f"Moving log files to subfolder: {subfolder_name}")
+            move_non_txt_files_into_subfolder(input_directory, subfolder_name, original_txt_files)
+
+    print(f"Appended {results_writer.rows_written} rows to combined CSV: {combined_csv_path}")
+    report_step_timeouts(step_timeouts)
+    report_journal(journal)
+    journal.close()
+    print(f"All {num_replicates} iterations complete.")
 
-print("All 5 iterations complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Put the gptcli package shipped in folders/gpt-cli on sys.path.
+
+The gpt-multi scripts import this before anything from gptcli, so they use
+that copy rather than a pip-installed gpt-command-line and both pipelines
+run the same completion code.
+"""
+import os
+import sys
+
+script_directory = os.path.dirname(os.path.abspath(__file__))
+gptcli_directory = os.path.normpath(os.path.join(script_directory, "..", "gpt-cli"))
+
+if os.path.isdir(os.path.join(gptcli_directory, "gptcli")) and gptcli_directory not in sys.path:
+    # Right after this folder, so its scripts still win over the ones in
+    # gpt-cli with the same name (fiver.py).
+    position = sys.path.index(script_directory) + 1 if script_directory in sys.path else 0
+    sys.path.insert(position, gptcli_directory)
@@ -1,46 +1,12 @@
 import sys
 import os
 import subprocess
-from collections import Counter
-import csv
-
-import re
-import unicodedata
-
-
-def clean_text(text):
-    # Normalize unicode
-    text = unicodedata.normalize("NFKC", text)
-
-    # Convert quote/apostrophe variants to plain apostrophe
-    quote_variants = [
-        "‘", "’", "‚", "‛",
-        "“", "”", "„", "‟",
-        "`", "´", "′", "″"
-    ]
-
-    for char in quote_variants:
-        text = text.replace(char, "'")
-
-    # Remove all line breaks and tabs
-    text = text.replace("\r", " ")
-    text = text.replace("\n", " ")
-    text = text.replace("\t", " ")
-
-    # Keep only:
-    # letters, numbers, spaces, and ! ? . , - '
-    text = re.sub(r"[^A-Za-z0-9 !?\.,\-']", "", text)
-
-    # Collapse repeated whitespace
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text
 
 
 def main():
     # 1. Receive directory name as argument
     if len(sys.argv) < 2:
-        print("Usage: python simplified_script.py <directory_name>")
+        print("Usage: python simplified_script.py <directory_name> [fiver.py options]")
         sys.exit(1)
 
     directory_name = sys.argv[1].strip()
@@ -55,77 +21,35 @@ def main():
         print(f"Error: TSV file '{tsv_file}' not found.")
         sys.exit(1)
 
-    # 3. Create output directory
+    # 3. Create the output directory (checkpoints and iteration folders).
     directory_path = os.path.join(script_dir, directory_name)
 
     if not os.path.exists(directory_path):
         os.makedirs(directory_path)
 
-    # 4-6. Read TSV and create one text file per row
-    with open(tsv_file, "r", encoding="utf-8") as f:
-
-        # Skip header
-        next(f)
-
-        for line in f:
-
-            line = line.rstrip("\r\n")
-
-            if "\t" not in line:
-                continue
-
-            filename, text_content = line.split("\t", 1)
-
-            filename = filename.strip()
+    # 4. fiver.py reads the essays straight from the TSV (one row each,
+    #    cleaned as it goes) and resumes from its run journal, so the TSV is
+    #    no longer split into one .txt file per row.
+    journal_path = os.path.join(script_dir, f"{directory_name}.journal.sqlite")
+    if os.path.isfile(journal_path):
+        print(f"Found run journal '{journal_path}'; fiver.py will skip the work already done.")
 
-            if not filename:
-                continue
-
-            text_content = clean_text(text_content)
-
-            txt_file_path = os.path.join(
-                directory_path,
-                f"{filename}.txt"
-            )
-
-            with open(txt_file_path, "w", encoding="utf-8") as txt_file:
-                txt_file.write(text_content)
-
-    # 7. Delete the TSV file now that splitting is done
-    if os.path.isfile(tsv_file):
-        os.remove(tsv_file)
-        print(f"Deleted TSV file: {tsv_file}")
-
-    # 8. Check for a file named [directory_name].csv; if it exists, remove .txt files
-    #    in [directory_name] for any first-column value that appears >= 5 times.
-    csv_path = os.path.join(script_dir, f"{directory_name}.csv")
-    if os.path.isfile(csv_path):
-        print(f"Checking '{csv_path}' for values that appear 5 or more times...")
-        counts = Counter()
-        with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader, None)  # Skip CSV header
-            for row in reader:
-                if row and row[0].strip():
-                    counts[row[0].strip()] += 1
-
-        # For each key in counts, if it appears >= 5 times, delete the .txt file
-        for key, count in counts.items():
-            if count >= 5:
-                text_file = os.path.join(directory_path, f"{key}.txt")
-                if os.path.isfile(text_file):
-                    os.remove(text_file)
-                    print(f"Deleted file: {text_file}")
-    else:
-        print(f"No CSV file named '{directory_name}.csv' found. Skipping that step.")
-
-    # 9. Run fiver.py with [directory_name] as an argument
+    # 5. Run fiver.py on [directory_name] with the TSV as its input, passing
+    #    on any extra options (e.g. --concurrency 32)
     fiver_script = os.path.join(script_dir, "fiver.py")
     if os.path.isfile(fiver_script):
-        subprocess.run([sys.executable, fiver_script, directory_path], check=True)
+        subprocess.run(
+            [sys.executable, fiver_script, directory_path, "--input-tsv", tsv_file, *sys.argv[2:]],
+            check=True,
+        )
     else:
         print(f"Warning: 'fiver.py' not found in {script_dir}. Skipping this step.")
 
+    # 6. Delete the TSV file now that every essay has been read from it
+    if os.path.isfile(tsv_file):
+        os.remove(tsv_file)
+        print(f"Deleted TSV file: {tsv_file}")
+
     print("Operation completed successfully.")
 
 if __name__ == "__main__":
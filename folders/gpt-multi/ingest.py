@@ -0,0 +1,105 @@
+"""
+Essay loading for fiver.py.
+
+Essays come either straight from the input TSV, indexed once by
+gptcli.jobtable.JobTable without writing a .txt file per row, or from a
+directory of .txt files. Either way each essay is a name plus a `read()`
+that returns its text, and texts are only read when a worker needs them.
+"""
+import glob
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import gptcli_path  # sets up sys.path; must precede any gptcli import
+from gptcli.jobtable import JobTable
+
+Essay = namedtuple("Essay", ["name", "read"])
+
+
+# Quote/apostrophe variants that become a plain apostrophe. "`" is the only
+# ASCII one and is handled by ASCII_TABLE.
+QUOTE_VARIANTS = re.compile("[‘’‚‛“”„‟´′″]")
+
+# Characters kept by clean_text: letters, numbers, spaces, and ! ? . , - '
+ALLOWED_BYTES = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 !?.,-'"
+
+
+def _ascii_table():
+    """bytes.translate table and delete set: "`" -> "'", CR/LF/tab -> space, drop the rest."""
+    table = bytearray(range(256))
+    table[ord("`")] = ord("'")
+    for whitespace in b"\r\n\t":
+        table[whitespace] = ord(" ")
+    delete = bytes(
+        byte for byte in range(256) if byte not in ALLOWED_BYTES and table[byte] == byte
+    )
+    return bytes(table), delete
+
+
+ASCII_TABLE, ASCII_DELETE = _ascii_table()
+
+# Below this many texts clean_texts does not start a process pool.
+MIN_PARALLEL_TEXTS = 2000
+
+
+def clean_text(text):
+    """
+    NFKC-normalize `text`, turn quote variants into apostrophes, keep only
+    letters, numbers, spaces and ! ? . , - ' and collapse runs of
+    whitespace. ASCII text (NFKC leaves it unchanged) goes straight to one
+    bytes.translate pass.
+    """
+    if not text.isascii():
+        text = QUOTE_VARIANTS.sub("'", unicodedata.normalize("NFKC", text))
+    # Every character still outside ASCII is one clean_text drops.
+    data = text.encode("ascii", errors="ignore").translate(ASCII_TABLE, ASCII_DELETE)
+    # Spaces are the only whitespace left after translate.
+    return b" ".join(data.split()).decode("ascii")
+
+
+def clean_texts(texts, processes=None, chunksize=500):
+    """
+    clean_text for many texts at once, in order. Large batches are spread
+    over a pool of `processes` worker processes (one per CPU by default);
+    `processes=1` or a small batch cleans in this process.
+
+    essays_from_tsv cleans each essay lazily as a worker reads it instead,
+    so a run never holds the whole corpus; this is for cleaning a corpus up
+    front (bench_clean.py measures both).
+    """
+    texts = list(texts)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(texts) < MIN_PARALLEL_TEXTS:
+        return [clean_text(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(clean_text, texts, chunksize=chunksize))
+
+
+def read_text_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def essays_from_directory(input_directory):
+    """One essay per .txt file in `input_directory`, in filename order."""
+    return [
+        Essay(os.path.splitext(os.path.basename(path))[0], partial(read_text_file, path))
+        for path in sorted(glob.glob(os.path.join(input_directory, "*.txt")))
+    ]
+
+
+def essays_from_tsv(tsv_path):
+    """
+    One essay per row of the input TSV (header skipped, first column is the
+    name, the rest is the text, a repeated name keeps its last row), with
+    the text cleaned by clean_text. Ordered as essays_from_directory would
+    order the .txt files the rows used to be split into.
+    """
+    table = JobTable.from_tsv(tsv_path, clean=clean_text)
+    jobs = sorted(table, key=lambda job: f"{job.name}.txt")
+    return [Essay(job.name, partial(table.text, job)) for job in jobs]
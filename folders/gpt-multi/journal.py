@@ -0,0 +1,102 @@
+"""
+SQLite journal of a gpt-multi run.
+
+Records every essay x replicate ("unit") and every chain step with its
+status, number of attempts and timings, so an interrupted run can be
+resumed by skipping exactly the units that are already done.
+"""
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    essay TEXT NOT NULL,
+    replicate INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started REAL,
+    finished REAL,
+    PRIMARY KEY (essay, replicate)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    essay TEXT NOT NULL,
+    replicate INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started REAL,
+    finished REAL,
+    seconds REAL,
+    PRIMARY KEY (essay, replicate, step)
+);
+"""
+
+
+class RunJournal:
+    """
+    Unit statuses: pending, running, done, failed. A unit is only marked
+    done once its row is in the combined CSV; units left running by a
+    crash or Ctrl-C count as not done and are run again.
+    Replicates are numbered from 1. Times are Unix timestamps.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit: every update is durable as soon as it returns.
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def add_units(self, essays, num_replicates):
+        """Register every essay x replicate; units already journaled keep their status."""
+        # One transaction rather than one commit per unit.
+        self.connection.execute("BEGIN")
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO units (essay, replicate) VALUES (?, ?)",
+            [(essay, replicate) for essay in essays for replicate in range(1, num_replicates + 1)],
+        )
+        self.connection.execute("COMMIT")
+
+    def done_units(self):
+        """The set of (essay, replicate) pairs that are done."""
+        rows = self.connection.execute("SELECT essay, replicate FROM units WHERE status = 'done'")
+        return set(rows)
+
+    def start_unit(self, essay, replicate):
+        self.connection.execute(
+            "UPDATE units SET status = 'running', attempts = attempts + 1, started = ?, finished = NULL "
+            "WHERE essay = ? AND replicate = ?",
+            (time.time(), essay, replicate),
+        )
+
+    def finish_unit(self, essay, replicate, status):
+        self.connection.execute(
+            "UPDATE units SET status = ?, finished = ? WHERE essay = ? AND replicate = ?",
+            (status, time.time(), essay, replicate),
+        )
+
+    def record_step(self, essay, replicate, step, status, seconds):
+        """Record one attempt at a step that took `seconds` and ended with `status` (done or failed)."""
+        finished = time.time()
+        self.connection.execute(
+            "INSERT INTO steps (essay, replicate, step, status, attempts, started, finished, seconds) "
+            "VALUES (?, ?, ?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT (essay, replicate, step) DO UPDATE SET "
+            "status = excluded.status, attempts = attempts + 1, started = excluded.started, "
+            "finished = excluded.finished, seconds = excluded.seconds",
+            (essay, replicate, step, status, finished - seconds, finished, seconds),
+        )
+
+    def counts(self):
+        """Number of units per status."""
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM units GROUP BY status"))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,99 @@
+"""
+Append-only writer for the combined results CSV.
+
+Rows are appended as soon as each essay finishes, instead of every essay
+writing its own CSV that is re-read and merged at the end of an iteration.
+"""
+import csv
+import os
+import time
+
+
+class ResultsWriter:
+    """
+    Appends rows to `path` in sequence order (0, 1, 2, ...) no matter in
+    which order they arrive. A row that arrives early waits in a reorder
+    buffer until every row before it has been written or skipped; callers
+    keep the buffer bounded by not starting unit N until `has_room(N)`.
+
+    The file is flushed after every write, and fsync'ed at most every
+    `fsync_interval` seconds and on close, so a crash loses at most the
+    rows still waiting in the buffer. The header is only written when the
+    file is new or empty, so an interrupted run can be appended to.
+    """
+
+    def __init__(self, path, header, max_pending=64, fsync_interval=5.0):
+        self.path = path
+        self.max_pending = max_pending
+        self.fsync_interval = fsync_interval
+        self.next_sequence = 0
+        self.pending = {}
+        self.rows_written = 0
+        self.last_fsync = time.monotonic()
+
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, mode="a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if write_header:
+            self.writer.writerow(header)
+            self.file.flush()
+
+    def has_room(self, sequence):
+        """True if the row for `sequence` may be started without the buffer exceeding `max_pending`."""
+        return sequence < self.next_sequence + self.max_pending
+
+    def put(self, sequence, row, on_written=None):
+        """
+        Queue the row for `sequence`. `on_written`, if given, is called once
+        the row has been written and flushed.
+        """
+        self.pending[sequence] = (row, on_written)
+        self._drain()
+
+    def skip(self, sequence):
+        """Record that `sequence` produced no row (e.g. the essay failed)."""
+        self.pending[sequence] = None
+        self._drain()
+
+    def _drain(self):
+        written = []
+        while self.next_sequence in self.pending:
+            entry = self.pending.pop(self.next_sequence)
+            if entry is not None:
+                self.writer.writerow(entry[0])
+                written.append(entry)
+            self.next_sequence += 1
+        self._flushed(written)
+
+    def _flushed(self, written):
+        if not written:
+            return
+        self.rows_written += len(written)
+        self.file.flush()
+        if time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self._fsync()
+        for _, on_written in written:
+            if on_written is not None:
+                on_written()
+
+    def _fsync(self):
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        # Rows after a gap left by a crashed caller are still written, in order.
+        written = [self.pending[sequence] for sequence in sorted(self.pending) if self.pending[sequence] is not None]
+        for row, _ in written:
+            self.writer.writerow(row)
+        self.pending.clear()
+        self._flushed(written)
+        self._fsync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
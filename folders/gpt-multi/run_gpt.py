@@ -0,0 +1,12 @@
+"""
+Run the gpt CLI of the gptcli package shipped in folders/gpt-cli.
+
+fiver.py's pty engine starts this instead of the `gpt` on PATH, which is
+the pip-installed gpt-command-line and lacks options the engine relies on
+(--transcript-file).
+"""
+import gptcli_path  # sets up sys.path; must precede any gptcli import
+from gptcli.gpt import main
+
+if __name__ == "__main__":
+    main()
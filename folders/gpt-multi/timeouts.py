@@ -0,0 +1,106 @@
+"""
+Per-step timeouts derived from observed response latencies.
+
+Each (model, step) pair keeps a window of recent latencies. Once enough
+have been seen, the step's timeout is a multiple of their 95th percentile,
+so a short tag-only step gives up on a stalled request long before a step
+that rewrites the whole essay would. Latencies are saved between runs.
+"""
+import json
+import math
+import os
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StepTimeouts:
+    """
+    `default_timeout` is used for a step until `min_samples` latencies have
+    been recorded for it. After that the timeout is `headroom` times the
+    95th percentile, clamped to [`min_timeout`, `max_timeout`].
+    """
+
+    def __init__(
+        self,
+        default_timeout=120,
+        min_samples=5,
+        headroom=2.0,
+        min_timeout=15,
+        max_timeout=None,
+        window=200,
+    ):
+        self.default_timeout = default_timeout
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout if max_timeout is not None else default_timeout * 2
+        self.window = window
+        self.latencies = {}
+        # Counts for this run only; not saved.
+        self.timeouts = {}
+        self.stalls = {}
+
+    @staticmethod
+    def key(model, step):
+        return f"{model}/{step}"
+
+    def timeout(self, model, step, default=None):
+        samples = self.latencies.get(self.key(model, step), [])
+        if len(samples) < self.min_samples:
+            return default if default is not None else self.default_timeout
+        adaptive = self.headroom * percentile(samples, 0.95)
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+    def record(self, model, step, seconds):
+        samples = self.latencies.setdefault(self.key(model, step), [])
+        samples.append(seconds)
+        del samples[: -self.window]
+
+    def record_timeout(self, model, step):
+        key = self.key(model, step)
+        self.timeouts[key] = self.timeouts.get(key, 0) + 1
+
+    def record_stall(self, model, step):
+        key = self.key(model, step)
+        self.stalls[key] = self.stalls.get(key, 0) + 1
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, samples in saved.items():
+            self.latencies[key] = [float(s) for s in samples][-self.window :]
+
+    def save(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.latencies, f)
+        os.replace(temp_path, path)
+
+    def summary_lines(self):
+        """One line per (model, step) seen, for the end-of-run summary."""
+        lines = []
+        for key in sorted(set(self.latencies) | set(self.timeouts) | set(self.stalls)):
+            model, step = key.rsplit("/", 1)
+            samples = self.latencies.get(key, [])
+            if samples:
+                latency = (
+                    f"{len(samples)} samples, p50 {percentile(samples, 0.5):.1f}s, "
+                    f"p95 {percentile(samples, 0.95):.1f}s"
+                )
+            else:
+                latency = "no samples"
+            lines.append(
+                f"{step} ({model}): {latency}, timeout {self.timeout(model, step):.0f}s, "
+                f"{self.timeouts.get(key, 0)} timed out, {self.stalls.get(key, 0)} stalled"
+            )
+        return lines